@@ -0,0 +1,197 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Ruta a la carpeta 'data', calculada a partir de este archivo para no depender del directorio desde el que se ejecute
+RUTA_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+# Tablas limpias que se guardan en formato columnar
+TABLAS = ['equipos', 'overall', 'partidos', 'jugadores']
+
+# Tipos del esquema: texto con muchos valores repetidos (categorías), recuentos (enteros que admiten valores vacíos,
+# por ejemplo las estadísticas de un equipo sin datos en un partido), decimales y texto libre
+CATEGORIA = pa.dictionary(pa.int32(), pa.string())
+RECUENTO = pa.int16()
+DECIMAL = pa.float64()
+TEXTO = pa.string()
+
+# Estadísticas de la tabla de equipos, que también aparecen en los partidos para el local y el visitante
+ESTADISTICAS_EQUIPO = [
+    ('# Pl', RECUENTO), ('Age', DECIMAL), ('MP', RECUENTO), ('Starts', RECUENTO), ('Gls', RECUENTO),
+    ('Ast', RECUENTO), ('G+A', RECUENTO), ('G-PK', RECUENTO), ('PK', RECUENTO), ('PKatt', RECUENTO),
+    ('CrdY', RECUENTO), ('CrdR', RECUENTO)
+]
+
+# Esquema de cada tabla limpia, en el orden de las columnas de los '*_limpio.csv'. Los tipos no dependen de los valores
+# de cada ejecución: una temporada nueva con un valor vacío no cambia el tipo de la columna en el archivo
+ESQUEMAS = {
+    'equipos': pa.schema([('Season', CATEGORIA), ('Squad', CATEGORIA), ('Country', CATEGORIA)] + ESTADISTICAS_EQUIPO),
+    'overall': pa.schema([
+        ('Season', CATEGORIA), ('Rk', CATEGORIA), ('Squad', CATEGORIA), ('Country', CATEGORIA), ('MP', RECUENTO),
+        ('W', RECUENTO), ('D', RECUENTO), ('L', RECUENTO), ('GF', RECUENTO), ('GA', RECUENTO), ('GD', RECUENTO),
+        ('Pts', RECUENTO), ('Attendance', pa.int32()), ('Top Team Scorer', TEXTO), ('Goalkeeper', TEXTO),
+        ('Top Team Scorer Goals', RECUENTO)
+    ]),
+    'partidos': pa.schema([
+        ('Season', CATEGORIA), ('Round', CATEGORIA), ('Day', CATEGORIA), ('Date', pa.timestamp('ns')),
+        ('Results', CATEGORIA), ('Home', CATEGORIA), ('Country (Home)', CATEGORIA), ('Points (Home)', DECIMAL),
+        ('Score (Home)', RECUENTO), ('Score (Away)', RECUENTO), ('Points (Away)', DECIMAL),
+        ('Country (Away)', CATEGORIA), ('Away', CATEGORIA), ('Venue', CATEGORIA), ('Referee', CATEGORIA)
+    ] + [(f'{columna}_home', tipo) for columna, tipo in ESTADISTICAS_EQUIPO]
+      + [(f'{columna}_away', tipo) for columna, tipo in ESTADISTICAS_EQUIPO]),
+    # La edad de los jugadores es texto porque fbref la da como 'años-días'
+    'jugadores': pa.schema([
+        ('Season', CATEGORIA), ('Rk', RECUENTO), ('Player', CATEGORIA), ('Nation', CATEGORIA), ('Pos', CATEGORIA),
+        ('Squad', CATEGORIA), ('Age', TEXTO), ('Born', RECUENTO), ('MP', RECUENTO), ('Starts', RECUENTO),
+        ('Min', DECIMAL), ('90s', DECIMAL), ('Gls', RECUENTO), ('Ast', RECUENTO), ('G+A', RECUENTO),
+        ('G-PK', RECUENTO), ('PK', RECUENTO), ('PKatt', RECUENTO), ('CrdY', RECUENTO), ('CrdR', RECUENTO),
+        ('xG', DECIMAL), ('npxG', DECIMAL), ('xAG', DECIMAL), ('npxG+xAG', DECIMAL), ('PrgC', RECUENTO),
+        ('PrgP', RECUENTO), ('PrgR', RECUENTO), ('Gls90', DECIMAL), ('Ast90', DECIMAL), ('G+A90', DECIMAL),
+        ('G-PK90', DECIMAL), ('G+A-PK90', DECIMAL), ('xG90', DECIMAL), ('xAG90', DECIMAL), ('xG+xAG90', DECIMAL),
+        ('npxG90', DECIMAL), ('npxG+xAG90', DECIMAL), ('Matches', CATEGORIA), ('Points', DECIMAL)
+    ]),
+    # Almacén de características de caracteristicas.py: las estadísticas de cada equipo tienen los mismos tipos que en
+    # las tablas limpias, más la puntuación media y el número de jugadores
+    'caracteristicas': pa.schema([('Season', CATEGORIA), ('Squad', CATEGORIA), ('Country', CATEGORIA),
+                                  ('Points', DECIMAL), ('Players', RECUENTO)] + ESTADISTICAS_EQUIPO),
+}
+
+
+def ruta_tabla(nombre, ruta_datos=RUTA_DATOS):
+    return os.path.join(ruta_datos, f'{nombre}_limpio.parquet')
+
+
+def convertir_columna(serie, tipo):
+    '''
+    Función que convierte una columna al tipo de pandas que corresponde a su tipo del esquema. Los recuentos pasan a
+    enteros que admiten valores vacíos, y si alguno tiene decimales o no cabe en el tipo se lanza un error
+    '''
+    if pa.types.is_dictionary(tipo):
+        return serie.astype('category')
+    if pa.types.is_integer(tipo):
+        return serie.astype(f'Int{tipo.bit_width}')
+    if pa.types.is_floating(tipo):
+        return serie.astype(np.float64)
+    if pa.types.is_timestamp(tipo):
+        return pd.to_datetime(serie)
+    return serie.astype('string')
+
+
+def tipar(tabla, nombre):
+    '''
+    Función que aplica a una tabla limpia su esquema de almacenamiento
+    '''
+    esquema = ESQUEMAS[nombre]
+    if set(tabla.columns) != set(esquema.names):
+        raise ValueError(f"Las columnas de la tabla '{nombre}' no coinciden con su esquema: "
+                         f'sobran {sorted(set(tabla.columns) - set(esquema.names))}, '
+                         f'faltan {sorted(set(esquema.names) - set(tabla.columns))}')
+    return pd.DataFrame({campo.name: convertir_columna(tabla[campo.name], campo.type) for campo in esquema})
+
+
+def tabla_arrow(tabla, nombre):
+    '''
+    Función que convierte una tabla ya tipada (ver tipar) a una tabla de Arrow con exactamente su esquema
+    '''
+    datos = pa.Table.from_pandas(tabla, preserve_index=False)
+    return datos.cast(ESQUEMAS[nombre].with_metadata(datos.schema.metadata))
+
+
+def guardar_tabla(tabla, nombre, ruta_datos=RUTA_DATOS):
+    '''
+    Función que guarda una tabla limpia en formato Parquet con su esquema y un grupo de filas por temporada, de modo que
+    al leer unas temporadas solo se leen sus grupos.
+
+    Las filas se guardan en el mismo orden que en la tabla, así que cada temporada tiene que estar en filas seguidas
+    (como en los CSV que genera el web scraping).
+    '''
+    tabla = tipar(tabla, nombre).reset_index(drop=True)
+    temporadas = tabla['Season'].astype(str)
+    inicios = np.flatnonzero(temporadas.ne(temporadas.shift()).to_numpy())
+    if temporadas.iloc[inicios].duplicated().any():
+        raise ValueError(f"Las temporadas de la tabla '{nombre}' no están en filas seguidas")
+    cortes = list(inicios) + [len(tabla)]
+
+    datos = tabla_arrow(tabla, nombre)
+    ruta = ruta_tabla(nombre, ruta_datos)
+    # Solo necesitamos las estadísticas de 'Season' para descartar grupos; las del resto solo ocupan espacio
+    with pq.ParquetWriter(ruta + '.tmp', datos.schema, write_statistics=['Season']) as escritor:
+        for inicio, fin in zip(cortes[:-1], cortes[1:]):
+            escritor.write_table(datos.slice(inicio, fin - inicio))
+    os.replace(ruta + '.tmp', ruta)
+
+
+def grupos_de_temporadas(archivo, temporadas):
+    '''
+    Función que devuelve los grupos de filas de un archivo Parquet que pueden contener alguna de las temporadas
+    indicadas, según las estadísticas (mínimo y máximo) de la columna 'Season' de cada grupo
+    '''
+    indice = archivo.schema_arrow.get_field_index('Season')
+    grupos = []
+    for i in range(archivo.metadata.num_row_groups):
+        estadisticas = archivo.metadata.row_group(i).column(indice).statistics
+        # Sin estadísticas no podemos descartar el grupo
+        if estadisticas is None or not estadisticas.has_min_max \
+                or any(estadisticas.min <= temporada <= estadisticas.max for temporada in temporadas):
+            grupos.append(i)
+    return grupos
+
+
+def cargar_tabla(nombre, columnas=None, temporadas=None, ruta_datos=RUTA_DATOS):
+    '''
+    Función que carga una tabla limpia en formato Parquet leyendo solo las columnas y temporadas indicadas
+    (None = todas)
+    '''
+    archivo = pq.ParquetFile(ruta_tabla(nombre, ruta_datos))
+    # Leemos también 'Season' para quedarnos solo con las temporadas pedidas de los grupos leídos
+    leidas = None if columnas is None else list(dict.fromkeys(['Season'] + list(columnas)))
+
+    if temporadas is None:
+        datos = archivo.read(columns=leidas, use_pandas_metadata=True)
+    else:
+        grupos = grupos_de_temporadas(archivo, temporadas)
+        datos = archivo.read_row_groups(grupos, columns=leidas, use_pandas_metadata=True)
+
+    tabla = datos.to_pandas()
+    if temporadas is not None:
+        tabla = tabla[tabla['Season'].isin(list(temporadas))].reset_index(drop=True)
+        # Cada grupo guarda las categorías de toda la tabla; nos quedamos solo con las que aparecen en lo que hemos leído
+        for columna in tabla.select_dtypes('category'):
+            tabla[columna] = tabla[columna].cat.remove_unused_categories()
+    return tabla if columnas is None else tabla[list(columnas)]
+
+
+def guardar_todas(ruta_datos=RUTA_DATOS):
+    '''
+    Función que convierte los archivos '*_limpio.csv' a Parquet y compara la memoria y el tiempo de carga de ambos
+    '''
+    for nombre in TABLAS:
+        ruta_csv = os.path.join(ruta_datos, f'{nombre}_limpio.csv')
+        inicio = time.perf_counter()
+        tabla = pd.read_csv(ruta_csv, float_precision='round_trip')
+        tiempo_csv = time.perf_counter() - inicio
+        guardar_tabla(tabla, nombre, ruta_datos)
+
+        inicio = time.perf_counter()
+        tipada = cargar_tabla(nombre, ruta_datos=ruta_datos)
+        tiempo_parquet = time.perf_counter() - inicio
+
+        memoria_csv = tabla.memory_usage(deep=True).sum() / 1e6
+        memoria_parquet = tipada.memory_usage(deep=True).sum() / 1e6
+        print(f"{nombre + '_limpio':<18} memoria {memoria_csv:6.2f} MB -> {memoria_parquet:5.2f} MB, "
+              f'carga {tiempo_csv * 1000:6.1f} ms -> {tiempo_parquet * 1000:5.1f} ms, '
+              f'disco {os.path.getsize(ruta_csv) / 1e3:6.0f} KB -> '
+              f'{os.path.getsize(ruta_tabla(nombre, ruta_datos)) / 1e3:4.0f} KB')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convierte los archivos *_limpio.csv a Parquet con tipos compactos')
+    parser.add_argument('--datos', default=RUTA_DATOS, help='Carpeta con los archivos *_limpio.csv')
+    args = parser.parse_args()
+
+    guardar_todas(args.datos)
@@ -0,0 +1,148 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from almacenamiento import ESTADISTICAS_EQUIPO, tabla_arrow, tipar
+
+# medicion.py está en la carpeta UEFA
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from medicion import contar, tramo
+
+# Ruta a la carpeta 'data', calculada a partir de este archivo para no depender del directorio desde el que se ejecute
+RUTA_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+# Archivo donde se guardan las características de cada equipo en cada temporada
+RUTA_ALMACEN = os.path.join(RUTA_DATOS, 'caracteristicas_equipos.parquet')
+
+# Estadísticas de la tabla de equipos que usamos como características de cada equipo en los partidos
+COLUMNAS_EQUIPOS = [columna for columna, _ in ESTADISTICAS_EQUIPO]
+
+
+def puntuar_jugadores(jugadores):
+    '''
+    Función que añade a cada jugador su puntuación: goles, progresión (PrgC, PrgP, PrgR) y minutos por partido jugado
+    '''
+    # Calculamos los minutos por partido teniendo en cuenta si el número de partidos es diferente de 0
+    min_mp = (jugadores['Min'] / jugadores['MP'].where(jugadores['MP'] != 0)).fillna(0)
+    jugadores['Points'] = jugadores['Gls'] + jugadores['PrgC'] + jugadores['PrgP'] + jugadores['PrgR'] + min_mp
+    return jugadores
+
+
+def agregar_por_equipo(jugadores):
+    '''
+    Función que calcula, con una sola agrupación, la puntuación media y el número de jugadores de cada equipo en cada
+    temporada
+    '''
+    grupos = jugadores.groupby(['Season', 'Squad'], sort=False, observed=True)
+    agregados = grupos.size().rename('Players').reset_index()
+
+    # La media se calcula como en limpieza.ipynb, sum(puntos) / len(puntos), sumando los jugadores de cada equipo uno a
+    # uno en el orden de la tabla; mean() suma de otra forma y cambia la última cifra de algunas puntuaciones. Colocamos
+    # los puntos en una matriz de equipos por jugadores (con ceros al final, que no cambian la suma) y la recorremos por
+    # columnas
+    equipo, posicion = grupos.ngroup().to_numpy(), grupos.cumcount().to_numpy()
+    puntos = np.zeros((len(agregados), posicion.max() + 1 if len(posicion) else 0))
+    puntos[equipo, posicion] = jugadores['Points'].to_numpy(dtype=np.float64)
+    suma = np.zeros(len(agregados))
+    for columna in puntos.T:
+        suma += columna
+    agregados.insert(2, 'Points', suma / agregados['Players'].to_numpy())
+    return agregados
+
+
+def puntuar_partidos(partidos, agregados):
+    '''
+    Función que añade a cada partido la puntuación media de los jugadores de cada equipo en esa temporada.
+    Los equipos sin jugadores (temporadas anteriores a 2017-2018) tienen puntuación 0.
+    '''
+    # Apilamos los equipos locales y visitantes para buscar las puntuaciones de todos con un único merge
+    n = len(partidos)
+    claves = pd.DataFrame({
+        'Season': np.concatenate([partidos['Season'].to_numpy(), partidos['Season'].to_numpy()]),
+        'Squad': np.concatenate([partidos['Home'].to_numpy(), partidos['Away'].to_numpy()])
+    })
+    puntos = claves.merge(agregados[['Season', 'Squad', 'Points']], on=['Season', 'Squad'], how='left')['Points']
+    # Como en limpieza.ipynb, los equipos sin puntuación tienen un 0 entero, que el CSV escribe como '0' y no '0.0'
+    puntos = puntos.astype(object).where(puntos.notna(), 0).to_numpy()
+
+    partidos.insert(7, 'Points (Home)', puntos[:n])
+    partidos.insert(10, 'Points (Away)', puntos[n:])
+    return partidos
+
+
+def construir_almacen(equipos, agregados):
+    '''
+    Función que construye el almacén de características: una fila por temporada y equipo con sus estadísticas de la
+    tabla de equipos, la puntuación media de sus jugadores y el número de jugadores
+    '''
+    with tramo('caracteristicas.almacen'):
+        almacen = equipos[['Season', 'Squad', 'Country'] + COLUMNAS_EQUIPOS].merge(agregados, on=['Season', 'Squad'],
+                                                                                   how='left')
+        # Igual que en los partidos, los equipos sin jugadores tienen puntuación 0
+        almacen['Points'] = almacen['Points'].fillna(0)
+        almacen['Players'] = almacen['Players'].fillna(0)
+
+        # Mismos tipos que las estadísticas de las tablas limpias (esquema 'caracteristicas' de almacenamiento.py)
+        almacen = tipar(almacen, 'caracteristicas')
+        contar('filas almacen', len(almacen))
+        return almacen.sort_values(['Season', 'Squad']).reset_index(drop=True)
+
+
+def guardar_almacen(almacen, ruta=RUTA_ALMACEN):
+    '''
+    Función que guarda el almacén de características en formato Parquet con su esquema
+    '''
+    pq.write_table(tabla_arrow(almacen, 'caracteristicas'), ruta)
+
+
+def cargar_almacen(temporadas=None, columnas=None, ruta=RUTA_ALMACEN):
+    '''
+    Función que carga el almacén de características, opcionalmente solo de algunas temporadas y algunas columnas
+    '''
+    filtros = [('Season', 'in', list(temporadas))] if temporadas is not None else None
+    if columnas is not None:
+        columnas = ['Season', 'Squad'] + [columna for columna in columnas if columna not in ('Season', 'Squad')]
+    almacen = pd.read_parquet(ruta, columns=columnas, filters=filtros)
+    # Parquet guarda las categorías de todo el archivo; nos quedamos solo con las que aparecen en lo que hemos leído
+    for columna in almacen.select_dtypes('category'):
+        almacen[columna] = almacen[columna].cat.remove_unused_categories()
+    return almacen
+
+
+def escalar(tabla, factor):
+    '''
+    Función que multiplica el número de filas de una tabla creando copias de cada temporada con otro nombre,
+    para medir cómo escala el cálculo con más temporadas
+    '''
+    copias = []
+    for i in range(factor):
+        copia = tabla.copy()
+        copia['Season'] = copia['Season'].astype(str) + ('' if i == 0 else f'-{i}')
+        copias.append(copia)
+    return pd.concat(copias, ignore_index=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calcula y guarda el almacén de características de los equipos')
+    parser.add_argument('--datos', default=RUTA_DATOS, help='Carpeta con los archivos *_limpio.csv')
+    parser.add_argument('--escala', type=int, default=1,
+                        help='Multiplica el número de temporadas para medir el tiempo de cálculo (no se guarda nada)')
+    args = parser.parse_args()
+
+    jugadores = pd.read_csv(os.path.join(args.datos, 'jugadores_limpio.csv'))
+    equipos = pd.read_csv(os.path.join(args.datos, 'equipos_limpio.csv'))
+    if args.escala > 1:
+        jugadores, equipos = escalar(jugadores, args.escala), escalar(equipos, args.escala)
+
+    inicio = time.perf_counter()
+    almacen = construir_almacen(equipos, agregar_por_equipo(puntuar_jugadores(jugadores)))
+    print(f'{len(jugadores)} jugadores -> {len(almacen)} equipos en {(time.perf_counter() - inicio) * 1000:.1f} ms')
+
+    if args.escala == 1:
+        guardar_almacen(almacen, os.path.join(args.datos, os.path.basename(RUTA_ALMACEN)))
+        print(f"El archivo '{os.path.basename(RUTA_ALMACEN)}' ha sido creado exitosamente.")
@@ -0,0 +1,321 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# medicion.py está en la carpeta UEFA
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from medicion import contar, tramo
+
+# Ruta a la carpeta 'data', calculada a partir de este archivo para no depender del directorio desde el que se ejecute
+RUTA_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+# Archivo donde se guarda el estado del motor (valoraciones actuales e historial) tras cada actualización
+RUTA_ELO = os.path.join(RUTA_DATOS, 'elo_equipos.npz')
+
+# Valoración de un equipo antes de su primer partido
+VALORACION_INICIAL = 1500.0
+
+# Cuántos puntos puede ganar o perder un equipo en un partido
+FACTOR_K = 20.0
+
+# Puntos que se suman a la valoración del equipo local al calcular el resultado esperado
+VENTAJA_LOCAL = 60.0
+
+# Parte de la distancia a la valoración inicial que pierde un equipo entre una temporada y la siguiente (los
+# equipos cambian de jugadores y entrenador, y muchos pasan varias temporadas sin jugar la Champions)
+REGRESION_TEMPORADA = 0.25
+
+# Puntos de cada resultado para el equipo local
+PUNTOS_RESULTADO = {'H': 1.0, 'D': 0.5, 'A': 0.0}
+
+# Columnas de cada partido que se guardan en su huella: si alguna cambia, el partido se vuelve a aplicar
+COLUMNAS_HUELLA = ['Season', 'dia', 'Home', 'Away', 'Score (Home)', 'Score (Away)', 'Results']
+
+
+def dias(fechas):
+    '''
+    Función que pasa fechas a número de días desde 1970, que es como se guardan en el historial
+    '''
+    return pd.to_datetime(pd.Series(fechas)).to_numpy('datetime64[D]').astype(np.int64)
+
+
+def temporada_inicial(temporadas):
+    '''
+    Función que devuelve el año en que empieza cada temporada ('2023-2024' -> 2023)
+    '''
+    return pd.Series(temporadas).astype(str).str[:4].astype(np.int16).to_numpy()
+
+
+class MotorElo:
+    '''
+    Clase que calcula la valoración Elo de cada equipo partido a partido, en orden de fecha.
+
+    Las valoraciones actuales se guardan en arrays de NumPy con una posición por equipo, y cada partido las
+    actualiza en tiempo constante. El historial guarda la valoración de cada equipo después de cada uno de sus
+    partidos, de modo que se puede consultar la valoración que tenía un equipo en cualquier fecha sin recalcular nada.
+    '''
+
+    def __init__(self, factor_k=FACTOR_K, ventaja_local=VENTAJA_LOCAL, regresion_temporada=REGRESION_TEMPORADA,
+                 valoracion_inicial=VALORACION_INICIAL):
+        self.factor_k = factor_k
+        self.ventaja_local = ventaja_local
+        self.regresion_temporada = regresion_temporada
+        self.valoracion_inicial = valoracion_inicial
+
+        # Estado de cada equipo
+        self.equipos = []
+        self.indices = {}
+        self.valoraciones = np.empty(0, dtype=np.float64)
+        self.partidos = np.empty(0, dtype=np.int32)
+        self.temporadas = np.empty(0, dtype=np.int16)
+
+        # Historial: una fila por equipo y partido, en el orden en que se han aplicado los partidos
+        self.n_eventos = 0
+        self.eventos_equipo = np.empty(0, dtype=np.int32)
+        self.eventos_dia = np.empty(0, dtype=np.int64)
+        self.eventos_temporada = np.empty(0, dtype=np.int16)
+        self.eventos_valoracion = np.empty(0, dtype=np.float64)
+        # Huella de cada partido aplicado, en el mismo orden, para saber desde qué partido ha cambiado la tabla
+        self.huellas = np.empty(0, dtype=np.uint64)
+        self._orden = None
+
+    def parametros(self):
+        return np.array([self.factor_k, self.ventaja_local, self.regresion_temporada, self.valoracion_inicial])
+
+    def codificar(self, equipos):
+        '''
+        Función que devuelve el índice de cada equipo, añadiendo al estado los equipos nuevos
+        '''
+        nuevos = [equipo for equipo in dict.fromkeys(equipos) if equipo not in self.indices]
+        if nuevos:
+            self.indices.update({equipo: len(self.equipos) + i for i, equipo in enumerate(nuevos)})
+            self.equipos += nuevos
+            self.valoraciones = np.r_[self.valoraciones, np.full(len(nuevos), self.valoracion_inicial)]
+            self.partidos = np.r_[self.partidos, np.zeros(len(nuevos), dtype=np.int32)]
+            self.temporadas = np.r_[self.temporadas, np.full(len(nuevos), -1, dtype=np.int16)]
+        return np.array([self.indices[equipo] for equipo in equipos], dtype=np.int32)
+
+    def reservar(self, eventos):
+        '''
+        Función que amplía el historial (al menos al doble) si no caben los eventos nuevos
+        '''
+        necesarios = self.n_eventos + eventos
+        if necesarios <= len(self.eventos_dia):
+            return
+        capacidad = max(necesarios, 2 * len(self.eventos_dia), 1024)
+        for nombre in ('eventos_equipo', 'eventos_dia', 'eventos_temporada', 'eventos_valoracion'):
+            antiguo = getattr(self, nombre)
+            nuevo = np.empty(capacidad, dtype=antiguo.dtype)
+            nuevo[:self.n_eventos] = antiguo[:self.n_eventos]
+            setattr(self, nombre, nuevo)
+
+    def ordenar(self, partidos):
+        '''
+        Función que devuelve los partidos jugados de la tabla en el orden en que se aplican (por fecha y, dentro de
+        cada fecha, en el orden de la tabla) junto a la huella de cada uno
+        '''
+        partidos = partidos.dropna(subset=['Date', 'Home', 'Away', 'Results'])
+        partidos = partidos.assign(dia=dias(partidos['Date'])).sort_values('dia', kind='stable')
+        huellas = pd.util.hash_pandas_object(partidos[COLUMNAS_HUELLA], index=False).to_numpy()
+        return partidos, huellas
+
+    def retroceder(self, aplicados):
+        '''
+        Función que deja el motor como estaba después de aplicar los primeros 'aplicados' partidos. La valoración y
+        la temporada de cada equipo son las de su último evento en el historial; los equipos que no han jugado
+        ninguno de esos partidos se quitan, como si no se hubieran aplicado nunca
+        '''
+        fin = 2 * aplicados
+        eventos_equipo = self.eventos_equipo[:fin]
+        ultimos = np.full(len(self.equipos), -1, dtype=np.int64)
+        np.maximum.at(ultimos, eventos_equipo, np.arange(fin))
+        quedan = ultimos >= 0
+        nuevos_indices = np.cumsum(quedan) - 1
+
+        self.equipos = [equipo for equipo, queda in zip(self.equipos, quedan) if queda]
+        self.indices = {equipo: i for i, equipo in enumerate(self.equipos)}
+        self.valoraciones = self.eventos_valoracion[ultimos[quedan]]
+        self.partidos = np.bincount(eventos_equipo, minlength=len(quedan))[quedan].astype(np.int32)
+        self.temporadas = self.eventos_temporada[ultimos[quedan]]
+        self.eventos_equipo[:fin] = nuevos_indices[eventos_equipo]
+        self.n_eventos = fin
+        self.huellas = self.huellas[:aplicados]
+        self._orden = None
+
+    def actualizar(self, partidos):
+        '''
+        Función que aplica los partidos de la tabla que todavía no se han aplicado y devuelve cuántos ha aplicado.
+        Compara la huella de cada partido con la de los ya aplicados: si la tabla ha cambiado (un resultado
+        corregido, un partido nuevo de una fecha anterior o un partido borrado), vuelve al estado anterior al primer
+        partido distinto y aplica desde ahí, de modo que el resultado es el mismo que recalculando desde cero
+        '''
+        partidos, huellas = self.ordenar(partidos)
+        comunes = min(len(huellas), len(self.huellas))
+        distintos = np.flatnonzero(huellas[:comunes] != self.huellas[:comunes])
+        primero = int(distintos[0]) if len(distintos) else comunes
+        if primero < len(self.huellas):
+            self.retroceder(primero)
+        partidos, huellas = partidos.iloc[primero:], huellas[primero:]
+        if partidos.empty:
+            return 0
+
+        locales = self.codificar(partidos['Home'].tolist())
+        visitantes = self.codificar(partidos['Away'].tolist())
+        dias_partidos = partidos['dia'].to_numpy()
+        temporadas = temporada_inicial(partidos['Season'])
+        puntos = partidos['Results'].map(PUNTOS_RESULTADO).to_numpy(dtype=np.float64)
+        self.reservar(2 * len(partidos))
+
+        # Cada partido depende de los anteriores, así que se aplican uno a uno, cada uno en tiempo constante
+        valoraciones, jugados, temporada_equipo = self.valoraciones, self.partidos, self.temporadas
+        eventos_equipo, eventos_dia, eventos_valoracion = self.eventos_equipo, self.eventos_dia, self.eventos_valoracion
+        eventos_temporada = self.eventos_temporada
+        k, ventaja, regresion, inicial = self.factor_k, self.ventaja_local, self.regresion_temporada, self.valoracion_inicial
+        evento = self.n_eventos
+        for local, visitante, dia, temporada, punto in zip(locales, visitantes, dias_partidos, temporadas, puntos):
+            for equipo in (local, visitante):
+                # Al empezar una temporada nueva la valoración se acerca a la inicial
+                if temporada_equipo[equipo] != temporada:
+                    if temporada_equipo[equipo] >= 0:
+                        valoraciones[equipo] -= regresion * (valoraciones[equipo] - inicial)
+                    temporada_equipo[equipo] = temporada
+            esperado = 1.0 / (1.0 + 10.0 ** ((valoraciones[visitante] - valoraciones[local] - ventaja) / 400.0))
+            cambio = k * (punto - esperado)
+            valoraciones[local] += cambio
+            valoraciones[visitante] -= cambio
+            jugados[local] += 1
+            jugados[visitante] += 1
+            eventos_equipo[evento:evento + 2] = (local, visitante)
+            eventos_dia[evento:evento + 2] = dia
+            eventos_temporada[evento:evento + 2] = temporada
+            eventos_valoracion[evento:evento + 2] = (valoraciones[local], valoraciones[visitante])
+            evento += 2
+        self.n_eventos = evento
+        self.huellas = np.r_[self.huellas, huellas]
+        self._orden = None
+        return len(partidos)
+
+    def valoracion(self, equipo):
+        '''
+        Función que devuelve la valoración actual de un equipo
+        '''
+        return self.valoraciones[self.indices[equipo]] if equipo in self.indices else self.valoracion_inicial
+
+    def clasificacion(self):
+        '''
+        Función que devuelve un DataFrame con la valoración actual y el número de partidos de cada equipo, de mayor
+        a menor valoración
+        '''
+        return pd.DataFrame({'Squad': self.equipos, 'Elo': self.valoraciones, 'Partidos': self.partidos}) \
+            .sort_values('Elo', ascending=False, ignore_index=True)
+
+    def valoraciones_en(self, equipos, fechas):
+        '''
+        Función que devuelve la valoración que tenía cada equipo justo antes de cada fecha, es decir, después de su
+        último partido anterior a esa fecha (sin contar los partidos de ese mismo día). Los equipos que todavía no
+        habían jugado tienen la valoración inicial. Todas las consultas se resuelven a la vez con una búsqueda binaria
+        sobre el historial ordenado por equipo y fecha.
+        '''
+        if self._orden is None:
+            # Los eventos ya están en orden de fecha, así que basta una ordenación estable por equipo
+            self._orden = np.argsort(self.eventos_equipo[:self.n_eventos], kind='stable')
+            self._claves = (self.eventos_equipo[self._orden].astype(np.int64) << 32) + \
+                (self.eventos_dia[self._orden] + (1 << 31))
+        codigos = np.array([self.indices.get(equipo, -1) for equipo in equipos], dtype=np.int64)
+        claves = (codigos << 32) + (dias(fechas) + (1 << 31))
+        posiciones = np.searchsorted(self._claves, claves, side='left') - 1
+
+        resultado = np.full(len(codigos), self.valoracion_inicial)
+        validas = (posiciones >= 0) & (codigos >= 0)
+        validas[validas] = self.eventos_equipo[self._orden[posiciones[validas]]] == codigos[validas]
+        resultado[validas] = self.eventos_valoracion[self._orden[posiciones[validas]]]
+        return resultado
+
+    def guardar(self, ruta=RUTA_ELO):
+        '''
+        Función que guarda el estado del motor para poder seguir aplicando partidos más adelante
+        '''
+        np.savez(ruta + '.tmp.npz', parametros=self.parametros(), equipos=np.array(self.equipos, dtype=str),
+                 valoraciones=self.valoraciones, partidos=self.partidos, temporadas=self.temporadas,
+                 eventos_equipo=self.eventos_equipo[:self.n_eventos], eventos_dia=self.eventos_dia[:self.n_eventos],
+                 eventos_temporada=self.eventos_temporada[:self.n_eventos],
+                 eventos_valoracion=self.eventos_valoracion[:self.n_eventos], huellas=self.huellas)
+        os.replace(ruta + '.tmp.npz', ruta)
+
+    @classmethod
+    def cargar(cls, ruta=RUTA_ELO):
+        with np.load(ruta) as datos:
+            motor = cls(*datos['parametros'])
+            motor.equipos = datos['equipos'].tolist()
+            motor.indices = {equipo: i for i, equipo in enumerate(motor.equipos)}
+            motor.valoraciones = datos['valoraciones']
+            motor.partidos = datos['partidos']
+            motor.temporadas = datos['temporadas']
+            motor.eventos_equipo = datos['eventos_equipo']
+            motor.eventos_dia = datos['eventos_dia']
+            motor.eventos_temporada = datos['eventos_temporada']
+            motor.eventos_valoracion = datos['eventos_valoracion']
+            motor.n_eventos = len(motor.eventos_dia)
+            motor.huellas = datos['huellas']
+        return motor
+
+
+def actualizar_motor(partidos, ruta=RUTA_ELO):
+    '''
+    Función que carga el estado guardado del motor (si existe y tiene los mismos parámetros), le aplica solo los
+    partidos nuevos o modificados desde el primero que ha cambiado, lo guarda y lo devuelve junto al número de
+    partidos aplicados
+    '''
+    motor = MotorElo()
+    if os.path.exists(ruta):
+        with np.load(ruta) as datos:
+            # Los estados guardados sin huellas (de una versión anterior) no se pueden comparar con la tabla
+            compatible = 'huellas' in datos.files and np.array_equal(datos['parametros'], motor.parametros())
+        if compatible:
+            motor = MotorElo.cargar(ruta)
+    huellas = motor.huellas
+    with tramo('elo.actualizar'):
+        aplicados = motor.actualizar(partidos)
+    contar('partidos aplicados', aplicados)
+    if aplicados or len(motor.huellas) != len(huellas):
+        motor.guardar(ruta)
+    return motor, aplicados
+
+
+def caracteristicas_elo(partidos, motor, actuales=False):
+    '''
+    Función que devuelve las características Elo de cada partido: la valoración de cada equipo antes del día del
+    partido y el resultado esperado para el local. Solo usan partidos anteriores, así que se pueden usar para
+    entrenar los modelos sin filtrar información del propio partido. Con 'actuales', para partidos que todavía no se
+    han jugado, se usa la valoración actual de cada equipo y no hace falta la columna 'Date'
+    '''
+    if actuales:
+        local = np.array([motor.valoracion(equipo) for equipo in partidos['Home']], dtype=np.float64)
+        visitante = np.array([motor.valoracion(equipo) for equipo in partidos['Away']], dtype=np.float64)
+    else:
+        local = motor.valoraciones_en(partidos['Home'], partidos['Date'])
+        visitante = motor.valoraciones_en(partidos['Away'], partidos['Date'])
+    esperado = 1.0 / (1.0 + 10.0 ** ((visitante - local - motor.ventaja_local) / 400.0))
+    return pd.DataFrame({'Elo (Home)': local, 'Elo (Away)': visitante, 'Elo Expected (Home)': esperado},
+                        index=partidos.index)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Actualiza las valoraciones Elo de los equipos con los partidos nuevos')
+    parser.add_argument('--datos', default=RUTA_DATOS, help='Carpeta con el archivo partidos_limpio.csv')
+    parser.add_argument('--desde-cero', action='store_true', help='Recalcula las valoraciones sin usar el estado guardado')
+    args = parser.parse_args()
+
+    ruta = os.path.join(args.datos, os.path.basename(RUTA_ELO))
+    if args.desde_cero and os.path.exists(ruta):
+        os.remove(ruta)
+    partidos = pd.read_csv(os.path.join(args.datos, 'partidos_limpio.csv'))
+
+    inicio = time.perf_counter()
+    motor, aplicados = actualizar_motor(partidos, ruta)
+    print(f'{aplicados} partidos aplicados en {(time.perf_counter() - inicio) * 1000:.1f} ms')
+    print(motor.clasificacion().head(10).round(1).to_string(index=False))
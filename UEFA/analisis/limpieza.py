@@ -0,0 +1,372 @@
+import argparse
+import io
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from almacenamiento import guardar_tabla
+from caracteristicas import (RUTA_ALMACEN, agregar_por_equipo, construir_almacen, guardar_almacen, puntuar_jugadores,
+                             puntuar_partidos)
+from elo import RUTA_ELO, actualizar_motor
+
+# medicion.py está en la carpeta UEFA
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from medicion import contar, tramo
+
+# Ruta a la carpeta 'data', calculada a partir de este archivo para no depender del directorio desde el que se ejecute
+RUTA_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+# Diccionario con los paises y sus abreviaturas (tablas equipos, overall y partidos)
+PAISES = {
+    'Germany': 'de',
+    'Spain': 'es',
+    'England': 'eng',
+    'Italy': 'it',
+    'France': 'fr',
+    'The Netherlands': 'nl',
+    'Portugal': 'pt',
+    'Belgium': 'be',
+    'Scotland': 'sct',
+    'Ireland': 'ie',
+    'Wales': 'wal',
+    'Czech Republic': 'cz',
+    'Poland': 'pl',
+    'Switzerland': 'ch',
+    'Austria': 'at',
+    'Denmark': 'dk',
+    'Sweden': 'se',
+    'Norway': 'no',
+    'Slovenia': 'si',
+    'Slovakia': 'sk',
+    'Hungary': 'hu',
+    'Romania': 'ro',
+    'Bulgaria': 'bg',
+    'Croatia': 'hr',
+    'Serbia': 'rs',
+    'Greece': 'gr',
+    'Moldova': 'md',
+    'Cyprus': 'cy',
+    'Russia': 'ru',
+    'Belarus': 'by',
+    'Ukraine': 'ua',
+    'Türkiye': 'tr',
+    'Israel': 'il',
+    'Azerbaijan': 'az',
+    'Kazakhstan': 'kz',
+    'Cameroon': 'cm',
+    'Argentina': 'ar'
+}
+
+# Diccionario con los paises y sus abreviaturas (tabla jugadores)
+PAISES_JUGADORES = {
+    'Germany': 'de',
+    'Spain': 'es',
+    'England': 'eng',
+    'Italy': 'it',
+    'France': 'fr',
+    'The Netherlands': 'nl',
+    'Portugal': 'pt',
+    'Belgium': 'be',
+    'Scotland': 'sct',
+    'Ireland': 'ie',
+    'Wales': 'wls',
+    'Czech Republic': 'cz',
+    'Poland': 'pl',
+    'Switzerland': 'ch',
+    'Austria': 'at',
+    'Iceland': 'is',
+    'Denmark': 'dk',
+    'Sweden': 'se',
+    'Norway': 'no',
+    'Finland': 'fi',
+    'Estonia': 'ee',
+    'Slovenia': 'si',
+    'Slovakia': 'sk',
+    'Hungary': 'hu',
+    'Romania': 'ro',
+    'Bulgaria': 'bg',
+    'Albania': 'al',
+    'Montenegro': 'me',
+    'Croatia': 'hr',
+    'Serbia': 'rs',
+    'Bosnia and Herzegovina': 'ba',
+    'North Macedonia': 'mk',
+    'Greece': 'gr',
+    'Moldova': 'md',
+    'Georgia': 'ge',
+    'Cyprus': 'cy',
+    'Russia': 'ru',
+    'Belarus': 'by',
+    'Ukraine': 'ua',
+    'Armenia': 'am',
+    'Türkiye': 'tr',
+    'Azerbaijan': 'az',
+    'Israel': 'il',
+}
+
+# Marcador de un partido, con los penaltis opcionales a cada lado, por ejemplo '2–1' o '(4)1–1(3)'
+RE_MARCADOR = r'^\s*(?:\((?P<penaltis_home>\d+)\)\s*)?(?P<home>\d+)\s*–\s*(?P<away>\d+)\s*(?:\((?P<penaltis_away>\d+)\))?\s*$'
+
+
+def separar_pais(equipos, paises, al_final=False):
+    '''
+    Función que separa la abreviatura del país del nombre de los equipos de una columna.
+
+    Devuelve dos Series: el nombre del equipo sin la abreviatura y el país. La abreviatura se busca al principio del
+    nombre (o al final si 'al_final' es True) siguiendo el orden del diccionario, igual que se hacía en el notebook.
+    Como allí se usaba str.replace, se eliminan todas las apariciones de la abreviatura en el nombre (por eso el
+    'Werder Bremen' se queda en 'Werr Bremen'); lo mantenemos para que los equipos sigan cruzando entre tablas.
+    '''
+    codigos = '|'.join(re.escape(codigo) for codigo in paises.values())
+    patron = f'({codigos})$' if al_final else f'^({codigos})'
+    codigo = equipos.str.extract(patron, expand=False)
+
+    # Quitamos la abreviatura agrupando por país, de modo que solo recorremos los países y no las filas
+    nombres = equipos.copy()
+    for valor in codigo.dropna().unique():
+        filas = codigo == valor
+        nombres[filas] = equipos[filas].str.replace(valor, '', regex=False)
+
+    pais = codigo.map({valor: clave for clave, valor in paises.items()})
+    return nombres, pais
+
+
+def separar_marcador(marcadores):
+    '''
+    Función que separa los marcadores ('2–1' o '(4)1–1(3)' si hubo penaltis) en goles y penaltis de cada equipo
+    '''
+    partes = marcadores.str.extract(RE_MARCADOR)
+    return partes.astype(float).astype('Int64')
+
+
+def calcular_resultados(score_home, score_away):
+    '''
+    Función que devuelve 'H' si gana el equipo local, 'A' si gana el visitante y 'D' si hay empate
+    '''
+    diferencia = score_home - score_away
+    return np.select([diferencia > 0, diferencia < 0], ['H', 'A'], default='D')
+
+
+def limpiar_equipos(equipos):
+    '''
+    Función que limpia la tabla de equipos
+    '''
+    # Borramos las columnas con demasiados valores nulos
+    equipos = equipos.drop(columns=['Poss', 'Min', '90s'])
+
+    # Separamos el país del nombre del equipo y lo añadimos en la posición 2
+    equipos['Squad'], paises = separar_pais(equipos['Squad'], PAISES)
+    equipos.insert(2, 'Country', paises)
+
+    return equipos.dropna()
+
+
+def limpiar_overall(overall):
+    '''
+    Función que limpia la tabla general del torneo
+    '''
+    # Eliminamos las columnas que no nos interesan
+    overall = overall.drop(columns=['Notes'])
+
+    # Separamos el nombre del jugador y el número de goles (rsplit ya que el nombre puede contener guiones)
+    overall[['Top Team Scorer', 'Top Team Scorer Goals']] = overall['Top Team Scorer'].str.rsplit('-', n=1, expand=True)
+
+    # Pasamos a float, quitando antes las comas de la asistencia
+    overall['Attendance'] = overall['Attendance'].str.replace(',', '').astype(float)
+    overall['Top Team Scorer Goals'] = overall['Top Team Scorer Goals'].astype(float)
+
+    # Eliminamos las filas que solo tienen la temporada
+    overall = overall.dropna(thresh=2).reset_index(drop=True)
+
+    # Separamos el país del nombre del equipo y lo añadimos en la posición 3
+    overall['Squad'], paises = separar_pais(overall['Squad'], PAISES)
+    overall.insert(3, 'Country', paises)
+
+    # Los puestos '1' y '2' equivalen a 'W' y 'F'
+    overall['Rk'] = overall['Rk'].replace({'1': 'W', '2': 'F'})
+
+    return overall.dropna()
+
+
+def limpiar_partidos(partidos):
+    '''
+    Función que limpia la tabla de partidos: países, marcador separado y resultado ('H', 'D' o 'A')
+    '''
+    # Eliminamos las filas que solo tienen la temporada y las columnas que no nos interesan
+    partidos = partidos.dropna(thresh=2).reset_index(drop=True)
+    partidos = partidos.drop(columns=['Time', 'Attendance', 'Match Report', 'Notes'])
+    partidos['Date'] = pd.to_datetime(partidos['Date'])
+
+    # En la columna 'Home' la abreviatura del país va al final y en 'Away' al principio
+    partidos['Home'], paises_home = separar_pais(partidos['Home'], PAISES, al_final=True)
+    partidos['Away'], paises_away = separar_pais(partidos['Away'], PAISES)
+    partidos.insert(5, 'Country (Home)', paises_home)
+    partidos.insert(7, 'Country (Away)', paises_away)
+
+    partidos = partidos.dropna()
+
+    # Separamos el resultado en los goles de cada equipo (los penaltis no se guardan)
+    marcador = separar_marcador(partidos['Score'])
+    partidos.insert(6, 'Score (Home)', marcador['home'].astype(int))
+    partidos.insert(7, 'Score (Away)', marcador['away'].astype(int))
+    partidos = partidos.drop(columns=['Score'])
+
+    # Calculamos el ganador a partir de la diferencia de goles
+    partidos.insert(4, 'Results', calcular_resultados(partidos['Score (Home)'], partidos['Score (Away)']))
+
+    return partidos
+
+
+def limpiar_jugadores(jugadores):
+    '''
+    Función que limpia la tabla de jugadores: quitamos el país del equipo para poder cruzarla con la tabla de partidos
+    '''
+    # Los equipos sin abreviatura conocida se quedan como estaban
+    jugadores['Squad'], _ = separar_pais(jugadores['Squad'], PAISES_JUGADORES)
+
+    jugadores = jugadores.dropna()
+
+    # Hacemos que la columna 'Min' sea tipo float
+    jugadores['Min'] = jugadores['Min'].str.replace(',', '.').astype(float)
+
+    return jugadores
+
+
+def unir_equipos(partidos, equipos):
+    '''
+    Función que añade a cada partido toda la información de los dos equipos en esa temporada
+    '''
+    # Agregamos sufijos a las columnas de equipos para distinguir entre el equipo local y el equipo visitante
+    equipos_sufijo_home = equipos.add_suffix('_home')
+    equipos_sufijo_away = equipos.add_suffix('_away')
+
+    # Fusionamos para ambos equipos por separado
+    partidos = pd.merge(partidos, equipos_sufijo_home, left_on=['Season', 'Home', 'Country (Home)'], right_on=['Season_home', 'Squad_home', 'Country_home'], how='left')
+    partidos = pd.merge(partidos, equipos_sufijo_away, left_on=['Season', 'Away', 'Country (Away)'], right_on=['Season_away', 'Squad_away', 'Country_away'], how='left')
+
+    # Eliminamos las columnas duplicadas
+    return partidos.drop(columns=['Season_home', 'Squad_home', 'Country_home', 'Season_away', 'Squad_away', 'Country_away'])
+
+
+def limpiar_todo(ruta_datos=RUTA_DATOS):
+    '''
+    Función que lee las cuatro tablas originales y devuelve un diccionario con las cuatro tablas limpias
+    '''
+    with tramo('limpieza.equipos'):
+        equipos = limpiar_equipos(pd.read_csv(os.path.join(ruta_datos, 'equipos.csv')))
+    with tramo('limpieza.overall'):
+        overall = limpiar_overall(pd.read_csv(os.path.join(ruta_datos, 'overall.csv')))
+    with tramo('limpieza.partidos'):
+        partidos = limpiar_partidos(pd.read_csv(os.path.join(ruta_datos, 'partidos.csv')))
+    with tramo('limpieza.jugadores'):
+        jugadores = puntuar_jugadores(limpiar_jugadores(pd.read_csv(os.path.join(ruta_datos, 'jugadores.csv'))))
+
+    # Las puntuaciones de los equipos se calculan una sola vez y se añaden a los partidos con un único merge
+    with tramo('limpieza.puntuaciones'):
+        partidos = unir_equipos(puntuar_partidos(partidos, agregar_por_equipo(jugadores)), equipos)
+    contar('filas limpiadas', len(equipos) + len(overall) + len(partidos) + len(jugadores))
+
+    return {'equipos': equipos, 'overall': overall, 'partidos': partidos, 'jugadores': jugadores}
+
+
+# Tablas limpias que necesita cada tabla para limpiarse por separado
+DEPENDENCIAS = {'equipos': [], 'overall': [], 'jugadores': [], 'partidos': ['equipos', 'jugadores']}
+
+
+def limpiar_tabla(nombre, ruta_datos=RUTA_DATOS):
+    '''
+    Función que limpia una sola tabla. Los partidos usan los archivos 'equipos_limpio.csv' y 'jugadores_limpio.csv'
+    ya guardados, así que cada tabla se puede limpiar por separado (y las tres primeras a la vez)
+    '''
+    tabla = pd.read_csv(os.path.join(ruta_datos, f'{nombre}.csv'))
+    if nombre == 'equipos':
+        return limpiar_equipos(tabla)
+    if nombre == 'overall':
+        return limpiar_overall(tabla)
+    if nombre == 'jugadores':
+        return puntuar_jugadores(limpiar_jugadores(tabla))
+    # El lector de decimales por defecto de read_csv puede cambiar la última cifra; con 'round_trip' las puntuaciones
+    # son las mismas que cuando se limpian todas las tablas a la vez
+    equipos = pd.read_csv(os.path.join(ruta_datos, 'equipos_limpio.csv'), float_precision='round_trip')
+    jugadores = pd.read_csv(os.path.join(ruta_datos, 'jugadores_limpio.csv'), float_precision='round_trip')
+    return unir_equipos(puntuar_partidos(limpiar_partidos(tabla), agregar_por_equipo(jugadores)), equipos)
+
+
+def guardar_limpios(tablas, ruta_datos=RUTA_DATOS):
+    '''
+    Función que exporta las tablas limpias a los archivos '*_limpio.csv' y a su versión en Parquet con tipos compactos
+    '''
+    for nombre, tabla in tablas.items():
+        tabla.to_csv(os.path.join(ruta_datos, f'{nombre}_limpio.csv'), index=False)
+        guardar_tabla(tabla, nombre, ruta_datos)
+
+
+def comprobar_paridad(tablas, ruta_datos=RUTA_DATOS, tolerancia=0):
+    '''
+    Función que compara las tablas limpias con los '*_limpio.csv' guardados y devuelve una lista con las diferencias.
+
+    Las tablas se comparan tal y como se leen con read_csv. Las columnas decimales se pueden comparar con una tolerancia
+    relativa; por defecto tienen que ser idénticas, ya que las medias se suman en el mismo orden que en limpieza.ipynb.
+    '''
+    diferencias = []
+    for nombre, tabla in tablas.items():
+        esperada = pd.read_csv(os.path.join(ruta_datos, f'{nombre}_limpio.csv'))
+        # Pasamos la tabla nueva por CSV para que los tipos se interpreten igual que en la guardada
+        obtenida = pd.read_csv(io.StringIO(tabla.to_csv(index=False)))
+
+        if list(obtenida.columns) != list(esperada.columns):
+            diferencias.append(f'{nombre}: las columnas no coinciden')
+            continue
+        if len(obtenida) != len(esperada):
+            diferencias.append(f'{nombre}: {len(obtenida)} filas en lugar de {len(esperada)}')
+            continue
+
+        for columna in esperada.columns:
+            a, b = obtenida[columna], esperada[columna]
+            if pd.api.types.is_float_dtype(a) and pd.api.types.is_float_dtype(b):
+                iguales = np.isclose(a, b, rtol=tolerancia, atol=0, equal_nan=True).all()
+            else:
+                iguales = a.equals(b)
+            if not iguales:
+                diferencias.append(f'{nombre}: la columna {columna!r} no coincide')
+    return diferencias
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Limpia los datos de la carpeta data y genera los archivos *_limpio.csv')
+    parser.add_argument('--datos', default=RUTA_DATOS, help='Carpeta con los CSV originales')
+    parser.add_argument('--comprobar', action='store_true',
+                        help='No guarda nada; compara el resultado con los *_limpio.csv actuales')
+    parser.add_argument('--tablas', nargs='+', choices=list(DEPENDENCIAS),
+                        help='Limpia solo estas tablas, sin el almacén de características ni las valoraciones Elo')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.tablas:
+        tablas = {nombre: limpiar_tabla(nombre, args.datos) for nombre in args.tablas}
+    else:
+        tablas = limpiar_todo(args.datos)
+    print(f'Limpieza completada en {time.perf_counter() - inicio:.3f} s')
+
+    if args.comprobar:
+        diferencias = comprobar_paridad(tablas, args.datos)
+        print('\n'.join(diferencias) if diferencias else 'Las tablas limpias coinciden con los CSV guardados.')
+        raise SystemExit(1 if diferencias else 0)
+
+    guardar_limpios(tablas, args.datos)
+    print('Los archivos *_limpio.csv y *_limpio.parquet han sido creados exitosamente.')
+    if args.tablas:
+        raise SystemExit(0)
+
+    # Guardamos también el almacén de características para que los modelos no tengan que repetir la limpieza
+    almacen = construir_almacen(tablas['equipos'], agregar_por_equipo(tablas['jugadores']))
+    guardar_almacen(almacen, os.path.join(args.datos, os.path.basename(RUTA_ALMACEN)))
+    print(f"El archivo '{os.path.basename(RUTA_ALMACEN)}' ha sido creado exitosamente.")
+
+    # Las valoraciones Elo solo se actualizan con los partidos nuevos
+    _, aplicados = actualizar_motor(tablas['partidos'], os.path.join(args.datos, os.path.basename(RUTA_ELO)))
+    print(f"El archivo '{os.path.basename(RUTA_ELO)}' ha sido actualizado con {aplicados} partidos nuevos.")
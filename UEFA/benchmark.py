@@ -0,0 +1,647 @@
+import argparse
+import contextlib
+import csv
+import hashlib
+import html
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+
+import pandas as pd
+
+import medicion
+
+
+RUTA_UEFA = os.path.dirname(os.path.abspath(__file__))
+RUTA_DATOS = os.path.join(RUTA_UEFA, 'data')
+RUTA_BENCHMARK = os.path.join(RUTA_DATOS, 'benchmark')
+# Datos escalados (y páginas e imágenes de prueba) para cada escala, que se generan una vez y se reutilizan
+RUTA_FIXTURES = os.path.join(RUTA_BENCHMARK, 'fixtures')
+RUTA_RESULTADOS = os.path.join(RUTA_BENCHMARK, 'resultados')
+
+WEBSCRAPING = os.path.join(RUTA_UEFA, 'webscraping')
+ANALISIS = os.path.join(RUTA_UEFA, 'analisis')
+SUPERVISADO = os.path.join(RUTA_UEFA, 'modelos', 'aprendizaje supervisado')
+REFUERZO = os.path.join(RUTA_UEFA, 'modelos', 'aprendizaje por refuerzo')
+PROFUNDO = os.path.join(RUTA_UEFA, 'modelos', 'aprendizaje profundo')
+NO_SUPERVISADO = os.path.join(RUTA_UEFA, 'modelos', 'aprendizaje no supervisado')
+RUTA_JUGADORES = os.path.join(RUTA_UEFA, 'img', 'jugadores')
+
+TABLAS = ['equipos', 'jugadores', 'partidos', 'overall']
+
+# Años que se desplaza cada copia de los datos al escalarlos. Al ser múltiplo de 4 y 28 años después el calendario se
+# repite, las fechas siguen existiendo (29 de febrero incluido) y caen en el mismo día de la semana
+DESPLAZAMIENTO = 28
+
+# Último año completo que cabe en una fecha de pandas (en nanosegundos llegan hasta abril de 2262). Las temporadas se
+# desplazan siempre, pero las fechas solo mientras caben: a partir de ahí vuelven a empezar desde las originales
+ANO_MAXIMO = 2261
+
+# Versión del formato de los fixtures; si cambia cómo se generan, se vuelven a generar
+VERSION_FIXTURES = 1
+
+ESCALAS = [1, 10, 100]
+
+# Simulaciones del cuadro por cada unidad de escala
+SIMULACIONES = 100_000
+
+
+class CasoOmitido(Exception):
+    '''
+    Error que lanza un caso cuando no se puede medir en este entorno (por ejemplo, si falta PyTorch)
+    '''
+
+
+def desplazar_temporada(temporada, anos):
+    return '-'.join(str(int(ano) + anos) for ano in temporada.split('-'))
+
+
+def escalar_csv(origen, destino, factor):
+    '''
+    Función que escribe un CSV con 'factor' copias de las filas de otro. Cada copia desplaza las temporadas
+    DESPLAZAMIENTO años, así que las copias son temporadas nuevas; las fechas se desplazan igual mientras no pasen de
+    ANO_MAXIMO. El resto del texto se copia tal cual
+    '''
+    with open(origen, newline='', encoding='utf-8') as archivo:
+        lector = csv.reader(archivo)
+        encabezado = next(lector)
+        filas = list(lector)
+    temporada = encabezado.index('Season')
+    fecha = encabezado.index('Date') if 'Date' in encabezado else None
+    if fecha is not None:
+        ultimo_ano = max((int(fila[fecha][:4]) for fila in filas if fila[fecha]), default=ANO_MAXIMO)
+        ciclo = max(1, (ANO_MAXIMO - ultimo_ano) // DESPLAZAMIENTO + 1)
+
+    with open(destino + '.tmp', 'w', newline='', encoding='utf-8') as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(encabezado)
+        for copia in range(factor):
+            anos = DESPLAZAMIENTO * copia
+            for fila in filas:
+                if copia:
+                    fila = list(fila)
+                    fila[temporada] = desplazar_temporada(fila[temporada], anos)
+                    if fecha is not None and fila[fecha]:
+                        anos_fecha = DESPLAZAMIENTO * (copia % ciclo)
+                        fila[fecha] = str(int(fila[fecha][:4]) + anos_fecha) + fila[fecha][4:]
+                escritor.writerow(fila)
+    os.replace(destino + '.tmp', destino)
+
+
+def hash_archivos(rutas, *extra):
+    resumen = hashlib.sha256(json.dumps(extra).encode())
+    for ruta in rutas:
+        with open(ruta, 'rb') as archivo:
+            for bloque in iter(lambda: archivo.read(1 << 20), b''):
+                resumen.update(bloque)
+    return resumen.hexdigest()
+
+
+def carpeta_al_dia(carpeta, huella):
+    '''
+    Función que indica si una carpeta de fixtures se generó con la misma huella
+    '''
+    ruta = os.path.join(carpeta, 'huella.txt')
+    if not os.path.exists(ruta):
+        return False
+    with open(ruta, encoding='utf-8') as archivo:
+        return archivo.read() == huella
+
+
+def marcar_al_dia(carpeta, huella):
+    with open(os.path.join(carpeta, 'huella.txt'), 'w', encoding='utf-8') as archivo:
+        archivo.write(huella)
+
+
+def preparar_datos(escala, ruta_datos=RUTA_DATOS):
+    '''
+    Función que genera (si no está ya generada) la carpeta de datos de una escala: los cuatro CSV originales escalados
+    y, con limpieza.py, sus tablas limpias, el almacén de características y las valoraciones Elo
+    '''
+    carpeta = os.path.join(RUTA_FIXTURES, f'x{escala}')
+    originales = [os.path.join(ruta_datos, f'{tabla}.csv') for tabla in TABLAS]
+    huella = hash_archivos(originales, escala, VERSION_FIXTURES)
+    if carpeta_al_dia(carpeta, huella):
+        return carpeta
+
+    shutil.rmtree(carpeta, ignore_errors=True)
+    os.makedirs(carpeta)
+    for tabla, origen in zip(TABLAS, originales):
+        escalar_csv(origen, os.path.join(carpeta, f'{tabla}.csv'), escala)
+    subprocess.run([sys.executable, 'limpieza.py', '--datos', carpeta], cwd=ANALISIS, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    marcar_al_dia(carpeta, huella)
+    return carpeta
+
+
+def tabla_html(tabla, id_tabla, encabezado, filas):
+    '''
+    Función que escribe una tabla como las de fbref: cada celda con su atributo 'data-stat', la primera de cada fila
+    como <th> y, si la tabla la tiene, una fila inicial de grupos de columnas
+    '''
+    estadisticas = [f'c{i}' for i in range(len(encabezado))]
+    partes = [f'<table class="stats_table" id="{id_tabla}"><thead>']
+    if tabla.saltar_filas:
+        partes.append('<tr class="over_header">' + '<th></th>' * tabla.saltar_filas + '</tr>')
+    partes.append('<tr>' + ''.join(f'<th data-stat="{estadistica}">{html.escape(texto)}</th>'
+                                    for estadistica, texto in zip(estadisticas, encabezado)) + '</tr></thead><tbody>')
+    for fila in filas:
+        celdas = [f'<{"th" if i == 0 else "td"} data-stat="{estadistica}">{html.escape(texto)}</{"th" if i == 0 else "td"}>'
+                  for i, (estadistica, texto) in enumerate(zip(estadisticas, fila))]
+        partes.append('<tr>' + ''.join(celdas) + '</tr>')
+    partes.append('</tbody></table>')
+    return ''.join(partes)
+
+
+def crear_paginas(carpeta, escala, ruta_datos=RUTA_DATOS):
+    '''
+    Función que genera páginas como las de fbref (con la misma estructura de rutas que sirve servidor_local.py) a partir
+    de los CSV originales: una por temporada y tipo de página, con las filas de cada temporada repetidas 'escala' veces.
+    Antes de cada tabla hay otra tabla con otro id y las mismas filas, que los analizadores tienen que saltarse como
+    el resto de tablas de una página real
+    '''
+    import equipos
+    import jugadores
+    import overall
+    import partidos
+
+    # Tablas de cada tipo de página y ruta de la página de cada temporada, como en los URLs de los scrapers
+    paginas = {
+        'stats': ([equipos, jugadores], '/en/comps/8/{t}/stats/{t}-Champions-League-Stats'),
+        'schedule': ([partidos], '/en/comps/8/{t}/schedule/{t}-Champions-League-Scores-and-Fixtures'),
+        'overall': ([overall], '/en/comps/8/{t}/{t}-Champions-League-Stats'),
+    }
+    datos = {}
+    for modulo in (equipos, jugadores, partidos, overall):
+        with open(os.path.join(ruta_datos, f'{modulo.__name__}.csv'), newline='', encoding='utf-8') as archivo:
+            lector = csv.reader(archivo)
+            encabezado = next(lector)
+            por_temporada = {}
+            for fila in lector:
+                por_temporada.setdefault(fila[0], []).append(fila[1:])
+        datos[modulo.__name__] = (encabezado[1:], por_temporada)
+
+    for modulos, plantilla in paginas.values():
+        temporadas = sorted({temporada for modulo in modulos for temporada in datos[modulo.__name__][1]})
+        for temporada in temporadas:
+            partes = ['<!DOCTYPE html><html><head><title>fbref</title></head><body><div id="content">']
+            for modulo in modulos:
+                tabla = modulo.TABLA
+                encabezado, por_temporada = datos[modulo.__name__]
+                filas = por_temporada.get(temporada, []) * escala
+                id_tabla = f'{temporada}{tabla.id_tabla}' if tabla.id_parcial else tabla.id_tabla
+                partes.append(tabla_html(tabla, 'relleno', encabezado, filas))
+                partes.append(f'<div class="section_heading"><{tabla.etiqueta} data-label="{html.escape(tabla.data_label)}">'
+                              f'{html.escape(tabla.data_label)}</{tabla.etiqueta}></div>')
+                partes.append(f'<div class="table_container">{tabla_html(tabla, id_tabla, encabezado, filas)}</div>')
+            partes.append('</div></body></html>')
+
+            ruta = os.path.join(carpeta, *plantilla.format(t=temporada).strip('/').split('/'))
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            with open(ruta, 'w', encoding='utf-8') as archivo:
+                archivo.write(''.join(partes))
+
+
+def preparar_paginas(escala, ruta_datos=RUTA_DATOS):
+    '''
+    Función que genera (si no están ya generadas) las páginas de prueba de una escala
+    '''
+    carpeta = os.path.join(RUTA_FIXTURES, f'x{escala}', 'paginas')
+    huella = hash_archivos([os.path.join(ruta_datos, f'{tabla}.csv') for tabla in TABLAS], escala, VERSION_FIXTURES)
+    if not carpeta_al_dia(carpeta, huella):
+        shutil.rmtree(carpeta, ignore_errors=True)
+        en_proceso(WEBSCRAPING, crear_paginas, carpeta, escala, ruta_datos)
+        marcar_al_dia(carpeta, huella)
+    return carpeta
+
+
+def copiar_imagenes(carpeta, escala):
+    '''
+    Función que copia en una carpeta las imágenes de img/jugadores repetidas 'escala' veces (con enlaces duros cuando
+    el sistema lo permite, para no ocupar más disco)
+    '''
+    from imagenes import RUTA_JUGADORES, listar_imagenes
+    clases, rutas, etiquetas = listar_imagenes(RUTA_JUGADORES)
+    for ruta, etiqueta in zip(rutas, etiquetas):
+        os.makedirs(os.path.join(carpeta, clases[etiqueta]), exist_ok=True)
+        for copia in range(escala):
+            destino = os.path.join(carpeta, clases[etiqueta], f'{copia}_{os.path.basename(ruta)}')
+            try:
+                os.link(ruta, destino)
+            except OSError:
+                shutil.copyfile(ruta, destino)
+
+
+def preparar_imagenes(escala):
+    '''
+    Función que devuelve la carpeta de imágenes de una escala, generándola si no está ya generada
+    '''
+    if escala == 1:
+        return RUTA_JUGADORES
+    carpeta = os.path.join(RUTA_FIXTURES, f'x{escala}', 'imagenes')
+    huella = json.dumps([escala, sorted(os.path.relpath(os.path.join(raiz, archivo), RUTA_JUGADORES)
+                                        for raiz, _, archivos in os.walk(RUTA_JUGADORES) for archivo in archivos)])
+    if not carpeta_al_dia(carpeta, huella):
+        shutil.rmtree(carpeta, ignore_errors=True)
+        en_proceso(PROFUNDO, copiar_imagenes, carpeta, escala)
+        marcar_al_dia(carpeta, huella)
+    return carpeta
+
+
+# Casos del benchmark. Cada uno prepara sus datos (sin medir) y devuelve la función que se mide y las unidades que
+# procesa cada vez, con las que se calcula el rendimiento. Los contadores de medicion.py también cuentan como unidades
+
+def caso_parseo(fixtures, escala, analizador):
+    from benchmark_parseo import tablas_de_pagina
+    from parseo import ANALIZADORES, extraer_tabla
+    if analizador not in ANALIZADORES:
+        raise CasoOmitido(f"El analizador '{analizador}' no está instalado")
+
+    paginas = []
+    for raiz, _, archivos in os.walk(fixtures['paginas']):
+        for archivo in sorted(archivos):
+            if archivo == 'huella.txt':
+                continue
+            with open(os.path.join(raiz, archivo), encoding='utf-8') as f:
+                paginas.append((f.read(), list(tablas_de_pagina(os.path.join(raiz, archivo)).values())))
+
+    def funcion():
+        for pagina, tablas in paginas:
+            for tabla in tablas:
+                extraer_tabla(pagina, tabla, analizador)
+
+    return funcion, {'páginas': len(paginas), 'MB de HTML': sum(len(pagina) for pagina, _ in paginas) / 1e6}
+
+
+def caso_scraping(fixtures, escala):
+    '''
+    Los cuatro scrapers completos (descarga, extracción y escritura del CSV) contra un servidor local que sirve las
+    páginas de prueba, sin caché de páginas, sin límite de peticiones y sin modo incremental. El servidor se ejecuta en
+    el mismo proceso, así que su CPU también cuenta
+    '''
+    import tempfile
+    import threading
+    from servidor_local import crear_servidor
+
+    servidor = crear_servidor(fixtures['paginas'], 0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    os.environ.update({'FBREF_URL_BASE': f'http://127.0.0.1:{servidor.server_address[1]}',
+                       'FBREF_PETICIONES_POR_MINUTO': '0', 'FBREF_USAR_CACHE': '0', 'FBREF_INCREMENTAL': '0'})
+    import config
+    from main import SCRAPERS, ejecutar_scrapers
+
+    # Los CSV se escriben en una carpeta temporal para no tocar los de data
+    config.RUTA_DATOS = tempfile.mkdtemp(prefix='benchmark_')
+    config.RUTA_MANIFIESTOS = os.path.join(config.RUTA_DATOS, 'manifiestos')
+    return lambda: ejecutar_scrapers(list(SCRAPERS)), {}
+
+
+def caso_limpieza(fixtures, escala):
+    from limpieza import limpiar_todo
+    filas = sum(len(pd.read_csv(os.path.join(fixtures['datos'], f'{tabla}.csv'), usecols=[0])) for tabla in TABLAS)
+    return lambda: limpiar_todo(fixtures['datos']), {'filas': filas}
+
+
+def caso_caracteristicas(fixtures, escala):
+    from caracteristicas import agregar_por_equipo, construir_almacen, puntuar_jugadores
+    jugadores = pd.read_csv(os.path.join(fixtures['datos'], 'jugadores_limpio.csv'))
+    equipos = pd.read_csv(os.path.join(fixtures['datos'], 'equipos_limpio.csv'))
+    return (lambda: construir_almacen(equipos, agregar_por_equipo(puntuar_jugadores(jugadores))),
+            {'filas': len(jugadores)})
+
+
+def caso_elo(fixtures, escala):
+    from elo import MotorElo
+    partidos = pd.read_csv(os.path.join(fixtures['datos'], 'partidos_limpio.csv'))
+    return lambda: MotorElo().actualizar(partidos), {'partidos': len(partidos)}
+
+
+def caso_clasificacion(fixtures, escala):
+    '''
+    Ajuste de los modelos de clasificacion.ipynb (Regresión Logística, SVC y XGBoost) con todos los partidos
+    '''
+    from prediccion import entrenar_modelos
+    from elo import MotorElo
+    partidos = pd.read_csv(os.path.join(fixtures['datos'], 'partidos_limpio.csv'))
+    almacen = pd.read_parquet(os.path.join(fixtures['datos'], 'caracteristicas_equipos.parquet'))
+    motor = MotorElo()
+    motor.actualizar(partidos)
+    return lambda: entrenar_modelos(partidos, almacen, motor), {'partidos': len(partidos)}
+
+
+def caso_prediccion(fixtures, escala):
+    '''
+    Probabilidades exactas de un cuadro de 16 equipos por temporada y modelo, con la caché del predictor vacía
+    '''
+    from prediccion import Predictor, entrenar_modelos
+    from elo import MotorElo
+    partidos = pd.read_csv(os.path.join(fixtures['datos'], 'partidos_limpio.csv'))
+    almacen = pd.read_parquet(os.path.join(fixtures['datos'], 'caracteristicas_equipos.parquet'))
+    motor = MotorElo()
+    motor.actualizar(partidos)
+    modelos = entrenar_modelos(partidos, almacen, motor)
+    cuadros = [(str(temporada), list(equipos.astype(str))[:16])
+               for temporada, equipos in almacen.groupby('Season', observed=True)['Squad'] if len(equipos) >= 16]
+
+    def funcion():
+        predictor = Predictor(modelos, almacen, motor)
+        for temporada, cuadro in cuadros:
+            for modelo in modelos:
+                predictor.evaluar_cuadro(cuadro, temporada, modelo)
+
+    return funcion, {'cuadros': len(cuadros) * len(modelos)}
+
+
+def caso_simulacion(fixtures, escala):
+    '''
+    Matrices de transición de markov.ipynb y simulación de un cuadro de 16 equipos (SIMULACIONES por unidad de escala)
+    '''
+    from simulacion import ModeloMarkov, simular_eliminatoria
+    partidos = pd.read_csv(os.path.join(fixtures['datos'], 'partidos_limpio.csv'))
+
+    def funcion():
+        modelo = ModeloMarkov.desde_partidos(partidos)
+        simular_eliminatoria(modelo, list(modelo.equipos[:16]), SIMULACIONES * escala, procesos=1)
+
+    return funcion, {'partidos': len(partidos)}
+
+
+def caso_imagenes(fixtures, escala):
+    '''
+    Decodificación y preprocesado de las imágenes de tl.ipynb en un almacén nuevo (sin reutilizar nada)
+    '''
+    import tempfile
+    from imagenes import construir_almacen, listar_imagenes
+    imagenes = len(listar_imagenes(fixtures['imagenes'])[1])
+    ruta_cache = tempfile.mkdtemp(prefix='benchmark_')
+
+    def funcion():
+        shutil.rmtree(ruta_cache, ignore_errors=True)
+        construir_almacen(fixtures['imagenes'], 'tl', ruta_cache)
+
+    return funcion, {'imágenes': imagenes}
+
+
+def caso_embeddings(fixtures, escala):
+    '''
+    Paso de las imágenes por la ResNet-34 congelada de tl.ipynb (sin sus pesos preentrenados, que no cambian el tiempo)
+    y una época de entrenamiento de la capa 'fc' con los embeddings
+    '''
+    import tempfile
+    try:
+        import torch
+        from torchvision import models
+    except ImportError:
+        raise CasoOmitido('PyTorch y torchvision no están instalados')
+    from imagenes import calcular_embeddings, construir_almacen
+
+    ruta_cache = tempfile.mkdtemp(prefix='benchmark_')
+    almacen = construir_almacen(fixtures['imagenes'], 'tl', ruta_cache)
+    red = models.resnet34(weights=None)
+    red.fc = torch.nn.Linear(red.fc.in_features, len(almacen.clases))
+
+    def funcion():
+        for archivo in os.listdir(os.path.join(ruta_cache, 'tl')):
+            if archivo.startswith('embeddings_'):
+                os.remove(os.path.join(ruta_cache, 'tl', archivo))
+        embeddings = calcular_embeddings(red, almacen, ruta_cache)
+        optimizador = torch.optim.SGD(red.fc.parameters(), lr=0.001, momentum=0.9)
+        etiquetas = torch.from_numpy(almacen.etiquetas)
+        for inicio in range(0, len(embeddings), 30):
+            optimizador.zero_grad()
+            perdida = torch.nn.functional.cross_entropy(red.fc(embeddings[inicio:inicio + 30]),
+                                                        etiquetas[inicio:inicio + 30])
+            perdida.backward()
+            optimizador.step()
+
+    return funcion, {'imágenes': len(almacen)}
+
+
+def caso_clustering(fixtures, escala):
+    '''
+    Codificación y escalado de la tabla de jugadores y ajuste de todos los algoritmos de clustering.ipynb en un proceso
+    '''
+    import tempfile
+    from clasterizacion import agrupar, matriz_tabla
+    ruta_csv = os.path.join(fixtures['datos'], 'jugadores_limpio.csv')
+    ruta_cache = tempfile.mkdtemp(prefix='benchmark_')
+    filas = len(pd.read_csv(ruta_csv, usecols=[0]))
+
+    def funcion():
+        shutil.rmtree(ruta_cache, ignore_errors=True)
+        agrupar(matriz_tabla(ruta_csv, ruta_cache=ruta_cache), procesos=1)
+
+    return funcion, {'filas': filas}
+
+
+# Por caso: carpeta de sus módulos, función que lo prepara, fixtures que necesita y escala máxima. Las páginas y las
+# imágenes ocupan mucho disco a escala 100, BeautifulSoup tarda decenas de segundos con las páginas de escala 1 y el
+# coste del ajuste del SVC crece con el cuadrado de los partidos (a escala 10 ya tarda decenas de segundos)
+CASOS = {
+    'parseo_bs4': (WEBSCRAPING, partial(caso_parseo, analizador='bs4'), ['paginas'], 1),
+    'parseo_lxml': (WEBSCRAPING, partial(caso_parseo, analizador='lxml'), ['paginas'], 10),
+    'scraping': (WEBSCRAPING, caso_scraping, ['paginas'], 10),
+    'limpieza': (ANALISIS, caso_limpieza, ['datos'], None),
+    'caracteristicas': (ANALISIS, caso_caracteristicas, ['datos'], None),
+    'elo': (ANALISIS, caso_elo, ['datos'], None),
+    'clasificacion': (SUPERVISADO, caso_clasificacion, ['datos'], 10),
+    'prediccion': (SUPERVISADO, caso_prediccion, ['datos'], 10),
+    'simulacion': (REFUERZO, caso_simulacion, ['datos'], None),
+    'imagenes': (PROFUNDO, caso_imagenes, ['imagenes'], 10),
+    'embeddings': (PROFUNDO, caso_embeddings, ['imagenes'], 10),
+    'clustering': (NO_SUPERVISADO, caso_clustering, ['datos'], None),
+}
+
+
+def en_proceso(carpeta, funcion, *argumentos):
+    '''
+    Función que ejecuta una función de este módulo en un proceso nuevo con los módulos de una carpeta en el path. Cada
+    caso se mide en su propio proceso para que su pico de memoria no incluya el de los casos anteriores
+    '''
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as ejecutor:
+        return ejecutor.submit(_ejecutar_en_carpeta, carpeta, funcion, *argumentos).result()
+
+
+def _ejecutar_en_carpeta(carpeta, funcion, *argumentos):
+    sys.path.insert(0, carpeta)
+    return funcion(*argumentos)
+
+
+def medir_caso(nombre, fixtures, escala, repeticiones):
+    '''
+    Función que prepara un caso y lo ejecuta varias veces midiendo el tiempo de reloj, la CPU y el pico de memoria.
+    Devuelve la mediana de las repeticiones, el rendimiento por unidad y los tramos y contadores de la última
+    '''
+    _, preparar, _, _ = CASOS[nombre]
+    warnings.simplefilter('ignore')
+    resultado = {'caso': nombre, 'escala': escala}
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            funcion, unidades = preparar(fixtures, escala)
+    except CasoOmitido as error:
+        return {**resultado, 'estado': 'omitido', 'motivo': str(error)}
+    memoria_preparacion = medicion.pico_memoria()
+
+    tiempos, tiempos_cpu = [], []
+    for _ in range(repeticiones):
+        medidor = medicion.activar()
+        inicio, inicio_cpu = time.perf_counter(), medicion.segundos_cpu()
+        with contextlib.redirect_stdout(io.StringIO()):
+            funcion()
+        tiempos.append(time.perf_counter() - inicio)
+        tiempos_cpu.append(medicion.segundos_cpu() - inicio_cpu)
+        medicion.desactivar()
+
+    segundos = statistics.median(tiempos)
+    resumen = medidor.resumen()
+    unidades = {**unidades, **resumen['contadores']}
+    return {
+        **resultado,
+        'estado': 'completado',
+        'repeticiones': repeticiones,
+        'segundos': round(segundos, 6),
+        'segundos min': round(min(tiempos), 6),
+        'segundos cpu': round(statistics.median(tiempos_cpu), 6),
+        'pico memoria': medicion.pico_memoria(),
+        'memoria preparacion': memoria_preparacion,
+        'unidades': unidades,
+        'rendimiento': {f'{unidad}/s': round(cantidad / segundos, 3) for unidad, cantidad in unidades.items()},
+        'tramos': resumen['tramos'],
+    }
+
+
+def preparar_fixtures(caso, escala, ruta_paginas=None):
+    '''
+    Función que genera los fixtures que necesita un caso a una escala y devuelve sus rutas
+    '''
+    _, _, necesarios, _ = CASOS[caso]
+    fixtures = {}
+    if 'datos' in necesarios:
+        fixtures['datos'] = preparar_datos(escala)
+    if 'paginas' in necesarios:
+        fixtures['paginas'] = ruta_paginas or preparar_paginas(escala)
+    if 'imagenes' in necesarios:
+        fixtures['imagenes'] = preparar_imagenes(escala)
+    return fixtures
+
+
+def commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=RUTA_UEFA, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(casos, escalas, repeticiones=3, ruta_paginas=None):
+    '''
+    Función que mide los casos indicados a cada escala, cada uno en un proceso nuevo, y devuelve los resultados junto
+    con los datos del entorno en que se han medido
+    '''
+    resultados = []
+    for caso in casos:
+        carpeta, _, _, escala_maxima = CASOS[caso]
+        # Con páginas reales la escala no cambia nada, así que se miden una sola vez
+        escalas_caso = [1] if ruta_paginas and carpeta == WEBSCRAPING else escalas
+        for escala in escalas_caso:
+            if escala_maxima is not None and escala > escala_maxima:
+                continue
+            try:
+                resultado = en_proceso(carpeta, medir_caso, caso, preparar_fixtures(caso, escala, ruta_paginas),
+                                       escala, repeticiones)
+            except Exception as error:
+                resultado = {'caso': caso, 'escala': escala, 'estado': 'fallido', 'motivo': repr(error)}
+            resultados.append(resultado)
+            mostrar_resultado(resultado)
+
+    return {
+        'commit': commit_actual(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'procesadores': os.cpu_count(),
+        'repeticiones': repeticiones,
+        'paginas': 'reales' if ruta_paginas else 'sinteticas',
+        'resultados': resultados,
+    }
+
+
+def mostrar_resultado(resultado):
+    inicio = f"{resultado['caso']:<16} x{resultado['escala']:<4}"
+    if resultado['estado'] != 'completado':
+        print(f"{inicio} {resultado['estado']}: {resultado['motivo']}", flush=True)
+        return
+    memoria = f"{resultado['pico memoria'] / 1e6:>8.1f} MB" if resultado['pico memoria'] else '       - MB'
+    rendimiento = ', '.join(f'{valor:,.1f} {unidad}' for unidad, valor in resultado['rendimiento'].items())
+    print(f"{inicio} {resultado['segundos']:>9.3f} s {resultado['segundos cpu']:>9.3f} s cpu {memoria}  {rendimiento}",
+          flush=True)
+
+
+def comparar(actual, base, umbral=0.2):
+    '''
+    Función que compara el tiempo y la memoria de dos ejecuciones del benchmark caso a caso y devuelve un DataFrame con
+    los cocientes (actual / base) y si el tiempo ha empeorado más que el umbral
+    '''
+    anteriores = {(r['caso'], r['escala']): r for r in base['resultados'] if r['estado'] == 'completado'}
+    filas = []
+    for resultado in actual['resultados']:
+        anterior = anteriores.get((resultado['caso'], resultado['escala']))
+        if resultado['estado'] != 'completado' or anterior is None:
+            continue
+        tiempo = resultado['segundos'] / anterior['segundos']
+        memoria = (resultado['pico memoria'] / anterior['pico memoria']
+                   if resultado['pico memoria'] and anterior['pico memoria'] else None)
+        filas.append({'caso': resultado['caso'], 'escala': resultado['escala'], 'segundos base': anterior['segundos'],
+                      'segundos': resultado['segundos'], 'tiempo': tiempo, 'memoria': memoria,
+                      'empeora': tiempo > 1 + umbral})
+    return pd.DataFrame(filas, columns=['caso', 'escala', 'segundos base', 'segundos', 'tiempo', 'memoria', 'empeora'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mide el tiempo, la CPU, la memoria y el rendimiento de cada etapa del '
+                                                 'pipeline con datos escalados')
+    parser.add_argument('--casos', nargs='+', choices=list(CASOS), default=list(CASOS))
+    parser.add_argument('--escalas', nargs='+', type=int, default=ESCALAS,
+                        help='Veces que se multiplican los datos actuales')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--paginas', default=None,
+                        help='Carpeta con páginas reales de fbref (misma estructura que servidor_local.py) en lugar '
+                             'de las páginas generadas')
+    parser.add_argument('--salida', default=None,
+                        help="JSON con los resultados (por defecto, en 'data/benchmark/resultados')")
+    parser.add_argument('--comparar', default=None, help='JSON de otra ejecución con el que se comparan los tiempos')
+    parser.add_argument('--umbral', type=float, default=0.2,
+                        help='Empeoramiento del tiempo a partir del cual el programa termina con código 1')
+    args = parser.parse_args()
+
+    resultados = ejecutar(args.casos, args.escalas, args.repeticiones,
+                          os.path.abspath(args.paginas) if args.paginas else None)
+
+    salida = args.salida
+    if salida is None:
+        os.makedirs(RUTA_RESULTADOS, exist_ok=True)
+        fecha = datetime.now().strftime('%Y%m%d_%H%M%S')
+        salida = os.path.join(RUTA_RESULTADOS, f"{fecha}_{(resultados['commit'] or 'sin_commit')[:8]}.json")
+    with open(salida, 'w', encoding='utf-8') as archivo:
+        json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en '{salida}'")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            comparacion = comparar(resultados, json.load(archivo), args.umbral)
+        print(comparacion.round(3).to_string(index=False))
+        if comparacion['empeora'].any():
+            print(f'\nHay casos más de un {args.umbral:.0%} más lentos que en la ejecución de referencia')
+            raise SystemExit(1)
@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+# resource solo existe en Linux y macOS: sin él no se puede medir el pico de memoria
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class Medidor:
+    '''
+    Clase que acumula los tramos de tiempo y los contadores que registran los módulos del pipeline. Es segura entre
+    hilos, ya que los scrapers registran sus descargas desde varios hilos a la vez. Lo que se registra dentro de otros
+    procesos (por ejemplo, en los ajustes repartidos por entrenamiento.py) no llega al medidor
+    '''
+
+    def __init__(self):
+        # Por tramo: número de veces que se ha ejecutado, segundos de reloj y segundos de CPU del hilo que lo ejecuta
+        self.tramos = {}
+        self.contadores = {}
+        self.cerrojo = threading.Lock()
+
+    def sumar_tramo(self, nombre, segundos, segundos_cpu):
+        with self.cerrojo:
+            tramo = self.tramos.setdefault(nombre, {'llamadas': 0, 'segundos': 0.0, 'segundos cpu': 0.0})
+            tramo['llamadas'] += 1
+            tramo['segundos'] += segundos
+            tramo['segundos cpu'] += segundos_cpu
+
+    def contar(self, nombre, cantidad=1):
+        with self.cerrojo:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def resumen(self):
+        with self.cerrojo:
+            return {
+                'tramos': {nombre: {clave: round(valor, 6) for clave, valor in tramo.items()}
+                           for nombre, tramo in sorted(self.tramos.items())},
+                'contadores': dict(sorted(self.contadores.items())),
+            }
+
+
+# Medidor activo; mientras sea None los tramos y contadores no hacen nada
+_medidor = None
+
+
+def activar(medidor=None):
+    '''
+    Función que empieza a registrar los tramos y contadores en un medidor (uno nuevo si no se indica) y lo devuelve
+    '''
+    global _medidor
+    _medidor = medidor or Medidor()
+    return _medidor
+
+
+def desactivar():
+    '''
+    Función que deja de registrar y devuelve el medidor que estaba activo
+    '''
+    global _medidor
+    medidor, _medidor = _medidor, None
+    return medidor
+
+
+@contextmanager
+def tramo(nombre):
+    '''
+    Función que mide el tiempo de reloj y de CPU de un bloque 'with'. Si no hay un medidor activo no mide nada
+    '''
+    medidor = _medidor
+    if medidor is None:
+        yield
+        return
+    inicio, inicio_cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        medidor.sumar_tramo(nombre, time.perf_counter() - inicio, time.thread_time() - inicio_cpu)
+
+
+def contar(nombre, cantidad=1):
+    '''
+    Función que suma una cantidad (filas, páginas, imágenes...) a un contador si hay un medidor activo
+    '''
+    medidor = _medidor
+    if medidor is not None:
+        medidor.contar(nombre, cantidad)
+
+
+def segundos_cpu():
+    '''
+    Función que devuelve los segundos de CPU (usuario y sistema) del proceso y de los subprocesos que ya han terminado
+    '''
+    tiempos = os.times()
+    return tiempos.user + tiempos.system + tiempos.children_user + tiempos.children_system
+
+
+def pico_memoria():
+    '''
+    Función que devuelve el pico de memoria residente (RSS), en bytes, del proceso y del mayor de sus subprocesos
+    terminados. Devuelve None si el sistema no permite medirlo
+    '''
+    if resource is None:
+        return None
+    # ru_maxrss está en kilobytes en Linux y en bytes en macOS
+    unidad = 1 if sys.platform == 'darwin' else 1024
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * unidad
+
+
+def medir_script(ruta_script, argumentos):
+    '''
+    Función que ejecuta un script como si se lanzara con 'python script.py argumentos' registrando sus tramos y
+    contadores. Devuelve el resumen con el tiempo, la CPU y el pico de memoria, y el código de salida del script
+    '''
+    # El script importa los módulos de su carpeta, y los módulos que registran tramos importan este archivo
+    sys.path[0:1] = [os.path.dirname(os.path.abspath(ruta_script)), os.path.dirname(os.path.abspath(__file__))]
+    sys.argv = [ruta_script, *argumentos]
+    medidor = activar()
+    inicio, inicio_cpu = time.perf_counter(), segundos_cpu()
+    codigo = 0
+    try:
+        runpy.run_path(ruta_script, run_name='__main__')
+    except SystemExit as salida:
+        codigo = salida.code if isinstance(salida.code, int) else (0 if salida.code is None else 1)
+    except Exception:
+        # Guardamos también la medición de los scripts que fallan
+        traceback.print_exc()
+        codigo = 1
+    resumen = {
+        'script': os.path.basename(ruta_script),
+        'segundos': round(time.perf_counter() - inicio, 6),
+        'segundos cpu': round(segundos_cpu() - inicio_cpu, 6),
+        'pico memoria': pico_memoria(),
+        'codigo': codigo,
+        **medidor.resumen(),
+    }
+    desactivar()
+    return resumen, codigo
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ejecuta un script del pipeline midiendo su tiempo, CPU, memoria y '
+                                                 'los tramos y contadores que registran sus módulos')
+    parser.add_argument('--salida', required=True, help='JSON donde se guarda la medición')
+    parser.add_argument('script', help='Script que se ejecuta')
+    parser.add_argument('argumentos', nargs=argparse.REMAINDER, help='Argumentos del script')
+    args = parser.parse_args()
+
+    # Los módulos del script importan 'medicion', que tiene que ser el mismo módulo que registra los tramos
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import medicion
+
+    resumen, codigo = medicion.medir_script(args.script, args.argumentos)
+    os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(resumen, archivo, indent=2, ensure_ascii=False)
+    raise SystemExit(codigo)
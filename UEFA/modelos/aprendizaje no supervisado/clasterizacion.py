@@ -0,0 +1,367 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.cluster import DBSCAN, OPTICS, AgglomerativeClustering, Birch, KMeans, MeanShift, MiniBatchKMeans, \
+    estimate_bandwidth
+from sklearn.metrics import silhouette_score
+from sklearn.mixture import GaussianMixture
+from sklearn.neighbors import NearestNeighbors
+
+# medicion.py está en la carpeta UEFA
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from medicion import contar, tramo
+
+# Ruta a la carpeta 'data', calculada a partir de este archivo para no depender del directorio desde el que se ejecute
+RUTA_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data')
+
+# Carpeta donde se guardan las matrices ya codificadas y escaladas
+RUTA_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache_clustering')
+
+# Columnas que comparten codificación, como en clustering.ipynb: un mismo equipo o país tiene el mismo código
+# tanto si juega en casa como fuera
+GRUPOS_CODIFICACION = {
+    'Home': 'Squad',
+    'Away': 'Squad',
+    'Country (Home)': 'Country',
+    'Country (Away)': 'Country',
+}
+
+# Número de filas que se leen, codifican y asignan a los clusters de cada vez, para no tener nunca la tabla entera
+# en memoria más que como matriz float32
+TAMANO_BLOQUE = 100_000
+
+# Número máximo de filas con el que se ajustan los algoritmos más costosos (MeanShift, DBSCAN, OPTICS y
+# Agglomerative, que son cuadráticos, y GMM). El resto de filas se asignan a los clusters encontrados en la muestra
+MUESTRA_AJUSTE = 10_000
+
+# Número máximo de filas de la muestra que se usan como vecinos al asignar el resto de filas en OPTICS y
+# Agglomerative. Es una búsqueda de vecinos aproximada: con menos vecinos la asignación es mucho más rápida
+MUESTRA_VECINOS = 2_000
+
+# Número de filas con el que se calcula el coeficiente de silueta, que también es cuadrático
+MUESTRA_SILUETA = 10_000
+
+# Número de clusters de los algoritmos que lo necesitan, el mismo que en clustering.ipynb
+N_CLUSTERS = 3
+
+# Algoritmos de clustering.ipynb y sus variantes por lotes. Cada uno indica cómo se ajusta cuando hay más filas
+# que MUESTRA_AJUSTE: leyendo la matriz por bloques con partial_fit ('bloques') o con una muestra ('muestra'). KMeans
+# necesita todas las filas en memoria en cada iteración, así que con muchas filas se usa MiniBatchKMeans
+ALGORITMOS = {
+    'KMeans': (lambda n_clusters, semilla: KMeans(n_clusters=n_clusters, random_state=semilla), 'muestra'),
+    'MiniBatchKMeans': (lambda n_clusters, semilla: MiniBatchKMeans(n_clusters=n_clusters, batch_size=4096,
+                                                                    n_init=3, random_state=semilla), 'bloques'),
+    'BIRCH': (lambda n_clusters, semilla: Birch(n_clusters=n_clusters, threshold=2.0), 'bloques'),
+    'GMM': (lambda n_clusters, semilla: GaussianMixture(n_components=n_clusters, random_state=semilla), 'muestra'),
+    'MeanShift': (lambda n_clusters, semilla: MeanShift(), 'muestra'),
+    'DBSCAN': (lambda n_clusters, semilla: DBSCAN(eps=0.5, min_samples=5), 'muestra'),
+    'OPTICS': (lambda n_clusters, semilla: OPTICS(), 'muestra'),
+    'AgglomerativeClustering': (lambda n_clusters, semilla: AgglomerativeClustering(n_clusters=n_clusters), 'muestra'),
+}
+
+
+def codificar(tabla, vocabulario):
+    '''
+    Función que pasa a números un bloque de la tabla como en clustering.ipynb: cada columna de texto se sustituye
+    por la posición de su valor en el vocabulario ordenado (lo mismo que hace LabelEncoder) y la fecha se separa en
+    año, mes y día
+    '''
+    tabla = tabla.dropna().copy()
+    for columna, valores in vocabulario.items():
+        if columna in tabla:
+            tabla[columna] = pd.Categorical(tabla[columna].astype(str), categories=valores).codes
+    if 'Date' in tabla:
+        fechas = pd.to_datetime(tabla.pop('Date'))
+        tabla['Year'] = fechas.dt.year
+        tabla['Month'] = fechas.dt.month
+        tabla['Number Day'] = fechas.dt.day
+    return tabla.astype(np.float64)
+
+
+def construir_vocabulario(leer_bloques):
+    '''
+    Función que recorre los bloques de la tabla y devuelve los valores distintos (ordenados) de cada columna de
+    texto y el número de filas sin valores nulos. Las columnas de GRUPOS_CODIFICACION comparten los valores
+    '''
+    valores, columnas, filas = {}, {}, 0
+    for bloque in leer_bloques():
+        bloque = bloque.dropna()
+        filas += len(bloque)
+        for columna in bloque.columns:
+            if columna != 'Date' and not pd.api.types.is_numeric_dtype(bloque[columna]):
+                grupo = GRUPOS_CODIFICACION.get(columna, columna)
+                valores.setdefault(grupo, set()).update(bloque[columna].astype(str).unique())
+                columnas[columna] = grupo
+    return {columna: sorted(valores[grupo]) for columna, grupo in columnas.items()}, filas
+
+
+def preparar_matriz(leer_bloques, clave, ruta_cache=RUTA_CACHE):
+    '''
+    Función que codifica y escala (como StandardScaler) una tabla leída por bloques y la guarda como matriz float32
+    en la caché. Devuelve la ruta de la matriz, que se abre con cargar_matriz.
+
+    'leer_bloques' es una función que devuelve un iterador con los bloques de la tabla, ya que la tabla se recorre
+    tres veces (vocabulario, medias y desviaciones, y escritura) sin cargarla entera. Si la matriz de la misma
+    clave ya está en la caché no se vuelve a calcular.
+    '''
+    ruta = os.path.join(ruta_cache, f'{clave}.npy')
+    if os.path.exists(ruta):
+        return ruta
+    os.makedirs(ruta_cache, exist_ok=True)
+
+    vocabulario, filas = construir_vocabulario(leer_bloques)
+    contar('filas codificadas', filas)
+
+    # Medias y varianzas combinando las de cada bloque, sin guardar las filas
+    n, media, m2, columnas = 0, 0.0, 0.0, None
+    for bloque in leer_bloques():
+        valores = codificar(bloque, vocabulario)
+        columnas = list(valores.columns)
+        valores = valores.to_numpy()
+        if not len(valores):
+            continue
+        n_bloque, media_bloque = len(valores), valores.mean(axis=0)
+        delta = media_bloque - media
+        m2 = m2 + ((valores - media_bloque) ** 2).sum(axis=0) + delta ** 2 * n * n_bloque / (n + n_bloque)
+        media = media + delta * n_bloque / (n + n_bloque)
+        n += n_bloque
+    desviacion = np.sqrt(m2 / n)
+    # Las columnas constantes se quedan en 0, como en StandardScaler
+    desviacion = np.where(desviacion == 0, 1.0, desviacion)
+
+    matriz = np.lib.format.open_memmap(ruta + '.tmp.npy', mode='w+', dtype=np.float32, shape=(filas, len(columnas)))
+    inicio = 0
+    for bloque in leer_bloques():
+        valores = (codificar(bloque, vocabulario).to_numpy() - media) / desviacion
+        matriz[inicio:inicio + len(valores)] = valores
+        inicio += len(valores)
+    matriz.flush()
+    del matriz
+    os.replace(ruta + '.tmp.npy', ruta)
+
+    with open(os.path.join(ruta_cache, f'{clave}.json'), 'w', encoding='utf-8') as archivo:
+        json.dump({'columnas': columnas, 'media': list(media), 'desviacion': list(desviacion)}, archivo,
+                  ensure_ascii=False)
+    return ruta
+
+
+def clave_tabla(ruta_csv, escala=1):
+    '''
+    Función que devuelve la clave de la matriz de una tabla: el hash del CSV, la escala y la codificación
+    '''
+    resumen = hashlib.sha256(json.dumps([escala, GRUPOS_CODIFICACION]).encode('utf-8'))
+    with open(ruta_csv, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1 << 20), b''):
+            resumen.update(bloque)
+    return f'{os.path.splitext(os.path.basename(ruta_csv))[0]}_{resumen.hexdigest()[:16]}'
+
+
+def matriz_tabla(ruta_csv, escala=1, ruta_cache=RUTA_CACHE, tamano_bloque=TAMANO_BLOQUE):
+    '''
+    Función que devuelve la ruta de la matriz codificada y escalada de un CSV. Con escala > 1 la tabla se repite
+    ese número de veces, cambiando el nombre de las temporadas, para medir cómo escalan los algoritmos
+    '''
+    def leer_bloques():
+        for copia in range(escala):
+            for bloque in pd.read_csv(ruta_csv, chunksize=tamano_bloque):
+                if copia:
+                    bloque['Season'] = bloque['Season'].astype(str) + f'-{copia}'
+                yield bloque
+
+    return preparar_matriz(leer_bloques, clave_tabla(ruta_csv, escala), ruta_cache)
+
+
+def cargar_matriz(ruta):
+    '''
+    Función que abre una matriz de la caché sin cargarla en memoria
+    '''
+    return np.load(ruta, mmap_mode='r')
+
+
+def por_bloques(funcion, X, tamano_bloque=TAMANO_BLOQUE):
+    '''
+    Función que aplica una función a la matriz por bloques de filas y junta los resultados
+    '''
+    return np.concatenate([funcion(np.asarray(X[inicio:inicio + tamano_bloque]))
+                           for inicio in range(0, len(X), tamano_bloque)])
+
+
+def extender(modelo, muestra, etiquetas_muestra, X, semilla=0):
+    '''
+    Función que asigna todas las filas de la matriz a los clusters encontrados en una muestra. Los modelos con
+    predict (KMeans, MeanShift y GMM) lo usan directamente; DBSCAN asigna cada fila al cluster del punto núcleo más cercano
+    si está a menos de 'eps' (si no, es ruido), y el resto al cluster de la fila más cercana de entre MUESTRA_VECINOS
+    filas de la muestra
+    '''
+    if hasattr(modelo, 'predict'):
+        return por_bloques(modelo.predict, X)
+
+    if isinstance(modelo, DBSCAN):
+        referencias = modelo.components_
+        etiquetas_referencias = etiquetas_muestra[modelo.core_sample_indices_]
+        radio = modelo.eps
+    else:
+        filas = np.arange(len(muestra))
+        if len(filas) > MUESTRA_VECINOS:
+            filas = np.random.default_rng(semilla).choice(filas, MUESTRA_VECINOS, replace=False)
+        referencias, etiquetas_referencias, radio = muestra[filas], etiquetas_muestra[filas], np.inf
+    if not len(referencias):
+        return np.full(len(X), -1)
+
+    vecinos = NearestNeighbors(n_neighbors=1, algorithm='brute').fit(referencias)
+
+    def asignar(bloque):
+        distancias, indices = vecinos.kneighbors(bloque)
+        return np.where(distancias[:, 0] <= radio, etiquetas_referencias[indices[:, 0]], -1)
+
+    return por_bloques(asignar, X)
+
+
+def silueta(X, etiquetas, muestra=MUESTRA_SILUETA, semilla=0):
+    '''
+    Función que calcula el coeficiente de silueta con una muestra de filas (sin el ruido, etiqueta -1)
+    '''
+    filas = np.flatnonzero(etiquetas >= 0)
+    if len(filas) > muestra:
+        filas = np.sort(np.random.default_rng(semilla).choice(filas, muestra, replace=False))
+    n_clusters = len(np.unique(etiquetas[filas]))
+    if n_clusters < 2 or n_clusters >= len(filas):
+        return np.nan
+    return silhouette_score(np.asarray(X[filas]), etiquetas[filas])
+
+
+def davies_bouldin(X, etiquetas, tamano_bloque=TAMANO_BLOQUE):
+    '''
+    Función que calcula la medida de Davies-Bouldin con todas las filas (sin el ruido) recorriendo la matriz por
+    bloques: primero los centroides y luego la distancia media de cada cluster a su centroide. Da el mismo valor
+    que davies_bouldin_score sin tener todas las distancias en memoria
+    '''
+    clusters, codigos = np.unique(etiquetas, return_inverse=True)
+    validos = clusters >= 0
+    if validos.sum() < 2:
+        return np.nan
+    # El ruido se acumula en su propio grupo y luego se descarta
+    k = len(clusters)
+
+    sumas, conteos = np.zeros((k, X.shape[1])), np.zeros(k)
+    for inicio in range(0, len(X), tamano_bloque):
+        bloque = np.asarray(X[inicio:inicio + tamano_bloque], dtype=np.float64)
+        codigos_bloque = codigos[inicio:inicio + tamano_bloque]
+        pertenencia = sparse.csr_matrix((np.ones(len(bloque)), (codigos_bloque, np.arange(len(bloque)))),
+                                        shape=(k, len(bloque)))
+        sumas += pertenencia @ bloque
+        conteos += np.bincount(codigos_bloque, minlength=k)
+    centroides = sumas / conteos[:, None]
+
+    distancias = np.zeros(k)
+    for inicio in range(0, len(X), tamano_bloque):
+        bloque = np.asarray(X[inicio:inicio + tamano_bloque], dtype=np.float64)
+        codigos_bloque = codigos[inicio:inicio + tamano_bloque]
+        distancias += np.bincount(codigos_bloque, np.linalg.norm(bloque - centroides[codigos_bloque], axis=1),
+                                  minlength=k)
+
+    intra = (distancias / conteos)[validos]
+    centroides = centroides[validos]
+    entre = np.linalg.norm(centroides[:, None, :] - centroides[None, :, :], axis=2)
+    if np.allclose(intra, 0) or np.allclose(entre, 0):
+        return 0.0
+    entre[entre == 0] = np.inf
+    return np.mean(np.max((intra[:, None] + intra[None, :]) / entre, axis=1))
+
+
+def ejecutar(nombre, ruta_matriz, n_clusters=N_CLUSTERS, semilla=0, muestra_ajuste=MUESTRA_AJUSTE,
+             muestra_silueta=MUESTRA_SILUETA):
+    '''
+    Función que ajusta un algoritmo a la matriz de la caché y devuelve sus etiquetas y métricas. Si la matriz tiene
+    más filas que 'muestra_ajuste', BIRCH y MiniBatchKMeans leen la matriz por bloques y el resto se ajustan con una
+    muestra; con menos filas todos se ajustan con la matriz entera, como en clustering.ipynb
+    '''
+    X = cargar_matriz(ruta_matriz)
+    crear, ajuste = ALGORITMOS[nombre]
+    modelo = crear(n_clusters, semilla)
+
+    inicio = time.perf_counter()
+    with tramo(f'clustering.{nombre}'):
+        filas_ajuste = len(X)
+        if len(X) <= muestra_ajuste:
+            etiquetas = modelo.fit_predict(np.asarray(X))
+        elif ajuste == 'bloques':
+            # En memoria solo hay un bloque de la matriz; MiniBatchKMeans lo recibe en lotes de su tamaño de lote
+            lote = getattr(modelo, 'batch_size', TAMANO_BLOQUE)
+            for inicio_bloque in range(0, len(X), TAMANO_BLOQUE):
+                bloque = np.asarray(X[inicio_bloque:inicio_bloque + TAMANO_BLOQUE])
+                for inicio_lote in range(0, len(bloque), lote):
+                    modelo.partial_fit(bloque[inicio_lote:inicio_lote + lote])
+            if isinstance(modelo, Birch):
+                # Sin datos, partial_fit solo agrupa los subclusters en los clusters finales
+                modelo.partial_fit()
+            etiquetas = por_bloques(modelo.predict, X)
+        else:
+            filas = np.sort(np.random.default_rng(semilla).choice(len(X), muestra_ajuste, replace=False))
+            muestra = np.asarray(X[filas])
+            filas_ajuste = len(filas)
+            if isinstance(modelo, MeanShift):
+                # Ancho de banda estimado con la muestra y semillas agrupadas en celdas para no partir de cada fila
+                modelo.set_params(bandwidth=estimate_bandwidth(muestra, random_state=semilla), bin_seeding=True)
+            etiquetas = extender(modelo, muestra, modelo.fit_predict(muestra), X, semilla)
+    tiempo = time.perf_counter() - inicio
+    etiquetas = np.asarray(etiquetas, dtype=np.int32)
+
+    return {
+        'algoritmo': nombre,
+        'clusters': len(np.unique(etiquetas[etiquetas >= 0])),
+        'ruido': np.mean(etiquetas < 0),
+        'silueta': silueta(X, etiquetas, muestra_silueta, semilla),
+        'davies_bouldin': davies_bouldin(X, etiquetas),
+        'filas ajuste': filas_ajuste,
+        'tiempo': tiempo,
+    }, etiquetas
+
+
+def agrupar(ruta_matriz, algoritmos=None, n_clusters=N_CLUSTERS, procesos=None, semilla=0,
+            muestra_ajuste=MUESTRA_AJUSTE, muestra_silueta=MUESTRA_SILUETA):
+    '''
+    Función que ejecuta los algoritmos indicados (por defecto, todos) repartidos entre varios procesos. Cada proceso
+    abre la matriz de la caché del disco, así que no se copia entre procesos. Devuelve un DataFrame con las métricas
+    de cada algoritmo y un diccionario con sus etiquetas
+    '''
+    algoritmos = algoritmos or list(ALGORITMOS)
+    tareas = [(nombre, ruta_matriz, n_clusters, semilla, muestra_ajuste, muestra_silueta) for nombre in algoritmos]
+    if procesos == 1:
+        resultados = [ejecutar(*tarea) for tarea in tareas]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            resultados = list(ejecutor.map(ejecutar, *zip(*tareas)))
+
+    resumen = pd.DataFrame([metricas for metricas, _ in resultados])
+    return resumen, {nombre: etiquetas for nombre, (_, etiquetas) in zip(algoritmos, resultados)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ejecuta los algoritmos de clustering sobre una tabla limpia')
+    parser.add_argument('--tabla', default='partidos', choices=['partidos', 'jugadores', 'equipos', 'overall'],
+                        help='Tabla *_limpio.csv que se agrupa')
+    parser.add_argument('--escala', type=int, default=1, help='Número de veces que se repite la tabla')
+    parser.add_argument('--algoritmos', nargs='+', choices=list(ALGORITMOS), default=None,
+                        help='Algoritmos que se ejecutan (por defecto, todos)')
+    parser.add_argument('--clusters', type=int, default=N_CLUSTERS, help='Número de clusters')
+    parser.add_argument('--procesos', type=int, default=None, help='Número de procesos (por defecto, uno por núcleo)')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    ruta_matriz = matriz_tabla(os.path.join(RUTA_DATOS, f'{args.tabla}_limpio.csv'), args.escala)
+    X = cargar_matriz(ruta_matriz)
+    print(f'Matriz {X.shape[0]} x {X.shape[1]} preparada en {time.perf_counter() - inicio:.1f} s')
+
+    inicio = time.perf_counter()
+    resumen, _ = agrupar(ruta_matriz, args.algoritmos, args.clusters, args.procesos)
+    print(f'Algoritmos ejecutados en {time.perf_counter() - inicio:.1f} s')
+    print(resumen.round(4).to_string(index=False))
@@ -0,0 +1,274 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# medicion.py está en la carpeta UEFA
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from medicion import contar, tramo
+
+# Ruta a la carpeta 'data', calculada a partir de este archivo para no depender del directorio desde el que se ejecute
+RUTA_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data')
+
+# Estados de la cadena de Markov de cada equipo (el resultado de su último partido)
+ESTADOS = ['win', 'draw', 'lose']
+GANAR, EMPATAR, PERDER = range(3)
+
+# Número de simulaciones de cada bloque. Cada bloque tiene su propia semilla, derivada de la semilla principal, así
+# que el resultado es el mismo se use el número de procesos que se use
+TAMANO_BLOQUE = 250_000
+
+# Valor z del intervalo de confianza del 95%
+Z_95 = 1.959963984540054
+
+# Semifinales de la temporada 2023-2024, las mismas que en markov.ipynb
+CUADRO_SEMIFINALES = ['Real Madrid', 'Bayern Munich', 'Paris S-G', 'Dortmund']
+
+
+class ModeloMarkov:
+    '''
+    Clase que guarda las matrices de transición de todos los equipos en un único array de NumPy de forma
+    (equipos, 3, 3), donde transiciones[e, i, j] es la probabilidad de que el equipo e pase del estado i al j
+    '''
+
+    def __init__(self, equipos, transiciones, estados_iniciales):
+        self.equipos = list(equipos)
+        self.indices = {equipo: i for i, equipo in enumerate(self.equipos)}
+        self.transiciones = np.asarray(transiciones, dtype=np.float64)
+        self.estados_iniciales = np.asarray(estados_iniciales, dtype=np.int8)
+
+    @classmethod
+    def desde_partidos(cls, partidos, suavizado=1.0):
+        '''
+        Función que calcula las matrices de transición de todos los equipos a partir de la tabla de partidos.
+
+        A diferencia de get_transition_matrix_from_dataframe (markov.ipynb), el estado es siempre el resultado desde
+        el punto de vista del equipo (ganar, empatar o perder, juegue en casa o fuera) y los partidos de cada equipo
+        se encadenan por fecha. 'suavizado' es el número de transiciones ficticias que se suman a cada casilla para
+        que los equipos con pocos partidos no tengan probabilidades 0.
+        '''
+        # Apilamos los partidos desde el punto de vista del equipo local y del visitante
+        resultado_local = partidos['Results'].map({'H': GANAR, 'D': EMPATAR, 'A': PERDER})
+        tabla = pd.DataFrame({
+            'equipo': np.concatenate([partidos['Home'].to_numpy(), partidos['Away'].to_numpy()]),
+            'fecha': np.concatenate([partidos['Date'].to_numpy(), partidos['Date'].to_numpy()]),
+            'estado': np.concatenate([resultado_local.to_numpy(), (PERDER - resultado_local).to_numpy()])
+        }).dropna(subset=['estado'])
+        tabla = tabla.sort_values(['equipo', 'fecha'], kind='stable')
+
+        equipos, codigos = np.unique(tabla['equipo'].to_numpy(), return_inverse=True)
+        estados = tabla['estado'].to_numpy(dtype=np.int64)
+        # Cada partido es una transición desde el partido anterior del mismo equipo
+        mismo_equipo = codigos[1:] == codigos[:-1]
+        conteos = np.zeros((len(equipos), 3, 3))
+        np.add.at(conteos, (codigos[1:][mismo_equipo], estados[:-1][mismo_equipo], estados[1:][mismo_equipo]), 1)
+
+        conteos += suavizado
+        totales = conteos.sum(axis=2, keepdims=True)
+        # Las filas sin ninguna transición (sin suavizado) pasan a ser uniformes
+        transiciones = np.divide(conteos, totales, out=np.full_like(conteos, 1 / 3), where=totales > 0)
+
+        # El estado inicial de cada equipo es el resultado de su último partido
+        ultimos = np.r_[np.flatnonzero(~mismo_equipo), len(codigos) - 1]
+        return cls(equipos, transiciones, estados[ultimos])
+
+    def matriz(self, equipo):
+        '''
+        Función que devuelve la matriz de transición de un equipo como DataFrame
+        '''
+        return pd.DataFrame(self.transiciones[self.indices[equipo]], index=ESTADOS, columns=ESTADOS)
+
+    def codificar(self, equipos):
+        return np.array([self.indices[equipo] for equipo in equipos], dtype=np.int64)
+
+
+def probabilidades_partido(modelo, equipos_a, estados_a, equipos_b, estados_b):
+    '''
+    Función que devuelve las probabilidades (gana A, empate, gana B) de los partidos entre los equipos A y B según
+    el siguiente paso de la cadena de cada uno: gana A si A gana y B pierde, empate si los dos empatan, etc.
+    '''
+    pa = modelo.transiciones[equipos_a, estados_a]
+    pb = modelo.transiciones[equipos_b, estados_b]
+    probabilidades = np.stack([pa[..., GANAR] * pb[..., PERDER],
+                               pa[..., EMPATAR] * pb[..., EMPATAR],
+                               pa[..., PERDER] * pb[..., GANAR]], axis=-1)
+    return probabilidades / probabilidades.sum(axis=-1, keepdims=True)
+
+
+def bloque_resultados(modelo, equipos, partidos, simulaciones, semilla):
+    '''
+    Función que simula 'simulaciones' cadenas de 'partidos' pasos para cada equipo y devuelve, por equipo y estado,
+    cuántas cadenas terminan con 0, 1, ..., 'partidos' resultados de ese estado
+    '''
+    generador = np.random.default_rng(semilla)
+    # Probabilidades acumuladas de cada (equipo, estado) en arrays planos, para elegir el siguiente estado de todas las
+    # cadenas a la vez comparando un número aleatorio con ellas (la versión vectorizada de MarkovChainGraph.transition)
+    acumuladas = np.cumsum(modelo.transiciones[equipos], axis=2).reshape(-1, 3)
+    hasta_ganar, hasta_empatar = acumuladas[:, GANAR], acumuladas[:, EMPATAR]
+    base = np.arange(len(equipos)) * 3
+
+    estados = np.broadcast_to(modelo.estados_iniciales[equipos], (simulaciones, len(equipos))).astype(np.intp)
+    contadores = np.zeros((3, simulaciones, len(equipos)), dtype=np.int16)
+    for _ in range(partidos):
+        fila = base + estados
+        aleatorios = generador.random(estados.shape)
+        estados = (aleatorios >= hasta_ganar[fila]).astype(np.intp) + (aleatorios >= hasta_empatar[fila])
+        for estado in range(3):
+            contadores[estado] += estados == estado
+
+    # Histograma de los contadores: distribucion[e, s, k] = cadenas en las que el equipo e tiene k resultados s
+    distribucion = np.zeros((len(equipos), 3, partidos + 1), dtype=np.int64)
+    for estado in range(3):
+        for i in range(len(equipos)):
+            distribucion[i, estado] = np.bincount(contadores[estado, :, i], minlength=partidos + 1)
+    return distribucion
+
+
+def bloque_eliminatoria(modelo, equipos, ida_y_vuelta, simulaciones, semilla):
+    '''
+    Función que simula 'simulaciones' veces un cuadro de eliminatorias y devuelve cuántas veces llega cada equipo a
+    cada ronda (la última fila es el número de veces que gana el título)
+    '''
+    generador = np.random.default_rng(semilla)
+    rondas = int(np.log2(len(equipos)))
+    # Probabilidades de ganar, empatar y perder de cada (equipo del cuadro, estado) en arrays planos
+    transiciones = modelo.transiciones[equipos].reshape(-1, 3)
+    ganar, empatar, perder = transiciones[:, GANAR], transiciones[:, EMPATAR], transiciones[:, PERDER]
+
+    # Posición en el cuadro de los equipos que siguen vivos en cada simulación y estado de su cadena, que se actualiza
+    # tras cada partido (el de los eliminados ya no hace falta)
+    vivos = np.broadcast_to(np.arange(len(equipos)), (simulaciones, len(equipos))).copy()
+    estados = np.broadcast_to(modelo.estados_iniciales[equipos], (simulaciones, len(equipos))).astype(np.intp)
+
+    alcanzadas = np.zeros((rondas + 1, len(equipos)), dtype=np.int64)
+    alcanzadas[0] = simulaciones
+    for ronda in range(rondas):
+        a, b = vivos[:, 0::2], vivos[:, 1::2]
+        estados_a, estados_b = estados[:, 0::2], estados[:, 1::2]
+        # La final se juega a un solo partido
+        partidos = 2 if ida_y_vuelta and ronda < rondas - 1 else 1
+
+        diferencia = np.zeros(a.shape, dtype=np.int8)
+        for _ in range(partidos):
+            # Igual que en probabilidades_partido, pero sin normalizar: escalamos el número aleatorio por el total
+            fila_a, fila_b = a * 3 + estados_a, b * 3 + estados_b
+            gana_a = ganar[fila_a] * perder[fila_b]
+            hasta_empate = gana_a + empatar[fila_a] * empatar[fila_b]
+            aleatorios = generador.random(a.shape) * (hasta_empate + perder[fila_a] * ganar[fila_b])
+            estados_a = (aleatorios >= gana_a).astype(np.intp) + (aleatorios >= hasta_empate)
+            estados_b = PERDER - estados_a
+            diferencia += (estados_a == GANAR).astype(np.int8) - (estados_a == PERDER)
+
+        # Si la eliminatoria acaba igualada (por ejemplo, dos empates) se decide en los penaltis, al 50%
+        pasa_a = (diferencia > 0) | ((diferencia == 0) & (generador.random(a.shape) < 0.5))
+        vivos = np.where(pasa_a, a, b)
+        estados = np.where(pasa_a, estados_a, estados_b)
+        alcanzadas[ronda + 1] = np.bincount(vivos.ravel(), minlength=len(equipos))
+    return alcanzadas
+
+
+def repartir(funcion, argumentos, simulaciones, semilla, procesos, tamano_bloque=TAMANO_BLOQUE):
+    '''
+    Función que reparte las simulaciones en bloques, los ejecuta en varios procesos y suma sus conteos
+    '''
+    tamanos = [tamano_bloque] * (simulaciones // tamano_bloque)
+    if simulaciones % tamano_bloque:
+        tamanos.append(simulaciones % tamano_bloque)
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+    tareas = [argumentos + (tamano, semilla_bloque) for tamano, semilla_bloque in zip(tamanos, semillas)]
+
+    contar('simulaciones', simulaciones)
+    with tramo(f'simulacion.{funcion.__name__}'):
+        if procesos == 1:
+            return sum(funcion(*tarea) for tarea in tareas)
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            return sum(ejecutor.map(funcion, *zip(*tareas)))
+
+
+def intervalo(probabilidad, simulaciones):
+    '''
+    Función que devuelve la mitad del intervalo de confianza del 95% de una probabilidad estimada con simulaciones
+    '''
+    return Z_95 * np.sqrt(probabilidad * (1 - probabilidad) / simulaciones)
+
+
+def simular_resultados(modelo, equipos, partidos, simulaciones=1_000_000, semilla=0, procesos=1):
+    '''
+    Función que simula los siguientes 'partidos' partidos de cada equipo y devuelve dos DataFrames:
+    - resumen: por equipo, el número medio de victorias, empates y derrotas con su intervalo de confianza del 95%
+    - distribucion: por equipo y estado, la probabilidad de tener 0, 1, ..., 'partidos' resultados de ese estado
+    '''
+    conteos = repartir(bloque_resultados, (modelo, modelo.codificar(equipos), partidos), simulaciones, semilla,
+                       procesos)
+    probabilidades = conteos / simulaciones
+
+    indice = pd.MultiIndex.from_product([equipos, ESTADOS], names=['equipo', 'estado'])
+    distribucion = pd.DataFrame(probabilidades.reshape(-1, partidos + 1), index=indice)
+
+    valores = np.arange(partidos + 1)
+    media = probabilidades @ valores
+    desviacion = np.sqrt(probabilidades @ valores ** 2 - media ** 2)
+    resumen = pd.DataFrame(index=pd.Index(equipos, name='equipo'))
+    for i, estado in enumerate(ESTADOS):
+        resumen[estado] = media[:, i]
+        resumen[f'{estado} ic95'] = Z_95 * desviacion[:, i] / np.sqrt(simulaciones)
+    return resumen, distribucion
+
+
+def simular_eliminatoria(modelo, cuadro, simulaciones=1_000_000, semilla=0, procesos=1, ida_y_vuelta=True):
+    '''
+    Función que simula un cuadro de eliminatorias y devuelve, por equipo, la probabilidad de llegar a cada ronda y de
+    ganar el título con su intervalo de confianza del 95%.
+
+    'cuadro' es la lista de equipos en orden (el primero juega contra el segundo, el tercero contra el cuarto, etc.)
+    y su longitud tiene que ser una potencia de 2.
+    '''
+    if len(cuadro) < 2 or len(cuadro) & (len(cuadro) - 1):
+        raise ValueError('El número de equipos del cuadro tiene que ser una potencia de 2')
+
+    conteos = repartir(bloque_eliminatoria, (modelo, modelo.codificar(cuadro), ida_y_vuelta), simulaciones, semilla,
+                       procesos)
+    probabilidades = conteos / simulaciones
+
+    resultado = pd.DataFrame(index=pd.Index(cuadro, name='equipo'))
+    # La primera fila es la ronda inicial, a la que llegan todos
+    for ronda in range(1, len(probabilidades) - 1):
+        resultado[f'ronda {ronda + 1}'] = probabilidades[ronda]
+    resultado['título'] = probabilidades[-1]
+    resultado['título ic95'] = intervalo(probabilidades[-1], simulaciones)
+    return resultado.sort_values('título', ascending=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simula un cuadro de eliminatorias con las cadenas de Markov de cada equipo')
+    parser.add_argument('--equipos', nargs='+', default=CUADRO_SEMIFINALES,
+                        help='Equipos del cuadro en orden de emparejamiento (una potencia de 2)')
+    parser.add_argument('--simulaciones', type=int, default=1_000_000)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--procesos', type=int, default=os.cpu_count())
+    parser.add_argument('--partidos', type=int, default=10,
+                        help='Número de partidos de la distribución de victorias, empates y derrotas')
+    parser.add_argument('--datos', default=RUTA_DATOS, help='Carpeta con el archivo partidos_limpio.csv')
+    parser.add_argument('--salida', default=None, help='CSV donde se guardan las probabilidades del cuadro')
+    args = parser.parse_args()
+
+    modelo = ModeloMarkov.desde_partidos(pd.read_csv(os.path.join(args.datos, 'partidos_limpio.csv')))
+
+    inicio = time.perf_counter()
+    resumen, _ = simular_resultados(modelo, args.equipos, args.partidos, args.simulaciones, args.semilla, args.procesos)
+    print(f'Victorias, empates y derrotas en los próximos {args.partidos} partidos '
+          f'({time.perf_counter() - inicio:.2f} s):')
+    print(resumen.round(4).to_string())
+
+    inicio = time.perf_counter()
+    eliminatoria = simular_eliminatoria(modelo, args.equipos, args.simulaciones, args.semilla, args.procesos)
+    print(f'\nProbabilidades del cuadro ({args.simulaciones} simulaciones, {time.perf_counter() - inicio:.2f} s):')
+    print(eliminatoria.round(4).to_string())
+
+    if args.salida:
+        eliminatoria.rename_axis('Squad').to_csv(args.salida)
+        print(f"\nEl archivo '{args.salida}' ha sido creado exitosamente.")
@@ -0,0 +1,434 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+# PyTorch es opcional: cnn.ipynb solo usa el almacén de imágenes con Keras
+try:
+    import torch
+    import torch.nn as nn
+except ImportError:
+    torch = None
+
+# medicion.py está en la carpeta UEFA
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from medicion import contar, tramo
+
+# Carpetas de imágenes, calculadas a partir de este archivo para no depender del directorio desde el que se ejecute
+RUTA_IMAGENES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'img')
+RUTA_JUGADORES = os.path.join(RUTA_IMAGENES, 'jugadores')
+RUTA_PRUEBA = os.path.join(RUTA_IMAGENES, 'prueba')
+
+# Carpeta donde se guardan las imágenes ya preprocesadas y los embeddings de la red preentrenada
+RUTA_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache_imagenes')
+
+# Extensiones de imagen que aceptan tanto ImageFolder como flow_from_directory
+EXTENSIONES = ('.bmp', '.jpeg', '.jpg', '.png', '.ppm', '.tif', '.tiff')
+
+# Preprocesado de cada notebook, que se hace una sola vez al guardar la imagen en el almacén:
+# - 'tl': Resize(256) y CenterCrop(224) de torchvision, como en load_dataset de tl.ipynb
+# - 'cnn': target_size=(128, 128) de flow_from_directory, que redimensiona con el vecino más cercano
+PREPROCESADOS = {
+    'tl': {'lado': 256, 'recorte': 224},
+    'cnn': {'tamano': (128, 128)},
+}
+
+# Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5]) de tl.ipynb
+MEDIA = 0.5
+DESVIACION = 0.5
+
+
+def listar_imagenes(carpeta):
+    '''
+    Función que devuelve las clases (subcarpetas), las rutas y las etiquetas de las imágenes de una carpeta, en el
+    mismo orden que ImageFolder y flow_from_directory (clases y archivos ordenados alfabéticamente)
+    '''
+    clases = sorted(entrada.name for entrada in os.scandir(carpeta) if entrada.is_dir())
+    rutas, etiquetas = [], []
+    for etiqueta, clase in enumerate(clases):
+        for raiz, _, archivos in sorted(os.walk(os.path.join(carpeta, clase))):
+            for archivo in sorted(archivos):
+                if archivo.lower().endswith(EXTENSIONES):
+                    rutas.append(os.path.join(raiz, archivo))
+                    etiquetas.append(etiqueta)
+    return clases, rutas, etiquetas
+
+
+def hash_archivo(ruta):
+    '''
+    Función que calcula el hash SHA-256 del contenido de un archivo
+    '''
+    resumen = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1 << 20), b''):
+            resumen.update(bloque)
+    return resumen.hexdigest()
+
+
+def forma_imagen(vista):
+    '''
+    Función que devuelve la forma (alto, ancho, canales) de las imágenes preprocesadas de una vista
+    '''
+    parametros = PREPROCESADOS[vista]
+    if 'recorte' in parametros:
+        return (parametros['recorte'], parametros['recorte'], 3)
+    return (*parametros['tamano'], 3)
+
+
+def preprocesar(imagen, vista):
+    '''
+    Función que aplica a una imagen de PIL el preprocesado de una vista y la devuelve como array uint8 de forma
+    (alto, ancho, 3). Los píxeles todavía no se normalizan, así que ocupan cuatro veces menos que en float32
+    '''
+    parametros = PREPROCESADOS[vista]
+    imagen = imagen.convert('RGB')
+    if 'recorte' in parametros:
+        # Resize(256): el lado más corto pasa a medir 256 y el otro se escala en proporción
+        ancho, alto = imagen.size
+        lado = parametros['lado']
+        if ancho <= alto:
+            nuevo = (lado, int(lado * alto / ancho))
+        else:
+            nuevo = (int(lado * ancho / alto), lado)
+        if nuevo != imagen.size:
+            imagen = imagen.resize(nuevo, Image.BILINEAR)
+        # CenterCrop(224)
+        recorte = parametros['recorte']
+        izquierda = int(round((nuevo[0] - recorte) / 2.0))
+        arriba = int(round((nuevo[1] - recorte) / 2.0))
+        imagen = imagen.crop((izquierda, arriba, izquierda + recorte, arriba + recorte))
+    else:
+        alto, ancho = parametros['tamano']
+        if imagen.size != (ancho, alto):
+            imagen = imagen.resize((ancho, alto), Image.NEAREST)
+    return np.asarray(imagen, dtype=np.uint8)
+
+
+def decodificar(ruta, vista):
+    '''
+    Función que abre una imagen y le aplica el preprocesado de una vista
+    '''
+    with Image.open(ruta) as imagen:
+        return preprocesar(imagen, vista)
+
+
+def decodificar_todas(rutas, vista, hilos=None):
+    '''
+    Función que decodifica y preprocesa varias imágenes en paralelo. PIL libera el GIL al decodificar y
+    redimensionar, así que basta con hilos
+    '''
+    contar('imágenes decodificadas', len(rutas))
+    with tramo('imagenes.decodificacion'), ThreadPoolExecutor(hilos) as executor:
+        return list(executor.map(lambda ruta: decodificar(ruta, vista), rutas))
+
+
+class AlmacenImagenes:
+    '''
+    Clase que da acceso a las imágenes preprocesadas de una carpeta, guardadas en un único array uint8 de forma
+    (imágenes, alto, ancho, 3) que se lee del disco con np.memmap a medida que se usa
+    '''
+
+    def __init__(self, ruta, vista, clases, rutas, etiquetas, hashes, huella):
+        self.ruta = ruta
+        self.vista = vista
+        self.forma = forma_imagen(vista)
+        self.clases = list(clases)
+        self.rutas = list(rutas)
+        self.etiquetas = np.asarray(etiquetas, dtype=np.int64)
+        self.hashes = list(hashes)
+        # Hash de todo el contenido del almacén (imágenes, etiquetas y preprocesado), que identifica sus embeddings
+        self.huella = huella
+        self._imagenes = None
+
+    @classmethod
+    def cargar(cls, ruta):
+        with open(os.path.join(ruta, 'manifiesto.json'), encoding='utf-8') as archivo:
+            manifiesto = json.load(archivo)
+        return cls(ruta, manifiesto['vista'], manifiesto['clases'], [imagen['ruta'] for imagen in manifiesto['imagenes']],
+                   [imagen['etiqueta'] for imagen in manifiesto['imagenes']],
+                   [imagen['hash'] for imagen in manifiesto['imagenes']], manifiesto['huella'])
+
+    @property
+    def imagenes(self):
+        # El memmap se abre al usarlo por primera vez, también en cada proceso de los DataLoader
+        if self._imagenes is None:
+            self._imagenes = np.memmap(os.path.join(self.ruta, 'imagenes.u8'), dtype=np.uint8, mode='r',
+                                       shape=(len(self.rutas), *self.forma)) if self.rutas else \
+                np.empty((0, *self.forma), dtype=np.uint8)
+        return self._imagenes
+
+    def __len__(self):
+        return len(self.rutas)
+
+    def __getstate__(self):
+        # Al pasar el almacén a otro proceso no se copian las imágenes, solo la ruta del archivo
+        estado = self.__dict__.copy()
+        estado['_imagenes'] = None
+        return estado
+
+    def dividir(self, prueba=0.3, semilla=0):
+        '''
+        Función que separa las imágenes al azar en entrenamiento (70%) y prueba (30%), como random_split en
+        tl.ipynb. Con la misma semilla la división es siempre la misma
+        '''
+        orden = np.random.default_rng(semilla).permutation(len(self))
+        n_entrenamiento = int((1 - prueba) * len(self))
+        return orden[:n_entrenamiento], orden[n_entrenamiento:]
+
+
+def construir_almacen(carpeta=RUTA_JUGADORES, vista='tl', ruta_cache=RUTA_CACHE, hilos=None):
+    '''
+    Función que guarda las imágenes de una carpeta ya preprocesadas en el almacén de una vista y lo devuelve.
+
+    El manifiesto guarda el hash del contenido de cada imagen, así que al volver a ejecutarla solo se decodifican las
+    imágenes nuevas o modificadas; el resto se copian del almacén anterior. El hash solo se recalcula si ha cambiado
+    el tamaño o la fecha de modificación del archivo. Si no ha cambiado nada no se reescribe nada.
+    '''
+    ruta = os.path.join(ruta_cache, vista)
+    ruta_manifiesto = os.path.join(ruta, 'manifiesto.json')
+    os.makedirs(ruta, exist_ok=True)
+
+    anterior = {'vista': None, 'imagenes': []}
+    if os.path.exists(ruta_manifiesto):
+        with open(ruta_manifiesto, encoding='utf-8') as archivo:
+            anterior = json.load(archivo)
+    # Comparamos con el preprocesado tal y como queda en JSON (las tuplas se guardan como listas)
+    mismo_preprocesado = anterior.get('preprocesado') == json.loads(json.dumps(PREPROCESADOS[vista]))
+    conocidas = {imagen['ruta']: imagen for imagen in anterior['imagenes']} if mismo_preprocesado else {}
+
+    clases, rutas, etiquetas = listar_imagenes(carpeta)
+    relativas = [os.path.relpath(ruta_imagen, carpeta).replace(os.sep, '/') for ruta_imagen in rutas]
+
+    def describir(i):
+        estado = os.stat(rutas[i])
+        conocida = conocidas.get(relativas[i])
+        if conocida and conocida['tamano'] == estado.st_size and conocida['modificacion'] == estado.st_mtime_ns:
+            hash_imagen = conocida['hash']
+        else:
+            hash_imagen = hash_archivo(rutas[i])
+        return {'ruta': relativas[i], 'etiqueta': etiquetas[i], 'hash': hash_imagen, 'tamano': estado.st_size,
+                'modificacion': estado.st_mtime_ns}
+
+    with ThreadPoolExecutor(hilos) as executor:
+        imagenes = list(executor.map(describir, range(len(rutas))))
+
+    huella = hashlib.sha256(json.dumps([vista, PREPROCESADOS[vista], clases] + [
+        [imagen['hash'], imagen['etiqueta']] for imagen in imagenes]).encode()).hexdigest()
+    manifiesto = {'vista': vista, 'preprocesado': PREPROCESADOS[vista], 'clases': clases, 'huella': huella,
+                  'imagenes': imagenes}
+
+    if mismo_preprocesado and anterior.get('huella') == huella:
+        if anterior['imagenes'] != imagenes:
+            # Solo han cambiado las fechas de modificación o las rutas; las imágenes guardadas siguen valiendo
+            guardar_manifiesto(manifiesto, ruta_manifiesto)
+        return AlmacenImagenes.cargar(ruta)
+
+    # Las filas cuyo hash ya estaba en el almacén anterior se copian; el resto se decodifican en paralelo
+    filas_anteriores = {imagen['hash']: fila for fila, imagen in enumerate(anterior['imagenes'])} \
+        if mismo_preprocesado else {}
+    reutilizadas = [(fila, filas_anteriores[imagen['hash']]) for fila, imagen in enumerate(imagenes)
+                    if imagen['hash'] in filas_anteriores]
+    nuevas = [fila for fila, imagen in enumerate(imagenes) if imagen['hash'] not in filas_anteriores]
+
+    forma = forma_imagen(vista)
+    ruta_imagenes = os.path.join(ruta, 'imagenes.u8')
+    if imagenes:
+        nuevo = np.memmap(ruta_imagenes + '.tmp', dtype=np.uint8, mode='w+', shape=(len(imagenes), *forma))
+        if reutilizadas:
+            viejo = np.memmap(ruta_imagenes, dtype=np.uint8, mode='r', shape=(len(anterior['imagenes']), *forma))
+            destino, origen = map(list, zip(*reutilizadas))
+            nuevo[destino] = viejo[origen]
+            del viejo
+
+        def escribir(fila):
+            nuevo[fila] = decodificar(rutas[fila], vista)
+
+        with ThreadPoolExecutor(hilos) as executor:
+            list(executor.map(escribir, nuevas))
+        nuevo.flush()
+        del nuevo
+        os.replace(ruta_imagenes + '.tmp', ruta_imagenes)
+    guardar_manifiesto(manifiesto, ruta_manifiesto)
+    return AlmacenImagenes.cargar(ruta)
+
+
+def guardar_manifiesto(manifiesto, ruta_manifiesto):
+    with open(ruta_manifiesto + '.tmp', 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, ensure_ascii=False)
+    os.replace(ruta_manifiesto + '.tmp', ruta_manifiesto)
+
+
+def datos_keras(almacen, indices=None):
+    '''
+    Función que devuelve las imágenes indicadas (None = todas) en float32 con los píxeles en [0, 1], como
+    ImageDataGenerator(rescale=1./255), y sus etiquetas codificadas en caliente (one-hot), para usar con model.fit
+    '''
+    indices = np.arange(len(almacen)) if indices is None else np.asarray(indices)
+    x = almacen.imagenes[indices].astype(np.float32) / 255.0
+    y = np.eye(len(almacen.clases), dtype=np.float32)[almacen.etiquetas[indices]]
+    return x, y
+
+
+def tensores(imagenes):
+    '''
+    Función que convierte un lote de imágenes uint8 (lote, alto, ancho, 3) en el tensor normalizado (lote, 3, alto,
+    ancho) que generan ToTensor y Normalize en tl.ipynb
+    '''
+    return torch.from_numpy(np.ascontiguousarray(imagenes)).permute(0, 3, 1, 2).float() \
+        .div_(255).sub_(MEDIA).div_(DESVIACION)
+
+
+class DatosTorch:
+    '''
+    Clase que hace de conjunto de datos de PyTorch sobre un almacén de imágenes. Cada elemento es un lote completo:
+    se le pasa la lista de índices del lote y devuelve sus imágenes ya normalizadas y sus etiquetas, así que la
+    conversión se hace una vez por lote y no imagen a imagen
+    '''
+
+    def __init__(self, almacen, indices):
+        self.almacen = almacen
+        self.indices = np.asarray(indices)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, lote):
+        filas = self.indices[lote]
+        return tensores(self.almacen.imagenes[filas]), torch.from_numpy(self.almacen.etiquetas[filas])
+
+
+def cargador(datos, batch_size, mezclar=False, procesos=0):
+    '''
+    Función que crea un DataLoader que pide a los datos lotes completos de índices
+    '''
+    muestreo = torch.utils.data.RandomSampler(datos) if mezclar else torch.utils.data.SequentialSampler(datos)
+    return torch.utils.data.DataLoader(
+        datos,
+        sampler=torch.utils.data.BatchSampler(muestreo, batch_size, drop_last=False),
+        batch_size=None,
+        num_workers=procesos,
+        persistent_workers=procesos > 0
+    )
+
+
+def cargadores(almacen, batch_size=30, prueba=0.3, semilla=0, mezclar=False, procesos=0):
+    '''
+    Función que devuelve los cargadores de entrenamiento y prueba de un almacén de imágenes, con la misma forma que
+    los de load_dataset en tl.ipynb pero sin volver a decodificar las imágenes en cada época
+    '''
+    entrenamiento, test = almacen.dividir(prueba, semilla)
+    return (cargador(DatosTorch(almacen, entrenamiento), batch_size, mezclar, procesos),
+            cargador(DatosTorch(almacen, test), batch_size, False, procesos))
+
+
+def hash_red(red):
+    '''
+    Función que calcula el hash de los pesos de una red (sin la capa 'fc'), para saber si los embeddings guardados
+    se calcularon con la misma red
+    '''
+    resumen = hashlib.sha256(type(red).__name__.encode())
+    for nombre, valor in red.state_dict().items():
+        if not nombre.startswith('fc.'):
+            resumen.update(nombre.encode())
+            resumen.update(valor.detach().cpu().contiguous().numpy().tobytes())
+    return resumen.hexdigest()
+
+
+def calcular_embeddings(modelo, almacen, ruta_cache=RUTA_CACHE, lote=64, dispositivo='cpu'):
+    '''
+    Función que calcula con la red preentrenada congelada (todas sus capas salvo 'fc') el vector de características
+    de cada imagen del almacén y lo guarda en caché. La clave de la caché es la huella del almacén y el hash de los
+    pesos de la red, así que solo se vuelve a calcular si cambian las imágenes o la red.
+
+    La red se evalúa en modo de evaluación, de modo que las capas BatchNorm usan sus estadísticas preentrenadas.
+    '''
+    clave = hashlib.sha256((almacen.huella + hash_red(modelo)).encode()).hexdigest()[:16]
+    ruta = os.path.join(ruta_cache, almacen.vista, f'embeddings_{clave}.npy')
+    if os.path.exists(ruta):
+        return torch.from_numpy(np.load(ruta))
+
+    # Quitamos temporalmente la capa de predicción para obtener la salida de la última capa de la red base
+    fc, entrenando = modelo.fc, modelo.training
+    modelo.fc = nn.Identity()
+    modelo.to(dispositivo).eval()
+    try:
+        resultados = []
+        with torch.no_grad():
+            for inicio in range(0, len(almacen), lote):
+                datos = tensores(almacen.imagenes[inicio:inicio + lote]).to(dispositivo)
+                resultados.append(modelo(datos).cpu())
+        embeddings = torch.cat(resultados) if resultados else torch.empty(0, fc.in_features)
+    finally:
+        modelo.fc = fc
+        modelo.train(entrenando)
+
+    np.save(ruta + '.tmp.npy', embeddings.numpy())
+    os.replace(ruta + '.tmp.npy', ruta)
+    return embeddings
+
+
+def cargadores_embeddings(modelo, almacen, batch_size=30, prueba=0.3, semilla=0, ruta_cache=RUTA_CACHE,
+                          dispositivo='cpu'):
+    '''
+    Función que devuelve los cargadores de entrenamiento y prueba con los embeddings de las imágenes en lugar de las
+    imágenes, con la misma división que cargadores(). Con ellos solo se entrena la capa 'fc' (por ejemplo, con las
+    funciones train y test de tl.ipynb pasándoles model.fc), sin volver a pasar las imágenes por la red en cada época
+    '''
+    embeddings = calcular_embeddings(modelo, almacen, ruta_cache, dispositivo=dispositivo)
+    etiquetas = torch.from_numpy(almacen.etiquetas)
+    entrenamiento, test = almacen.dividir(prueba, semilla)
+    return tuple(
+        torch.utils.data.DataLoader(torch.utils.data.TensorDataset(embeddings[indices], etiquetas[indices]),
+                                    batch_size=batch_size, shuffle=False)
+        for indices in (torch.from_numpy(entrenamiento), torch.from_numpy(test))
+    )
+
+
+def predecir_imagenes(clasificador, rutas, vista='tl', hilos=None):
+    '''
+    Función que predice la clase de varias imágenes a la vez, como predict_image pero con una sola pasada del modelo
+    para todas ellas. Las imágenes se decodifican en paralelo con el mismo preprocesado que las de entrenamiento.
+    Acepta redes de PyTorch (tl.ipynb) y modelos de Keras (cnn.ipynb). Devuelve el índice de la clase predicha de
+    cada imagen y las imágenes preprocesadas
+    '''
+    imagenes = np.stack(decodificar_todas(rutas, vista, hilos))
+    if torch is not None and isinstance(clasificador, nn.Module):
+        clasificador.eval()
+        with torch.no_grad():
+            salida = clasificador(tensores(imagenes).to(next(clasificador.parameters()).device))
+        return salida.cpu().numpy().argmax(1), imagenes
+    probabilidades = clasificador.predict(imagenes.astype(np.float32) / 255.0, verbose=0)
+    return np.argmax(probabilidades, axis=1), imagenes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Guarda las imágenes de los jugadores ya preprocesadas para entrenar las redes')
+    parser.add_argument('--carpeta', default=RUTA_JUGADORES, help='Carpeta con una subcarpeta por clase')
+    parser.add_argument('--vistas', nargs='+', choices=list(PREPROCESADOS), default=list(PREPROCESADOS),
+                        help='Preprocesados que se guardan (tl.ipynb, cnn.ipynb)')
+    parser.add_argument('--hilos', type=int, default=None, help='Número de hilos para decodificar las imágenes')
+    args = parser.parse_args()
+
+    for vista in args.vistas:
+        _, rutas, _ = listar_imagenes(args.carpeta)
+        inicio = time.perf_counter()
+        for ruta in rutas:
+            decodificar(ruta, vista)
+        tiempo_decodificar = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        almacen = construir_almacen(args.carpeta, vista, hilos=args.hilos)
+        tiempo_almacen = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        np.asarray(almacen.imagenes).sum()
+        tiempo_lectura = time.perf_counter() - inicio
+        print(f'{vista:<4} {len(almacen)} imágenes {almacen.forma}: decodificar una época {tiempo_decodificar:.2f} s, '
+              f'construir/comprobar el almacén {tiempo_almacen:.2f} s, leer una época del almacén '
+              f'{tiempo_lectura * 1000:.1f} ms')
@@ -0,0 +1,286 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.metrics import accuracy_score, mean_squared_error
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from statsmodels.tsa.ar_model import AutoReg
+from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.holtwinters import ExponentialSmoothing
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+# medicion.py está en la carpeta UEFA
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from medicion import contar, tramo
+
+from prediccion import (CARACTERISTICAS, MODELOS, RUTA_ALMACEN, RUTA_DATOS, RUTA_MODELOS, caracteristicas_partidos,
+                        guardar_modelos)
+# prediccion.py añade al path la carpeta 'analisis', donde está elo.py
+from elo import RUTA_ELO, actualizar_motor
+
+# Carpeta donde se guardan los modelos ajustados en cada pliegue, para no repetir el trabajo que no ha cambiado
+RUTA_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache_entrenamiento')
+
+# Archivo con los mejores modelos de series_temporales.ipynb (los de clasificación se guardan en RUTA_MODELOS)
+RUTA_SERIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modelos_series.joblib')
+
+# Codificación de los resultados para los modelos de series temporales, la misma que hace LabelEncoder en el notebook
+CODIGOS_RESULTADOS = {'A': 0, 'D': 1, 'H': 2}
+
+# Modelos de clasificacion.ipynb y series_temporales.ipynb con los hiperparámetros que se prueban. Los primeros
+# parámetros de cada modelo son los que se usan en los notebooks. Los modelos de clasificación se evalúan por su
+# precisión y el resto por su error cuadrático medio al predecir el resultado codificado
+BUSQUEDA = {
+    'LR': ('clasificacion', [{'C': 0.1}, {'C': 0.01}, {'C': 1.0}, {'C': 10.0}]),
+    'SVC': ('clasificacion', [{'kernel': 'sigmoid', 'C': 1.0}, {'kernel': 'sigmoid', 'C': 0.1},
+                              {'kernel': 'rbf', 'C': 1.0}, {'kernel': 'rbf', 'C': 10.0}]),
+    'XGB': ('clasificacion', [{'n_estimators': 100, 'max_depth': 3}, {'n_estimators': 50, 'max_depth': 2},
+                              {'n_estimators': 200, 'max_depth': 2, 'learning_rate': 0.05}]),
+    'Random Forest': ('regresion', [{}, {'n_estimators': 300, 'max_depth': 5}, {'n_estimators': 300, 'min_samples_leaf': 5}]),
+    'Gradient Boosting': ('regresion', [{}, {'n_estimators': 50, 'max_depth': 2},
+                                        {'n_estimators': 200, 'max_depth': 2, 'learning_rate': 0.05}]),
+    'AR': ('serie', [{'lags': 5}, {'lags': 1}, {'lags': 10}]),
+    'ARIMA': ('serie', [{'order': (5, 1, 0)}, {'order': (1, 0, 0)}, {'order': (2, 0, 1)}]),
+    'SARIMA': ('serie', [{'order': (1, 1, 1), 'seasonal_order': (1, 1, 1, 12)},
+                         {'order': (1, 0, 0), 'seasonal_order': (1, 0, 0, 12)}]),
+    'Exponential Smoothing': ('serie', [{'seasonal': 'add', 'seasonal_periods': 12},
+                                        {'trend': 'add', 'seasonal': 'add', 'seasonal_periods': 12}])
+}
+
+MODELOS_REGRESION = {
+    'Random Forest': RandomForestRegressor,
+    'Gradient Boosting': GradientBoostingRegressor
+}
+
+
+def preparar_datos(partidos, almacen, motor):
+    '''
+    Función que devuelve los partidos con características en el almacén, ordenados por fecha, con las columnas
+    'Season', 'Results', 'codigo' (el resultado codificado) y las características de CARACTERISTICAS (incluidas las
+    valoraciones Elo de 'motor' antes de cada partido)
+    '''
+    X = caracteristicas_partidos(partidos, almacen, motor)
+    datos = pd.concat([partidos[['Season', 'Date', 'Results']].reset_index(drop=True), X], axis=1).dropna()
+    datos = datos.sort_values('Date', kind='stable').reset_index(drop=True)
+    datos['codigo'] = datos['Results'].map(CODIGOS_RESULTADOS)
+    return datos
+
+
+def pliegues_por_temporada(temporadas, n_pliegues):
+    '''
+    Función que devuelve los pliegues de la validación cruzada respetando el orden temporal: cada una de las últimas
+    'n_pliegues' temporadas se predice con un modelo entrenado solo con las temporadas anteriores
+    '''
+    temporadas = np.asarray(temporadas)
+    orden = sorted(set(temporadas))
+    return [(np.flatnonzero(temporadas < temporada), np.flatnonzero(temporadas == temporada))
+            for temporada in orden[-n_pliegues:] if (temporadas < temporada).any()]
+
+
+def ajustar(modelo, parametros, X, y):
+    '''
+    Función que ajusta un modelo con unos parámetros. Los modelos de series temporales solo usan la serie de
+    resultados 'y', en orden
+    '''
+    familia = BUSQUEDA[modelo][0]
+    if familia == 'clasificacion':
+        return make_pipeline(StandardScaler(), MODELOS[modelo]().set_params(**parametros)).fit(X, y)
+    if familia == 'regresion':
+        return make_pipeline(StandardScaler(), MODELOS_REGRESION[modelo](random_state=42, **parametros)).fit(X, y)
+
+    y = np.asarray(y, dtype=np.float64)
+    # statsmodels avisa cuando los parámetros iniciales o la convergencia no son buenos; solo nos interesa la puntuación
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        if modelo == 'AR':
+            return AutoReg(y, **parametros).fit()
+        # Con low_memory no se guardan los resultados del suavizado, que no necesitamos para predecir y ocupan mucho
+        if modelo == 'ARIMA':
+            return ARIMA(y, **parametros).fit(low_memory=True)
+        if modelo == 'SARIMA':
+            return SARIMAX(y, **parametros).fit(disp=False, low_memory=True)
+        return ExponentialSmoothing(y, **parametros).fit()
+
+
+def predecir(modelo, ajustado, X):
+    if BUSQUEDA[modelo][0] == 'serie':
+        return ajustado.forecast(len(X))
+    return ajustado.predict(X)
+
+
+def puntuar(modelo, y, prediccion):
+    '''
+    Función que devuelve la puntuación de unas predicciones: la precisión en los modelos de clasificación y el error
+    cuadrático medio (con signo negativo, para que siempre sea mejor una puntuación más alta) en el resto
+    '''
+    if BUSQUEDA[modelo][0] == 'clasificacion':
+        return accuracy_score(y, prediccion)
+    return -mean_squared_error(y, prediccion)
+
+
+def clave_cache(modelo, parametros, *arrays):
+    '''
+    Función que devuelve la clave de un ajuste: el hash de sus datos, del modelo y de sus parámetros
+    '''
+    resumen = hashlib.sha256(json.dumps([modelo, parametros], sort_keys=True).encode('utf-8'))
+    for array in arrays:
+        # Los arrays de texto (los resultados) se pasan a cadenas de longitud fija para resumir su contenido
+        array = np.asarray(array)
+        array = np.ascontiguousarray(array.astype(str) if array.dtype == object else array)
+        resumen.update(str((array.dtype, array.shape)).encode('utf-8'))
+        resumen.update(array.tobytes())
+    return resumen.hexdigest()
+
+
+def evaluar_pliegue(modelo, parametros, X_train, y_train, X_test, y_test, ruta_cache=RUTA_CACHE):
+    '''
+    Función que ajusta un modelo en un pliegue y devuelve su puntuación y si estaba en la caché. El modelo ajustado
+    se guarda en la caché con su puntuación.
+    '''
+    ruta = os.path.join(ruta_cache, clave_cache(modelo, parametros, X_train, y_train, X_test, y_test) + '.joblib')
+    if os.path.exists(ruta):
+        return joblib.load(ruta)['puntuacion'], True
+
+    ajustado = ajustar(modelo, parametros, X_train, y_train)
+    puntuacion = puntuar(modelo, y_test, predecir(modelo, ajustado, X_test))
+    os.makedirs(ruta_cache, exist_ok=True)
+    joblib.dump({'modelo': ajustado, 'puntuacion': puntuacion}, ruta + '.tmp', compress=3)
+    os.replace(ruta + '.tmp', ruta)
+    return puntuacion, False
+
+
+def ajustar_final(modelo, parametros, X, y, ruta_cache=RUTA_CACHE):
+    '''
+    Función que ajusta un modelo con todos los datos, reutilizándolo de la caché si ya se había ajustado
+    '''
+    ruta = os.path.join(ruta_cache, clave_cache(modelo, parametros, X, y) + '.joblib')
+    if os.path.exists(ruta):
+        return joblib.load(ruta)['modelo']
+
+    ajustado = ajustar(modelo, parametros, X, y)
+    os.makedirs(ruta_cache, exist_ok=True)
+    joblib.dump({'modelo': ajustado}, ruta + '.tmp', compress=3)
+    os.replace(ruta + '.tmp', ruta)
+    return ajustado
+
+
+def datos_modelo(modelo, datos):
+    '''
+    Función que devuelve la X y la y de un modelo: los de clasificación predicen el resultado y el resto su código.
+    X se mantiene como DataFrame para que los modelos guarden los nombres de las características.
+    '''
+    X = datos[CARACTERISTICAS]
+    y = datos['Results'].to_numpy() if BUSQUEDA[modelo][0] == 'clasificacion' else datos['codigo'].to_numpy()
+    return X, y
+
+
+def buscar(datos, modelos=None, n_pliegues=5, procesos=None, ruta_cache=RUTA_CACHE):
+    '''
+    Función que hace la validación cruzada por temporadas de todos los parámetros de los modelos indicados (por
+    defecto, todos) repartiendo los ajustes entre varios procesos, y devuelve un DataFrame con la puntuación media
+    de cada combinación y el número de ajustes que se han reutilizado de la caché
+    '''
+    modelos = modelos or list(BUSQUEDA)
+    if n_pliegues < 1:
+        raise ValueError(f'El número de pliegues tiene que ser al menos 1 (se ha pedido {n_pliegues})')
+    pliegues = pliegues_por_temporada(datos['Season'].to_numpy(), n_pliegues)
+    if not pliegues:
+        raise ValueError('No hay pliegues para la validación cruzada: hacen falta partidos de al menos dos temporadas')
+
+    tareas, combinaciones = [], []
+    for modelo in modelos:
+        X, y = datos_modelo(modelo, datos)
+        for parametros in BUSQUEDA[modelo][1]:
+            combinaciones.append((modelo, parametros))
+            for train, test in pliegues:
+                tareas.append((modelo, parametros, X.iloc[train], y[train], X.iloc[test], y[test], ruta_cache))
+
+    with tramo('entrenamiento.validacion'), ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        resultados = list(ejecutor.map(evaluar_pliegue, *zip(*tareas)))
+    contar('ajustes de validación', len(tareas))
+
+    filas = []
+    for i, (modelo, parametros) in enumerate(combinaciones):
+        puntuaciones, en_cache = zip(*resultados[i * len(pliegues):(i + 1) * len(pliegues)])
+        filas.append({'modelo': modelo, 'parametros': parametros, 'puntuacion': np.mean(puntuaciones),
+                      'desviacion': np.std(puntuaciones), 'en cache': sum(en_cache), 'pliegues': len(pliegues)})
+    return pd.DataFrame(filas)
+
+
+def mejores_parametros(resultados):
+    '''
+    Función que devuelve un diccionario con los parámetros con mejor puntuación media de cada modelo
+    '''
+    mejores = resultados.loc[resultados.groupby('modelo', sort=False)['puntuacion'].idxmax()]
+    return dict(zip(mejores['modelo'], mejores['parametros']))
+
+
+def entrenar_mejores(datos, parametros, procesos=None, ruta_cache=RUTA_CACHE, ruta_modelos=RUTA_MODELOS,
+                     ruta_series=RUTA_SERIES):
+    '''
+    Función que ajusta con todos los datos los mejores parámetros de cada modelo y los guarda junto con las
+    características con las que se han entrenado: los de clasificación en el archivo que usa prediccion.py y el
+    resto en 'ruta_series'. En los dos archivos se mantienen los modelos que no se han vuelto a entrenar
+    '''
+    tareas = [(modelo, parametros[modelo], *datos_modelo(modelo, datos), ruta_cache) for modelo in parametros]
+    with tramo('entrenamiento.mejores'), ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        ajustados = dict(zip(parametros, ejecutor.map(ajustar_final, *zip(*tareas))))
+
+    clasificacion = {modelo: ajustado for modelo, ajustado in ajustados.items()
+                     if BUSQUEDA[modelo][0] == 'clasificacion'}
+    series = {modelo: ajustado for modelo, ajustado in ajustados.items() if modelo not in clasificacion}
+    if series:
+        # Los modelos que no se han vuelto a entrenar se mantienen
+        guardado = joblib.load(ruta_series) if os.path.exists(ruta_series) else {'modelos': {}, 'parametros': {}}
+        guardado['modelos'].update(series)
+        guardado['parametros'].update({modelo: parametros[modelo] for modelo in series})
+        joblib.dump({'modelos': guardado['modelos'], 'caracteristicas': CARACTERISTICAS, 'codigos': CODIGOS_RESULTADOS,
+                     'parametros': guardado['parametros']}, ruta_series)
+    if clasificacion:
+        # Los clasificadores guardados solo se mantienen si se entrenaron con las mismas características
+        guardado = joblib.load(ruta_modelos) if os.path.exists(ruta_modelos) else None
+        if guardado is None or guardado['caracteristicas'] != CARACTERISTICAS:
+            guardado = {'modelos': {}, 'parametros': {}}
+        modelos = {**guardado['modelos'], **clasificacion}
+        # prediccion.py necesita los tres modelos de clasificación para cargar el archivo
+        necesarios = {nombre for nombre, (familia, _) in BUSQUEDA.items() if familia == 'clasificacion'}
+        faltan = sorted(necesarios - set(modelos))
+        if faltan:
+            raise ValueError(f"No se ha guardado '{ruta_modelos}': faltan los modelos {', '.join(faltan)}, que no "
+                             'están en el archivo guardado; hay que entrenarlos también con --modelos')
+        guardar_modelos(modelos, ruta_modelos, {**(guardado['parametros'] or {}),
+                                                **{modelo: parametros[modelo] for modelo in clasificacion}})
+    return ajustados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Validación cruzada por temporadas y búsqueda de hiperparámetros de los modelos')
+    parser.add_argument('--modelos', nargs='+', choices=list(BUSQUEDA), default=None,
+                        help='Modelos que se entrenan (por defecto, todos)')
+    parser.add_argument('--pliegues', type=int, default=5, help='Número de temporadas que se predicen en la validación')
+    parser.add_argument('--procesos', type=int, default=None, help='Número de procesos (por defecto, uno por núcleo)')
+    args = parser.parse_args()
+
+    partidos = pd.read_csv(os.path.join(RUTA_DATOS, 'partidos_limpio.csv'))
+    motor, _ = actualizar_motor(partidos, os.path.join(RUTA_DATOS, os.path.basename(RUTA_ELO)))
+    datos = preparar_datos(partidos, pd.read_parquet(RUTA_ALMACEN), motor)
+
+    inicio = time.perf_counter()
+    resultados = buscar(datos, args.modelos, args.pliegues, args.procesos)
+    print(f'Validación cruzada completada en {time.perf_counter() - inicio:.1f} s '
+          f"({resultados['en cache'].sum()} de {(resultados['pliegues']).sum()} ajustes reutilizados de la caché)")
+    print(resultados.round(4).to_string(index=False))
+
+    inicio = time.perf_counter()
+    entrenar_mejores(datos, mejores_parametros(resultados), args.procesos)
+    print(f'Mejores modelos entrenados y guardados en {time.perf_counter() - inicio:.1f} s')
@@ -0,0 +1,265 @@
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+# medicion.py está en la carpeta UEFA
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from medicion import contar, tramo
+
+# Las valoraciones Elo se calculan con el módulo elo.py de la carpeta 'analisis'
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'analisis'))
+from elo import RUTA_ELO, actualizar_motor, caracteristicas_elo
+
+# Rutas calculadas a partir de este archivo para no depender del directorio desde el que se ejecute
+RUTA_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data')
+RUTA_ALMACEN = os.path.join(RUTA_DATOS, 'caracteristicas_equipos.parquet')
+RUTA_MODELOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modelos_clasificacion.joblib')
+
+TEMPORADA = '2023-2024'
+
+# Estadísticas de cada equipo en el almacén de características
+ESTADISTICAS = ['# Pl', 'Age', 'MP', 'Starts', 'Gls', 'Ast', 'G+A', 'G-PK', 'PK', 'PKatt', 'CrdY', 'CrdR']
+
+# Características de cada partido: las columnas que se estandarizan en clasificacion.ipynb, en el mismo orden, y
+# las valoraciones Elo de los dos equipos antes del partido. Son las que se pueden calcular para cualquier pareja de
+# equipos antes de jugar el partido
+CARACTERISTICAS_ELO = ['Elo (Home)', 'Elo (Away)', 'Elo Expected (Home)']
+CARACTERISTICAS = (['Points (Home)', 'Points (Away)'] + [f'{columna}_home' for columna in ESTADISTICAS]
+                   + [f'{columna}_away' for columna in ESTADISTICAS] + CARACTERISTICAS_ELO)
+
+# Modelos de clasificacion.ipynb con sus mismos hiperparámetros. La estandarización se ajusta con los datos de
+# entrenamiento y SVC calcula probabilidades para poder usar predict_proba como en el resto de modelos
+MODELOS = {
+    'LR': lambda: LogisticRegression(C=0.1, penalty='l2', solver='liblinear', max_iter=1000, random_state=42),
+    'SVC': lambda: SVC(random_state=912, kernel='sigmoid', probability=True),
+    'XGB': lambda: GradientBoostingClassifier(random_state=912)
+}
+
+
+def tabla_equipos(almacen):
+    '''
+    Función que prepara el almacén de características para buscar equipos por (temporada, equipo)
+    '''
+    tabla = almacen.astype({'Season': str, 'Squad': str}).set_index(['Season', 'Squad'])
+    return tabla[['Points'] + ESTADISTICAS].astype(np.float64)
+
+
+def construir_caracteristicas(tabla, temporadas, locales, visitantes, elo):
+    '''
+    Función que devuelve la matriz de características de los partidos entre 'locales' y 'visitantes' en las
+    temporadas indicadas, buscando todos los equipos a la vez en la tabla de equipos. 'elo' son las características
+    Elo de los mismos partidos (ver caracteristicas_elo)
+    '''
+    local = tabla.reindex(pd.MultiIndex.from_arrays([temporadas, locales])).to_numpy()
+    visitante = tabla.reindex(pd.MultiIndex.from_arrays([temporadas, visitantes])).to_numpy()
+    # Points (Home), Points (Away), estadísticas del local, estadísticas del visitante y características Elo
+    datos = np.column_stack([local[:, 0], visitante[:, 0], local[:, 1:], visitante[:, 1:],
+                             elo[CARACTERISTICAS_ELO].to_numpy()])
+    return pd.DataFrame(datos, columns=CARACTERISTICAS)
+
+
+def caracteristicas_partidos(partidos, almacen, motor):
+    '''
+    Función que devuelve la matriz de características de los partidos jugados de la tabla, con las valoraciones Elo
+    que tenía cada equipo antes de cada partido
+    '''
+    return construir_caracteristicas(tabla_equipos(almacen), partidos['Season'].astype(str).to_numpy(),
+                                     partidos['Home'].astype(str).to_numpy(), partidos['Away'].astype(str).to_numpy(),
+                                     caracteristicas_elo(partidos, motor))
+
+
+def entrenar_modelos(partidos, almacen, motor):
+    '''
+    Función que entrena los modelos con todos los partidos que tienen características en el almacén
+    '''
+    X = caracteristicas_partidos(partidos, almacen, motor)
+    validos = X.notna().all(axis=1).to_numpy() & partidos['Results'].notna().to_numpy()
+    X, y = X[validos], partidos['Results'].to_numpy()[validos]
+    modelos = {}
+    for nombre, crear in MODELOS.items():
+        with tramo(f'ajuste.{nombre}'):
+            modelos[nombre] = make_pipeline(StandardScaler(), crear()).fit(X, y)
+    contar('filas de entrenamiento', len(y))
+    return modelos
+
+
+def guardar_modelos(modelos, ruta=RUTA_MODELOS, parametros=None):
+    '''
+    Función que guarda los modelos junto con las características con las que se han entrenado y, si se indican, sus
+    hiperparámetros
+    '''
+    joblib.dump({'modelos': modelos, 'caracteristicas': CARACTERISTICAS, 'parametros': parametros}, ruta)
+
+
+def cargar_modelos(ruta=RUTA_MODELOS):
+    '''
+    Función que carga los modelos guardados y comprueba que se entrenaron con las mismas características
+    '''
+    guardado = joblib.load(ruta)
+    if guardado['caracteristicas'] != CARACTERISTICAS:
+        raise ValueError(f"Los modelos de '{ruta}' se entrenaron con otras características")
+    return guardado['modelos']
+
+
+class Predictor:
+    '''
+    Clase que carga los modelos y el almacén de características una sola vez y calcula las probabilidades de los
+    partidos entre cualquier pareja de equipos, guardando las ya calculadas
+    '''
+
+    def __init__(self, modelos, almacen, motor):
+        self.modelos = modelos
+        self.tabla = tabla_equipos(almacen)
+        # Motor Elo con todos los partidos jugados: los partidos que se predicen usan la valoración actual
+        self.motor = motor
+        # Todos los modelos se entrenan con las mismas etiquetas, así que tienen las mismas clases ('A', 'D', 'H')
+        self.clases = list(next(iter(modelos.values())).classes_)
+        # Probabilidades ya calculadas por (modelo, temporada, local, visitante)
+        self.cache = {}
+
+    @classmethod
+    def cargar(cls, ruta_modelos=RUTA_MODELOS, ruta_almacen=RUTA_ALMACEN, reentrenar=False):
+        '''
+        Función que crea el predictor con los modelos guardados; si no hay modelos guardados (o 'reentrenar' es True)
+        los entrena con partidos_limpio.csv y los guarda. Las valoraciones Elo se leen del estado guardado del motor,
+        al que solo se aplican los partidos que falten
+        '''
+        ruta_datos = os.path.dirname(ruta_almacen)
+        almacen = pd.read_parquet(ruta_almacen)
+        partidos = pd.read_csv(os.path.join(ruta_datos, 'partidos_limpio.csv'))
+        motor, _ = actualizar_motor(partidos, os.path.join(ruta_datos, os.path.basename(RUTA_ELO)))
+        if reentrenar or not os.path.exists(ruta_modelos):
+            guardar_modelos(entrenar_modelos(partidos, almacen, motor), ruta_modelos)
+        return cls(cargar_modelos(ruta_modelos), almacen, motor)
+
+    def probabilidades(self, pares, temporada=TEMPORADA, modelo='LR'):
+        '''
+        Función que devuelve un array con las probabilidades de cada clase de los partidos (local, visitante) de
+        'pares'. Los pares que no están en la caché se calculan todos juntos con una sola llamada a predict_proba.
+        '''
+        faltan = list(dict.fromkeys(par for par in pares if (modelo, temporada, *par) not in self.cache))
+        if faltan:
+            locales, visitantes = zip(*faltan)
+            elo = caracteristicas_elo(pd.DataFrame({'Home': locales, 'Away': visitantes}), self.motor, actuales=True)
+            X = construir_caracteristicas(self.tabla, [temporada] * len(faltan), locales, visitantes, elo)
+            desconocidos = X.isna().any(axis=1).to_numpy()
+            if desconocidos.any():
+                equipos = sorted({equipo for par, falta in zip(faltan, desconocidos) if falta for equipo in par
+                                  if (temporada, equipo) not in self.tabla.index})
+                raise KeyError(f'No hay características de la temporada {temporada} para: {", ".join(equipos)}')
+            for par, fila in zip(faltan, self.modelos[modelo].predict_proba(X)):
+                self.cache[(modelo, temporada, *par)] = fila
+        return np.array([self.cache[(modelo, temporada, *par)] for par in pares]).reshape(-1, len(self.clases))
+
+    def tabla_probabilidades(self, pares, temporada=TEMPORADA):
+        '''
+        Función que devuelve un DataFrame con las probabilidades de todos los modelos para cada partido
+        '''
+        indice = pd.MultiIndex.from_tuples(pares, names=['Home', 'Away'])
+        return pd.concat({modelo: pd.DataFrame(self.probabilidades(pares, temporada, modelo), index=indice,
+                                               columns=self.clases) for modelo in self.modelos}, axis=1)
+
+    def matrices_partido(self, equipos, temporada=TEMPORADA, modelo='LR', resultados=None):
+        '''
+        Función que devuelve tres matrices (H, D, A) con las probabilidades de victoria local, empate y victoria
+        visitante de todos los partidos posibles entre 'equipos', donde la fila es el local y la columna el visitante.
+        Todos los partidos se calculan con una sola llamada a predict_proba.
+
+        'resultados' es un diccionario {(local, visitante): 'H', 'D' o 'A'} con los partidos ya jugados, cuya
+        probabilidad pasa a ser 1 para el resultado real.
+        '''
+        pares = [(local, visitante) for local in equipos for visitante in equipos if local != visitante]
+        probabilidades = dict(zip(pares, self.probabilidades(pares, temporada, modelo)))
+        for par, resultado in (resultados or {}).items():
+            if par in probabilidades:
+                probabilidades[par] = np.array([clase == resultado for clase in self.clases], dtype=np.float64)
+
+        matrices = np.zeros((len(self.clases), len(equipos), len(equipos)))
+        posiciones = {equipo: i for i, equipo in enumerate(equipos)}
+        for (local, visitante), fila in probabilidades.items():
+            matrices[:, posiciones[local], posiciones[visitante]] = fila
+        return tuple(matrices[self.clases.index(clase)] for clase in ('H', 'D', 'A'))
+
+    def evaluar_cuadro(self, cuadro, temporada=TEMPORADA, modelo='LR', ida_y_vuelta=True, resultados=None):
+        '''
+        Función que devuelve, por equipo, la probabilidad exacta de llegar a cada ronda y de ganar el título teniendo
+        en cuenta todos los cruces posibles del cuadro.
+
+        'cuadro' es la lista de equipos en orden (el primero juega contra el segundo, el tercero contra el cuarto, etc.)
+        y su longitud tiene que ser una potencia de 2. Las eliminatorias son a ida y vuelta (si 'ida_y_vuelta' es True),
+        y si acaban igualadas se deciden al 50%. La final es a un partido y en ella hace de local el equipo de la mitad
+        superior del cuadro, como en las filas final1 y final2 de clasificacion.ipynb.
+        '''
+        n = len(cuadro)
+        if n < 2 or n & (n - 1):
+            raise ValueError('El número de equipos del cuadro tiene que ser una potencia de 2')
+        with tramo('prediccion.probabilidades'):
+            H, D, A = self.matrices_partido(cuadro, temporada, modelo, resultados)
+        contar('cuadros evaluados')
+
+        # Probabilidad de que la fila i pase contra la columna j en una eliminatoria a ida y vuelta: i es local en la
+        # ida (H, D, A de [i, j]) y visitante en la vuelta (A, D, H de [j, i]); pasa quien gana más partidos
+        gana_ida, empata_ida, pierde_ida = H, D, A
+        gana_vuelta, empata_vuelta, pierde_vuelta = A.T, D.T, H.T
+        supera = gana_ida * (gana_vuelta + empata_vuelta) + empata_ida * gana_vuelta
+        igualada = gana_ida * pierde_vuelta + pierde_ida * gana_vuelta + empata_ida * empata_vuelta
+        pasa_ida_y_vuelta = supera + igualada / 2
+
+        rondas = int(np.log2(n))
+        posiciones = np.arange(n)
+        alcanzadas = np.zeros((rondas + 1, n))
+        alcanzadas[0] = 1
+        for ronda in range(rondas):
+            tamano = 2 ** (ronda + 1)
+            # Los rivales posibles de cada equipo en esta ronda están en la otra mitad de su bloque del cuadro
+            mismo_bloque = posiciones[:, None] // tamano == posiciones[None, :] // tamano
+            mitad_superior = posiciones % tamano < tamano // 2
+            rivales = mismo_bloque & (mitad_superior[:, None] != mitad_superior[None, :])
+
+            if ronda == rondas - 1 or not ida_y_vuelta:
+                pasa = np.where(mitad_superior[:, None], H + D / 2, (A + D / 2).T)
+            else:
+                pasa = pasa_ida_y_vuelta
+            alcanzadas[ronda + 1] = alcanzadas[ronda] * ((rivales * pasa) @ alcanzadas[ronda])
+
+        resultado = pd.DataFrame(index=pd.Index(cuadro, name='equipo'))
+        for ronda in range(1, rondas):
+            resultado[f'ronda {ronda + 1}'] = alcanzadas[ronda]
+        resultado['título'] = alcanzadas[-1]
+        return resultado.sort_values('título', ascending=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calcula las probabilidades de un cuadro de eliminatorias con los modelos de clasificación')
+    parser.add_argument('--equipos', nargs='+', default=['Real Madrid', 'Bayern Munich', 'Paris S-G', 'Dortmund'],
+                        help='Equipos del cuadro en orden de emparejamiento (una potencia de 2)')
+    parser.add_argument('--temporada', default=TEMPORADA)
+    parser.add_argument('--reentrenar', action='store_true', help='Vuelve a entrenar y guardar los modelos')
+    parser.add_argument('--salida', default=None, help='CSV donde se guardan los cuadros de todos los modelos')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    predictor = Predictor.cargar(reentrenar=args.reentrenar)
+    print(f'Modelos cargados en {time.perf_counter() - inicio:.2f} s')
+
+    cuadros = []
+    for modelo in predictor.modelos:
+        inicio = time.perf_counter()
+        cuadro = predictor.evaluar_cuadro(args.equipos, args.temporada, modelo)
+        print(f'\n{modelo} ({(time.perf_counter() - inicio) * 1000:.1f} ms):')
+        print(cuadro.round(4).to_string())
+        cuadros.append(cuadro.rename_axis('Squad').reset_index().assign(modelo=modelo))
+
+    if args.salida:
+        pd.concat(cuadros, ignore_index=True).to_csv(args.salida, index=False)
+        print(f"\nEl archivo '{args.salida}' ha sido creado exitosamente.")
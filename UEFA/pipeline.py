@@ -0,0 +1,267 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+
+RUTA_UEFA = os.path.dirname(os.path.abspath(__file__))
+RUTA_DATOS = os.path.join(RUTA_UEFA, 'data')
+# Carpeta con el estado de la última ejecución, los registros de cada etapa y los resultados de las predicciones
+RUTA_PIPELINE = os.path.join(RUTA_DATOS, 'pipeline')
+RUTA_ESTADO = os.path.join(RUTA_PIPELINE, 'estado.json')
+# Script que ejecuta cada etapa midiendo su tiempo, CPU, memoria y los tramos y contadores de sus módulos
+RUTA_MEDICION = os.path.join(RUTA_UEFA, 'medicion.py')
+
+WEBSCRAPING = os.path.join(RUTA_UEFA, 'webscraping')
+ANALISIS = os.path.join(RUTA_UEFA, 'analisis')
+SUPERVISADO = os.path.join(RUTA_UEFA, 'modelos', 'aprendizaje supervisado')
+REFUERZO = os.path.join(RUTA_UEFA, 'modelos', 'aprendizaje por refuerzo')
+
+TABLAS = ['equipos', 'jugadores', 'partidos', 'overall']
+
+
+class Etapa:
+    '''
+    Clase que describe una etapa del pipeline: el script que se ejecuta (con su carpeta como directorio de trabajo), los
+    archivos que lee y los que escribe. Las dependencias entre etapas salen de estos archivos. 'codigo' son los módulos
+    de otras carpetas que importa el script (rutas desde la carpeta UEFA). Si 'siempre' es True la etapa se ejecuta en
+    todas las pasadas (los scrapers, que ya son incrementales por su cuenta)
+    '''
+    def __init__(self, nombre, carpeta, comando, entradas=(), salidas=(), codigo=(), siempre=False):
+        self.nombre = nombre
+        self.carpeta = carpeta
+        self.comando = list(comando)
+        self.entradas = [os.path.normpath(os.path.join(RUTA_DATOS, ruta)) for ruta in entradas]
+        self.salidas = [os.path.normpath(os.path.join(RUTA_DATOS, ruta)) for ruta in salidas]
+        self.codigo = [os.path.normpath(os.path.join(RUTA_UEFA, ruta)) for ruta in codigo]
+        self.siempre = siempre
+
+    def fuentes(self):
+        '''
+        Función que devuelve el código del que depende la etapa: todos los .py de su carpeta, ya que los scripts
+        importan los módulos vecinos, medicion.py, que importan todos los módulos, y los módulos de 'codigo'
+        '''
+        vecinos = [os.path.join(self.carpeta, archivo) for archivo in os.listdir(self.carpeta) if archivo.endswith('.py')]
+        return sorted(set(vecinos + [RUTA_MEDICION] + self.codigo))
+
+
+ETAPAS = [
+    # Los cuatro scrapers se ejecutan en un solo proceso para que compartan las conexiones, la caché de páginas y el
+    # límite de peticiones por minuto a fbref
+    Etapa('descargar', WEBSCRAPING, ['main.py', '--tablas', *TABLAS], salidas=[f'{tabla}.csv' for tabla in TABLAS],
+          siempre=True),
+    *[Etapa(f'limpiar_{tabla}', ANALISIS, ['limpieza.py', '--tablas', tabla],
+            entradas=[f'{tabla}.csv'] + (['equipos_limpio.csv', 'jugadores_limpio.csv'] if tabla == 'partidos' else []),
+            salidas=[f'{tabla}_limpio.csv', f'{tabla}_limpio.parquet'])
+      for tabla in TABLAS],
+    Etapa('caracteristicas', ANALISIS, ['caracteristicas.py'], entradas=['jugadores_limpio.csv', 'equipos_limpio.csv'],
+          salidas=['caracteristicas_equipos.parquet']),
+    Etapa('elo', ANALISIS, ['elo.py'], entradas=['partidos_limpio.csv'], salidas=['elo_equipos.npz']),
+    # entrenamiento.py y prediccion.py calculan las características Elo con elo.py
+    Etapa('entrenamiento', SUPERVISADO, ['entrenamiento.py'],
+          entradas=['partidos_limpio.csv', 'caracteristicas_equipos.parquet', 'elo_equipos.npz'],
+          salidas=[os.path.join('..', 'modelos', 'aprendizaje supervisado', 'modelos_clasificacion.joblib'),
+                   os.path.join('..', 'modelos', 'aprendizaje supervisado', 'modelos_series.joblib')],
+          codigo=[os.path.join('analisis', 'elo.py')]),
+    Etapa('prediccion', SUPERVISADO, ['prediccion.py', '--salida', os.path.join(RUTA_PIPELINE, 'prediccion.csv')],
+          entradas=[os.path.join('..', 'modelos', 'aprendizaje supervisado', 'modelos_clasificacion.joblib'),
+                    'caracteristicas_equipos.parquet', 'partidos_limpio.csv', 'elo_equipos.npz'],
+          salidas=[os.path.join('pipeline', 'prediccion.csv')], codigo=[os.path.join('analisis', 'elo.py')]),
+    Etapa('simulacion', REFUERZO, ['simulacion.py', '--salida', os.path.join(RUTA_PIPELINE, 'simulacion.csv')],
+          entradas=['partidos_limpio.csv'], salidas=[os.path.join('pipeline', 'simulacion.csv')]),
+]
+
+
+def dependencias(etapas):
+    '''
+    Función que devuelve, para cada etapa, las etapas que escriben alguno de los archivos que lee
+    '''
+    productores = {salida: etapa.nombre for etapa in etapas for salida in etapa.salidas}
+    return {etapa.nombre: sorted({productores[entrada] for entrada in etapa.entradas if entrada in productores})
+            for etapa in etapas}
+
+
+def seleccionar(etapas, nombres=None, hasta=None, sin_descargas=False):
+    '''
+    Función que elige las etapas que se ejecutan: las indicadas, o una etapa y todas las anteriores de las que depende
+    '''
+    if hasta:
+        previas = dependencias(etapas)
+        elegidas, pendientes = set(), list(hasta)
+        while pendientes:
+            nombre = pendientes.pop()
+            if nombre not in elegidas:
+                elegidas.add(nombre)
+                pendientes.extend(previas[nombre])
+        etapas = [etapa for etapa in etapas if etapa.nombre in elegidas]
+    if nombres:
+        etapas = [etapa for etapa in etapas if etapa.nombre in nombres]
+    if sin_descargas:
+        etapas = [etapa for etapa in etapas if etapa.carpeta != WEBSCRAPING]
+    return etapas
+
+
+def hash_archivo(ruta, bloque=1 << 20):
+    '''
+    Función que calcula el hash del contenido de un archivo (None si no existe)
+    '''
+    if not os.path.exists(ruta):
+        return None
+    resumen = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for trozo in iter(lambda: archivo.read(bloque), b''):
+            resumen.update(trozo)
+    return resumen.hexdigest()
+
+
+def huella(etapa):
+    '''
+    Función que resume en un hash todo lo que determina el resultado de una etapa: el comando, el contenido de los
+    archivos que lee y su código
+    '''
+    partes = {
+        'comando': etapa.comando,
+        'entradas': {os.path.relpath(ruta, RUTA_DATOS): hash_archivo(ruta) for ruta in etapa.entradas},
+        'fuentes': {os.path.relpath(ruta, RUTA_UEFA): hash_archivo(ruta) for ruta in etapa.fuentes()},
+    }
+    return hashlib.sha256(json.dumps(partes, sort_keys=True).encode()).hexdigest()
+
+
+def al_dia(etapa, estado, huella_actual):
+    '''
+    Función que indica si una etapa se puede saltar: su huella coincide con la de la última ejecución correcta y sus
+    salidas siguen siendo las que escribió
+    '''
+    anterior = estado.get(etapa.nombre)
+    if etapa.siempre or anterior is None or anterior['huella'] != huella_actual:
+        return False
+    return all(hash_archivo(ruta) == anterior['salidas'].get(os.path.relpath(ruta, RUTA_DATOS)) for ruta in etapa.salidas)
+
+
+def cargar_estado(ruta=RUTA_ESTADO):
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def guardar_estado(estado, ruta=RUTA_ESTADO):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta + '.tmp', 'w', encoding='utf-8') as archivo:
+        json.dump(estado, archivo, indent=2, ensure_ascii=False)
+    os.replace(ruta + '.tmp', ruta)
+
+
+def ejecutar_etapa(etapa, estado, forzar=False, medir=False):
+    '''
+    Función que ejecuta una etapa si no está al día. La salida del script se guarda en 'pipeline/registros/<etapa>.log'.
+    Devuelve el estado de la etapa ('omitida', 'completada' o 'fallida'), el registro que se guarda, los segundos y,
+    si 'medir' es True, la medición de medicion.py (que también se guarda en 'pipeline/mediciones/<etapa>.json')
+    '''
+    inicio = time.perf_counter()
+    huella_actual = huella(etapa)
+    if not forzar and al_dia(etapa, estado, huella_actual):
+        return 'omitida', estado[etapa.nombre], time.perf_counter() - inicio, None
+
+    ruta_log = os.path.join(RUTA_PIPELINE, 'registros', f'{etapa.nombre}.log')
+    ruta_medicion = os.path.join(RUTA_PIPELINE, 'mediciones', f'{etapa.nombre}.json')
+    os.makedirs(os.path.dirname(ruta_log), exist_ok=True)
+    comando = [RUTA_MEDICION, '--salida', ruta_medicion, *etapa.comando] if medir else etapa.comando
+    with open(ruta_log, 'w', encoding='utf-8') as log:
+        proceso = subprocess.run([sys.executable, *comando], cwd=etapa.carpeta, stdout=log, stderr=subprocess.STDOUT,
+                                 stdin=subprocess.DEVNULL)
+    segundos = time.perf_counter() - inicio
+
+    medicion = None
+    if medir and os.path.exists(ruta_medicion):
+        with open(ruta_medicion, encoding='utf-8') as archivo:
+            medicion = json.load(archivo)
+    if proceso.returncode != 0:
+        return 'fallida', None, segundos, medicion
+    registro = {
+        'huella': huella_actual,
+        'salidas': {os.path.relpath(ruta, RUTA_DATOS): hash_archivo(ruta) for ruta in etapa.salidas},
+        'segundos': round(segundos, 3),
+    }
+    return 'completada', registro, segundos, medicion
+
+
+def ejecutar(etapas, procesos=2, forzar=False, ruta_estado=RUTA_ESTADO, medir=False):
+    '''
+    Función que ejecuta las etapas en orden de dependencias. Las etapas independientes (los scrapers, la limpieza de
+    cada tabla...) se lanzan a la vez, hasta 'procesos' al mismo tiempo. Si una etapa falla, las que dependen de ella no
+    se ejecutan. Devuelve un DataFrame con el resultado de cada etapa y, si 'medir' es True, su CPU y pico de memoria
+    '''
+    estado = cargar_estado(ruta_estado)
+    nombres = {etapa.nombre for etapa in etapas}
+    previas = {nombre: [previa for previa in lista if previa in nombres] for nombre, lista in dependencias(etapas).items()}
+    por_nombre = {etapa.nombre: etapa for etapa in etapas}
+    resultados, pendientes, en_curso = {}, [etapa.nombre for etapa in etapas], {}
+
+    with ThreadPoolExecutor(max_workers=max(1, procesos)) as ejecutor:
+        while pendientes or en_curso:
+            for nombre in list(pendientes):
+                estados_previos = [resultados.get(previa, (None,))[0] for previa in previas[nombre]]
+                if any(previo in ('fallida', 'cancelada') for previo in estados_previos):
+                    resultados[nombre] = ('cancelada', 0.0, None)
+                    pendientes.remove(nombre)
+                elif all(previo is not None for previo in estados_previos):
+                    en_curso[ejecutor.submit(ejecutar_etapa, por_nombre[nombre], estado, forzar, medir)] = nombre
+                    pendientes.remove(nombre)
+            if not en_curso:
+                continue
+
+            terminadas, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for tarea in terminadas:
+                nombre = en_curso.pop(tarea)
+                resultado, registro, segundos, medicion = tarea.result()
+                resultados[nombre] = (resultado, segundos, medicion)
+                print(f'{nombre}: {resultado} ({segundos:.2f} s)', flush=True)
+                if resultado == 'completada':
+                    estado[nombre] = registro
+                    guardar_estado(estado, ruta_estado)
+
+    resumen = pd.DataFrame([(nombre, *resultados[nombre][:2]) for nombre in por_nombre],
+                           columns=['etapa', 'estado', 'segundos'])
+    if medir:
+        mediciones = [resultados[nombre][2] or {} for nombre in por_nombre]
+        resumen['segundos cpu'] = [medicion.get('segundos cpu') for medicion in mediciones]
+        resumen['pico memoria (MB)'] = [medicion['pico memoria'] / 1e6 if medicion.get('pico memoria') else None
+                                        for medicion in mediciones]
+    return resumen
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ejecuta sin menús el pipeline completo: web scraping, limpieza, '
+                                                 'características, entrenamiento y predicción')
+    nombres = [etapa.nombre for etapa in ETAPAS]
+    parser.add_argument('--etapas', nargs='+', choices=nombres, help='Ejecuta solo estas etapas')
+    parser.add_argument('--hasta', nargs='+', choices=nombres,
+                        help='Ejecuta estas etapas y todas las anteriores de las que dependen')
+    parser.add_argument('--sin-descargas', action='store_true', help='No hace web scraping; usa los CSV que ya hay')
+    parser.add_argument('--forzar', action='store_true', help='Ejecuta las etapas aunque estén al día')
+    parser.add_argument('--procesos', type=int, default=os.cpu_count(), help='Número de etapas que se ejecutan a la vez')
+    parser.add_argument('--medir', action='store_true',
+                        help="Mide el tiempo, la CPU, la memoria y los tramos de cada etapa (en 'data/pipeline/mediciones')")
+    parser.add_argument('--mostrar', action='store_true', help='Muestra las etapas y sus dependencias sin ejecutarlas')
+    args = parser.parse_args()
+
+    etapas = seleccionar(ETAPAS, args.etapas, args.hasta, args.sin_descargas)
+    if args.mostrar:
+        for etapa, previas in dependencias(etapas).items():
+            print(f"{etapa}: {', '.join(previas) or '-'}")
+        raise SystemExit(0)
+
+    inicio = time.perf_counter()
+    resumen = ejecutar(etapas, args.procesos, args.forzar, medir=args.medir)
+    print(f'\nPipeline terminado en {time.perf_counter() - inicio:.1f} s')
+    print(resumen.round(2).to_string(index=False))
+    if resumen['estado'].isin(['fallida', 'cancelada']).any():
+        print(f"\nConsulte los registros en '{os.path.join(RUTA_PIPELINE, 'registros')}'")
+        raise SystemExit(1)
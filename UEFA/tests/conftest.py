@@ -0,0 +1,81 @@
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Los módulos del repositorio se importan entre sí por su nombre desde su propia carpeta, así que añadimos al path
+# todas las carpetas con módulos, igual que cuando se ejecuta cada script desde la suya
+RUTA_UEFA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CARPETAS = [
+    RUTA_UEFA,
+    os.path.join(RUTA_UEFA, 'webscraping'),
+    os.path.join(RUTA_UEFA, 'analisis'),
+    os.path.join(RUTA_UEFA, 'modelos', 'aprendizaje supervisado'),
+    os.path.join(RUTA_UEFA, 'modelos', 'aprendizaje por refuerzo'),
+    os.path.join(RUTA_UEFA, 'modelos', 'aprendizaje no supervisado'),
+    os.path.join(RUTA_UEFA, 'modelos', 'aprendizaje profundo'),
+]
+for carpeta in reversed(CARPETAS):
+    if carpeta not in sys.path:
+        sys.path.insert(0, carpeta)
+
+# Datos del repositorio que usan las pruebas como fixtures (solo se leen)
+RUTA_DATOS = os.path.join(RUTA_UEFA, 'data')
+
+
+class ServidorPrueba:
+    '''
+    Servidor HTTP local para probar las descargas sin acceder a fbref. Cada ruta responde, en orden, con las respuestas
+    indicadas en 'respuestas' (la última se repite): tuplas (estado, cabeceras, cuerpo) o funciones que reciben las
+    cabeceras de la petición y devuelven la tupla. Guarda la ruta, las cabeceras y el momento de cada petición
+    '''
+
+    def __init__(self):
+        self.respuestas = {}
+        self.peticiones = []
+        self.cerrojo = threading.Lock()
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with servidor.cerrojo:
+                    servidor.peticiones.append((self.path, dict(self.headers), time.monotonic()))
+                    pendientes = servidor.respuestas[self.path]
+                    respuesta = pendientes.pop(0) if len(pendientes) > 1 else pendientes[0]
+                if callable(respuesta):
+                    respuesta = respuesta(self.headers)
+                estado, cabeceras, cuerpo = respuesta
+                cuerpo = cuerpo.encode('utf-8')
+                self.send_response(estado)
+                for nombre, valor in {'Content-Type': 'text/html; charset=utf-8', **cabeceras}.items():
+                    self.send_header(nombre, valor)
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.http = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+        self.hilo = threading.Thread(target=self.http.serve_forever, daemon=True)
+        self.hilo.start()
+
+    def url(self, ruta):
+        return f'http://127.0.0.1:{self.http.server_port}{ruta}'
+
+    def rutas_pedidas(self):
+        return [ruta for ruta, _, _ in self.peticiones]
+
+    def cerrar(self):
+        self.http.shutdown()
+        self.http.server_close()
+
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorPrueba()
+    yield servidor
+    servidor.cerrar()
@@ -0,0 +1,19 @@
+import os
+
+import pyarrow.parquet as pq
+
+from almacenamiento import ESQUEMAS, ESTADISTICAS_EQUIPO
+from conftest import RUTA_DATOS
+
+
+def test_las_estadisticas_de_equipo_tienen_el_mismo_tipo_en_todos_los_archivos():
+    esquemas = {nombre: pq.read_schema(os.path.join(RUTA_DATOS, archivo)) for nombre, archivo in [
+        ('equipos', 'equipos_limpio.parquet'), ('partidos', 'partidos_limpio.parquet'),
+        ('caracteristicas', 'caracteristicas_equipos.parquet')]}
+    for columna, tipo in ESTADISTICAS_EQUIPO:
+        assert esquemas['equipos'].field(columna).type == tipo
+        assert esquemas['caracteristicas'].field(columna).type == tipo
+        assert esquemas['partidos'].field(f'{columna}_home').type == tipo
+        assert esquemas['partidos'].field(f'{columna}_away').type == tipo
+    for nombre, esquema in esquemas.items():
+        assert esquema.remove_metadata().equals(ESQUEMAS[nombre])
@@ -0,0 +1,93 @@
+import pytest
+import requests
+
+from cache import CachePaginas, PaginaNoEnCache
+from descargas import Descargador
+
+ACTUAL = '/en/comps/8/2023-2024/stats/2023-2024-Champions-League-Stats'
+PASADA = '/en/comps/8/2021-2022/stats/2021-2022-Champions-League-Stats'
+
+
+def crear_cache(carpeta, **parametros):
+    return CachePaginas(str(carpeta), **{'offline': False, 'temporada_actual': '2023-2024', 'ttl_temporada_actual': 0,
+                                         'ttl_temporadas_pasadas': -1, **parametros})
+
+
+def descargador(cache):
+    return Descargador(max_descargas=2, peticiones_por_minuto=0, reintentos=0, cache=cache)
+
+
+def test_revalida_la_temporada_actual_con_etag(servidor, tmp_path):
+    def respuesta(cabeceras):
+        if cabeceras.get('If-None-Match') == '"v1"':
+            return 304, {'ETag': '"v1"'}, ''
+        return 200, {'ETag': '"v1"'}, '<html>temporada actual</html>'
+
+    servidor.respuestas[ACTUAL] = [respuesta]
+    cache = crear_cache(tmp_path)
+    paginas = descargador(cache)
+    assert paginas.descargar(servidor.url(ACTUAL)) == '<html>temporada actual</html>'
+    assert paginas.descargar(servidor.url(ACTUAL)) == '<html>temporada actual</html>'
+
+    assert [cabeceras.get('If-None-Match') for _, cabeceras, _ in servidor.peticiones] == [None, '"v1"']
+    assert cache.estadisticas == {'aciertos': 0, 'revalidadas': 1, 'sin_revalidar': 0, 'fallos': 1,
+                                  'bytes_ahorrados': len('<html>temporada actual</html>')}
+
+
+def test_revalida_con_last_modified_y_guarda_la_pagina_nueva(servidor, tmp_path):
+    fecha = 'Mon, 01 Apr 2024 10:00:00 GMT'
+    servidor.respuestas[ACTUAL] = [(200, {'Last-Modified': fecha}, 'v1'), (200, {'Last-Modified': fecha}, 'v2')]
+    cache = crear_cache(tmp_path)
+    paginas = descargador(cache)
+    assert paginas.descargar(servidor.url(ACTUAL)) == 'v1'
+    # El servidor responde con una página nueva en lugar de 304
+    assert paginas.descargar(servidor.url(ACTUAL)) == 'v2'
+    assert servidor.peticiones[1][1].get('If-Modified-Since') == fecha
+    assert cache.estadisticas['fallos'] == 2
+    assert cache.leer_pagina(cache.leer_indice(servidor.url(ACTUAL))) == 'v2'
+
+
+def test_las_temporadas_pasadas_no_se_vuelven_a_pedir(servidor, tmp_path):
+    servidor.respuestas[PASADA] = [(200, {'ETag': '"v1"'}, 'pasada')]
+    cache = crear_cache(tmp_path)
+    paginas = descargador(cache)
+    assert [paginas.descargar(servidor.url(PASADA)) for _ in range(3)] == ['pasada'] * 3
+    assert len(servidor.peticiones) == 1
+    assert cache.estadisticas['aciertos'] == 2
+
+
+def test_la_temporada_actual_no_se_revalida_antes_de_su_ttl(servidor, tmp_path):
+    servidor.respuestas[ACTUAL] = [(200, {}, 'actual')]
+    cache = crear_cache(tmp_path, ttl_temporada_actual=3600)
+    paginas = descargador(cache)
+    assert [paginas.descargar(servidor.url(ACTUAL)) for _ in range(2)] == ['actual'] * 2
+    assert len(servidor.peticiones) == 1
+
+
+def test_sin_conexion_solo_usa_la_cache(servidor, tmp_path):
+    servidor.respuestas[ACTUAL] = [(200, {}, 'guardada')]
+    descargador(crear_cache(tmp_path)).descargar(servidor.url(ACTUAL))
+
+    cache = crear_cache(tmp_path, offline=True)
+    paginas = descargador(cache)
+    assert paginas.descargar(servidor.url(ACTUAL)) == 'guardada'
+    with pytest.raises(PaginaNoEnCache):
+        paginas.descargar(servidor.url(PASADA))
+    assert len(servidor.peticiones) == 1
+    assert cache.estadisticas['aciertos'] == 1
+
+
+def test_si_falla_la_revalidacion_devuelve_la_copia_guardada(servidor, tmp_path, capsys):
+    servidor.respuestas[ACTUAL] = [(200, {'ETag': '"v1"'}, 'guardada')]
+    url = servidor.url(ACTUAL)
+    cache = crear_cache(tmp_path)
+    descargador(cache).descargar(url)
+
+    def peticion_caida(url, cabeceras):
+        raise requests.ConnectionError('sin red')
+
+    assert cache.obtener(url, peticion_caida) == 'guardada'
+    assert cache.estadisticas['sin_revalidar'] == 1
+    assert '1 páginas caducadas sin revalidar' in cache.resumen()
+    # Los hilos de descarga no escriben nada en la salida
+    assert capsys.readouterr().out == ''
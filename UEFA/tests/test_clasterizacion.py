@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from sklearn.cluster import DBSCAN
+from sklearn.metrics import davies_bouldin_score
+from sklearn.preprocessing import StandardScaler
+
+from clasterizacion import cargar_matriz, codificar, construir_vocabulario, davies_bouldin, extender, \
+    preparar_matriz
+
+# Más pequeño que el número de filas, para que todo se recorra en varios bloques (y el último incompleto)
+TAMANO_BLOQUE = 7
+
+
+def tabla_aleatoria(filas=50, semilla=0):
+    '''
+    Tabla pequeña con columnas de texto, una fecha, números y una columna constante
+    '''
+    rng = np.random.default_rng(semilla)
+    equipos = np.array(['Real Madrid', 'Milan', 'Ajax', 'Porto'])
+    return pd.DataFrame({
+        'Home': rng.choice(equipos, filas),
+        'Away': rng.choice(equipos, filas),
+        'Date': pd.date_range('2020-01-01', periods=filas, freq='3D').strftime('%Y-%m-%d'),
+        'Goals': rng.integers(0, 6, filas),
+        'xG': rng.normal(1.5, 0.7, filas),
+        'Round': np.ones(filas),
+    })
+
+
+def test_la_matriz_por_bloques_es_la_de_standard_scaler(tmp_path):
+    tabla = tabla_aleatoria()
+
+    def leer_bloques():
+        for inicio in range(0, len(tabla), TAMANO_BLOQUE):
+            yield tabla.iloc[inicio:inicio + TAMANO_BLOQUE]
+
+    matriz = cargar_matriz(preparar_matriz(leer_bloques, 'prueba', str(tmp_path)))
+    vocabulario, _ = construir_vocabulario(leer_bloques)
+    esperada = StandardScaler().fit_transform(codificar(tabla, vocabulario))
+    assert matriz.dtype == np.float32
+    np.testing.assert_allclose(matriz, esperada, rtol=1e-5, atol=1e-5)
+    # 'Home' y 'Away' comparten la codificación
+    assert vocabulario['Home'] == vocabulario['Away']
+
+
+def test_davies_bouldin_por_bloques_igual_que_sklearn():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(60, 4)).astype(np.float32)
+    etiquetas = rng.integers(0, 3, len(X))
+    np.testing.assert_allclose(davies_bouldin(X, etiquetas, TAMANO_BLOQUE), davies_bouldin_score(X, etiquetas))
+
+    # El ruido no cuenta
+    etiquetas[:10] = -1
+    sin_ruido = etiquetas >= 0
+    np.testing.assert_allclose(davies_bouldin(X, etiquetas, TAMANO_BLOQUE),
+                               davies_bouldin_score(X[sin_ruido], etiquetas[sin_ruido]))
+
+
+def test_extender_dbscan_deja_como_ruido_las_filas_lejanas():
+    rng = np.random.default_rng(2)
+    muestra = np.concatenate([rng.normal(0, 0.1, (20, 2)), rng.normal(5, 0.1, (20, 2))])
+    modelo = DBSCAN(eps=0.5, min_samples=5)
+    etiquetas_muestra = modelo.fit_predict(muestra)
+    X = np.array([[0.05, 0.0], [5.0, 5.1], [2.5, 2.5], [20.0, 20.0]])
+    etiquetas = extender(modelo, muestra, etiquetas_muestra, X)
+    assert etiquetas[0] == etiquetas_muestra[0]
+    assert etiquetas[1] == etiquetas_muestra[-1]
+    assert list(etiquetas[2:]) == [-1, -1]
+
+    # Si DBSCAN no encuentra ningún punto núcleo todo es ruido
+    modelo = DBSCAN(eps=0.01, min_samples=5)
+    etiquetas_muestra = modelo.fit_predict(muestra)
+    assert list(extender(modelo, muestra, etiquetas_muestra, X)) == [-1] * len(X)
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+import requests
+
+import descargas
+import servidor_local
+from descargas import Descargador, LimitadorPeticiones
+
+
+def descargador(**parametros):
+    # Sin límite de peticiones ni caché, salvo que la prueba diga lo contrario
+    return Descargador(**{'max_descargas': 4, 'peticiones_por_minuto': 0, 'cache': None, **parametros})
+
+
+def test_reintenta_los_errores_temporales_respetando_retry_after(servidor, monkeypatch):
+    esperas = []
+    monkeypatch.setattr(descargas.time, 'sleep', esperas.append)
+    servidor.respuestas['/pagina'] = [(429, {'Retry-After': '3'}, ''), (503, {'Retry-After': '5'}, ''),
+                                      (200, {}, 'contenido')]
+
+    html = descargador(reintentos=4, espera_reintento=100).descargar(servidor.url('/pagina'))
+    assert html == 'contenido'
+    assert esperas == [3, 5]
+    assert servidor.rutas_pedidas() == ['/pagina'] * 3
+
+
+def test_se_rinde_despues_de_los_reintentos(servidor, monkeypatch):
+    esperas = []
+    monkeypatch.setattr(descargas.time, 'sleep', esperas.append)
+    servidor.respuestas['/caida'] = [(503, {}, '')]
+
+    with pytest.raises(requests.HTTPError):
+        descargador(reintentos=2, espera_reintento=0.5).descargar(servidor.url('/caida'))
+    # Sin Retry-After la espera se duplica en cada reintento
+    assert esperas == [0.5, 1.0]
+    assert len(servidor.peticiones) == 3
+
+
+def test_el_limitador_separa_las_peticiones_a_cada_servidor(servidor):
+    for i in range(4):
+        servidor.respuestas[f'/{i}'] = [(200, {}, str(i))]
+    # 600 peticiones por minuto: una cada 0,1 s aunque haya cuatro hilos descargando
+    list(descargador(peticiones_por_minuto=600).descargar_varias([servidor.url(f'/{i}') for i in range(4)]))
+    momentos = sorted(momento for _, _, momento in servidor.peticiones)
+    assert min(b - a for a, b in zip(momentos, momentos[1:])) >= 0.09
+
+    # Otro servidor no espera al turno del primero
+    limitador = LimitadorPeticiones(60)
+    limitador.esperar('http://a.example/1')
+    inicio = time.monotonic()
+    limitador.esperar('http://b.example/1')
+    assert time.monotonic() - inicio < 0.5
+
+
+def test_las_descargas_simultaneas_de_una_url_comparten_la_peticion(servidor):
+    liberar = threading.Event()
+
+    def respuesta_lenta(cabeceras):
+        liberar.wait(5)
+        return 200, {}, 'compartida'
+
+    servidor.respuestas['/stats'] = [respuesta_lenta]
+    descargas_url = descargador()
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(descargas_url.descargar(servidor.url('/stats'))))
+             for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    # Cuando llega la primera petición, dejamos tiempo a los demás hilos para que esperen a la misma descarga
+    while not servidor.peticiones:
+        time.sleep(0.01)
+    time.sleep(0.2)
+    liberar.set()
+    for hilo in hilos:
+        hilo.join()
+
+    assert resultados == ['compartida'] * 4
+    assert len(servidor.peticiones) == 1
+    assert descargas_url.en_curso == {}
+
+
+def test_descargar_varias_mantiene_el_orden_de_las_urls(tmp_path):
+    rutas = [f'en/comps/8/{2000 + i}-{2001 + i}/stats/pagina' for i in range(8)]
+    for i, ruta in enumerate(rutas):
+        (tmp_path / ruta).parent.mkdir(parents=True)
+        (tmp_path / ruta).write_text(f'<html>{i}</html>', encoding='utf-8')
+    http = servidor_local.crear_servidor(str(tmp_path), 0)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    try:
+        urls = [f'http://127.0.0.1:{http.server_port}/{ruta}' for ruta in rutas]
+        assert list(descargador().descargar_varias(urls)) == [f'<html>{i}</html>' for i in range(8)]
+    finally:
+        http.shutdown()
+        http.server_close()
+
+
+def test_descargar_varias_no_se_adelanta_mas_de_max_descargas(servidor):
+    urls = [servidor.url(f'/{i}') for i in range(6)]
+    for i in range(6):
+        servidor.respuestas[f'/{i}'] = [(200, {}, f'pagina {i}')]
+    paginas = descargador(max_descargas=2).descargar_varias(urls)
+    assert next(paginas) == 'pagina 0'
+    # Las dos primeras y la que se lanza al devolver la primera; el resto espera a que se recorran
+    time.sleep(0.3)
+    assert len(servidor.peticiones) == 3
+    assert list(paginas) == [f'pagina {i}' for i in range(1, 6)]
+    assert sorted(servidor.rutas_pedidas()) == [f'/{i}' for i in range(6)]
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import RUTA_DATOS
+from elo import MotorElo, actualizar_motor
+
+
+@pytest.fixture(scope='module')
+def partidos():
+    return pd.read_csv(os.path.join(RUTA_DATOS, 'partidos_limpio.csv'))
+
+
+def comprobar_igual_a_recalcular(motor, partidos):
+    '''
+    Comprueba que el motor tiene las mismas valoraciones, partidos e historial que uno calculado desde cero
+    '''
+    completo = MotorElo()
+    completo.actualizar(partidos)
+    pd.testing.assert_frame_equal(motor.clasificacion().sort_values('Squad', ignore_index=True),
+                                  completo.clasificacion().sort_values('Squad', ignore_index=True))
+    np.testing.assert_array_equal(motor.valoraciones_en(partidos['Home'], partidos['Date']),
+                                  completo.valoraciones_en(partidos['Home'], partidos['Date']))
+    np.testing.assert_array_equal(motor.huellas, completo.huellas)
+
+
+def test_actualizacion_por_temporadas_igual_a_recalcular(partidos, tmp_path):
+    ruta = str(tmp_path / 'elo.npz')
+    temporadas = sorted(partidos['Season'].unique())
+    for i in range(1, len(temporadas) + 1):
+        motor, aplicados = actualizar_motor(partidos[partidos['Season'].isin(temporadas[:i])], ruta)
+        assert aplicados == partidos['Season'].eq(temporadas[i - 1]).sum()
+    comprobar_igual_a_recalcular(MotorElo.cargar(ruta), partidos)
+    assert actualizar_motor(partidos, ruta)[1] == 0
+
+
+def test_resultado_corregido_de_un_partido_antiguo(partidos, tmp_path):
+    ruta = str(tmp_path / 'elo.npz')
+    actualizar_motor(partidos, ruta)
+
+    # Se le da la vuelta al resultado del partido más antiguo: hay que volver a aplicar todos los partidos
+    corregidos = partidos.copy()
+    fila = pd.to_datetime(corregidos['Date']).idxmin()
+    goles = corregidos.loc[fila, ['Score (Home)', 'Score (Away)']].to_numpy()
+    corregidos.loc[fila, ['Score (Home)', 'Score (Away)']] = goles[::-1]
+    corregidos.loc[fila, 'Results'] = {'H': 'A', 'A': 'H', 'D': 'D'}[corregidos.loc[fila, 'Results']]
+    motor, aplicados = actualizar_motor(corregidos, ruta)
+    assert aplicados == len(partidos)
+    comprobar_igual_a_recalcular(MotorElo.cargar(ruta), corregidos)
+
+
+def test_partidos_anteriores_y_borrados(partidos, tmp_path):
+    ruta = str(tmp_path / 'elo.npz')
+    fechas = pd.to_datetime(partidos['Date'])
+    corte = fechas.sort_values().iloc[len(partidos) // 2]
+
+    # Falta un partido de la primera mitad, que aparece después junto a los de la segunda
+    falta = fechas[fechas < corte].index[10]
+    actualizar_motor(partidos[(fechas < corte)].drop(index=falta), ruta)
+    motor, aplicados = actualizar_motor(partidos, ruta)
+    assert 0 < aplicados < len(partidos)
+    comprobar_igual_a_recalcular(motor, partidos)
+
+    # Si se borran los últimos partidos, el motor vuelve al estado anterior a ellos
+    motor, aplicados = actualizar_motor(partidos[fechas < corte], ruta)
+    assert aplicados == 0
+    comprobar_igual_a_recalcular(MotorElo.cargar(ruta), partidos[fechas < corte])
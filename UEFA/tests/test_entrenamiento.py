@@ -0,0 +1,63 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import RUTA_DATOS
+
+pytest.importorskip('statsmodels')
+from elo import MotorElo
+from entrenamiento import buscar, entrenar_mejores, pliegues_por_temporada, preparar_datos
+
+
+@pytest.fixture(scope='module')
+def datos():
+    partidos = pd.read_csv(os.path.join(RUTA_DATOS, 'partidos_limpio.csv'))
+    motor = MotorElo()
+    motor.actualizar(partidos)
+    return preparar_datos(partidos, pd.read_parquet(os.path.join(RUTA_DATOS, 'caracteristicas_equipos.parquet')), motor)
+
+
+@pytest.mark.parametrize('n_pliegues', [1, 3, 20])
+def test_los_pliegues_nunca_entrenan_con_temporadas_posteriores(n_pliegues):
+    temporadas = np.random.default_rng(0).permutation(np.repeat([f'{ano}-{ano + 1}' for ano in range(2015, 2023)], 5))
+    pliegues = pliegues_por_temporada(temporadas, n_pliegues)
+    assert len(pliegues) == min(n_pliegues, 7)
+    for train, test in pliegues:
+        assert len(set(temporadas[test])) == 1
+        assert max(temporadas[train]) < temporadas[test][0]
+
+
+def test_sin_pliegues_se_lanza_un_error(datos, tmp_path):
+    una_temporada = datos[datos['Season'] == datos['Season'].iloc[-1]]
+    with pytest.raises(ValueError, match='dos temporadas'):
+        buscar(una_temporada, ['LR'], procesos=1, ruta_cache=str(tmp_path))
+    with pytest.raises(ValueError, match='al menos 1'):
+        buscar(datos, ['LR'], n_pliegues=0, procesos=1, ruta_cache=str(tmp_path))
+
+
+def test_la_segunda_busqueda_reutiliza_todos_los_ajustes(datos, tmp_path):
+    primera = buscar(datos, ['LR', 'AR'], n_pliegues=2, procesos=1, ruta_cache=str(tmp_path))
+    assert (primera['en cache'] == 0).all()
+    segunda = buscar(datos, ['LR', 'AR'], n_pliegues=2, procesos=1, ruta_cache=str(tmp_path))
+    assert (segunda['en cache'] == segunda['pliegues']).all()
+    pd.testing.assert_series_equal(primera['puntuacion'], segunda['puntuacion'])
+
+
+def test_entrenar_algunos_clasificadores_mantiene_los_demas(datos, tmp_path):
+    ruta_modelos, ruta_series = str(tmp_path / 'clasificacion.joblib'), str(tmp_path / 'series.joblib')
+    rutas = {'ruta_cache': str(tmp_path / 'cache'), 'ruta_modelos': ruta_modelos, 'ruta_series': ruta_series}
+    # Sin archivo guardado no se puede guardar solo uno de los tres clasificadores
+    with pytest.raises(ValueError, match='SVC, XGB'):
+        entrenar_mejores(datos, {'LR': {'C': 0.1}}, procesos=1, **rutas)
+    assert not os.path.exists(ruta_modelos)
+
+    entrenar_mejores(datos, {'LR': {'C': 0.1}, 'SVC': {'kernel': 'sigmoid', 'C': 1.0},
+                             'XGB': {'n_estimators': 50, 'max_depth': 2}}, procesos=1, **rutas)
+    antes = joblib.load(ruta_modelos)
+    entrenar_mejores(datos, {'LR': {'C': 0.01}}, procesos=1, **rutas)
+    despues = joblib.load(ruta_modelos)
+    assert despues['parametros'] == {**antes['parametros'], 'LR': {'C': 0.01}}
+    assert set(despues['modelos']) == {'LR', 'SVC', 'XGB'}
@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import imagenes
+from imagenes import construir_almacen
+
+
+def guardar_png(ruta, color):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    Image.new('RGB', (40, 60), color).save(ruta)
+
+
+@pytest.fixture
+def decodificadas(monkeypatch):
+    '''
+    Lista con las rutas que se decodifican al construir el almacén
+    '''
+    rutas = []
+    decodificar = imagenes.decodificar
+
+    def registrar(ruta, vista):
+        rutas.append(os.path.basename(ruta))
+        return decodificar(ruta, vista)
+
+    monkeypatch.setattr(imagenes, 'decodificar', registrar)
+    return rutas
+
+
+def test_solo_se_decodifican_las_imagenes_modificadas(tmp_path, decodificadas):
+    carpeta, cache = str(tmp_path / 'jugadores'), str(tmp_path / 'cache')
+    guardar_png(os.path.join(carpeta, 'modric', '1.png'), (255, 0, 0))
+    guardar_png(os.path.join(carpeta, 'modric', '2.png'), (0, 255, 0))
+    guardar_png(os.path.join(carpeta, 'kroos', '1.png'), (0, 0, 255))
+
+    almacen = construir_almacen(carpeta, 'cnn', cache, hilos=1)
+    assert almacen.clases == ['kroos', 'modric']
+    assert list(almacen.etiquetas) == [0, 1, 1]
+    assert sorted(decodificadas) == ['1.png', '1.png', '2.png']
+    antes = np.array(almacen.imagenes)
+    assert antes.shape == (3, 128, 128, 3)
+    np.testing.assert_array_equal(antes[:, 0, 0], [[0, 0, 255], [255, 0, 0], [0, 255, 0]])
+
+    # Sin cambios no se decodifica ni se reescribe nada
+    ruta_imagenes = os.path.join(cache, 'cnn', 'imagenes.u8')
+    modificacion = os.stat(ruta_imagenes).st_mtime_ns
+    decodificadas.clear()
+    assert construir_almacen(carpeta, 'cnn', cache, hilos=1).huella == almacen.huella
+    assert decodificadas == []
+    assert os.stat(ruta_imagenes).st_mtime_ns == modificacion
+
+    # Al cambiar una imagen solo se decodifica esa y el resto se copian del almacén anterior
+    guardar_png(os.path.join(carpeta, 'modric', '2.png'), (255, 255, 0))
+    nuevo = construir_almacen(carpeta, 'cnn', cache, hilos=1)
+    assert decodificadas == ['2.png']
+    assert nuevo.huella != almacen.huella
+    despues = np.array(nuevo.imagenes)
+    np.testing.assert_array_equal(despues[:2], antes[:2])
+    assert (despues[2] == [255, 255, 0]).all()
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+import config
+import incremental
+
+URL = 'https://fbref.com/en/comps/8/{t}/stats/{t}-Champions-League-Stats'
+
+
+def pagina(filas, publicidad=''):
+    # Cada página falsa es el JSON de sus filas (más un texto que no forma parte de la tabla)
+    return json.dumps({'filas': filas, 'publicidad': publicidad})
+
+
+def extraer_filas(html):
+    return json.loads(html)['filas']
+
+
+def filas_temporada(temporada, n=3):
+    return [['Squad', 'Pts']] + [[f'Equipo {temporada} {i}', str(i)] for i in range(n)]
+
+
+@pytest.fixture
+def paginas(tmp_path, monkeypatch):
+    '''
+    Páginas que devuelve la descarga, por temporada, y carpeta de datos temporal para los CSV y los manifiestos
+    '''
+    paginas = {}
+    monkeypatch.setattr(incremental, 'descargar_paginas',
+                        lambda urls: [paginas[url.split('/')[6]] for url in urls])
+    carpeta = tmp_path / 'incremental'
+    carpeta.mkdir()
+    monkeypatch.setattr(config, 'RUTA_DATOS', str(carpeta))
+    monkeypatch.setattr(config, 'RUTA_MANIFIESTOS', str(carpeta / 'manifiestos'))
+    return paginas
+
+
+def actualizar(temporadas, modo_incremental=True):
+    incremental.actualizar_tabla('equipos.csv', [URL.format(t=t) for t in temporadas], extraer_filas, 6,
+                                 incremental=modo_incremental)
+    with open(f'{config.RUTA_DATOS}/equipos.csv', encoding='utf-8') as archivo:
+        return archivo.read()
+
+
+def test_actualizacion_incremental_igual_a_reconstruccion(paginas, tmp_path, monkeypatch):
+    for temporada in ['2022-2023', '2021-2022', '2020-2021']:
+        paginas[temporada] = pagina(filas_temporada(temporada))
+    actualizar(['2022-2023', '2021-2022', '2020-2021'])
+
+    # Cambia una temporada, aparece una nueva delante y desaparece la última
+    paginas['2021-2022'] = pagina(filas_temporada('2021-2022', n=5))
+    paginas['2023-2024'] = pagina(filas_temporada('2023-2024'))
+    temporadas = ['2023-2024', '2022-2023', '2021-2022']
+    resultado = actualizar(temporadas)
+
+    completa = tmp_path / 'completa'
+    completa.mkdir()
+    monkeypatch.setattr(config, 'RUTA_DATOS', str(completa))
+    monkeypatch.setattr(config, 'RUTA_MANIFIESTOS', str(completa / 'manifiestos'))
+    assert resultado == actualizar(temporadas, modo_incremental=False)
+
+
+def test_temporadas_sin_cambios_no_reescriben_el_csv(paginas, capsys):
+    temporadas = ['2022-2023', '2021-2022']
+    for temporada in temporadas:
+        paginas[temporada] = pagina(filas_temporada(temporada))
+    antes = actualizar(temporadas)
+
+    # Una página distinta con las mismas filas (por ejemplo, otra publicidad) no cambia el CSV
+    paginas['2021-2022'] = pagina(filas_temporada('2021-2022'), publicidad='otra')
+    capsys.readouterr()
+    assert actualizar(temporadas) == antes
+    assert 'ya estaba actualizado' in capsys.readouterr().out
+
+
+def test_fusionar_csv_coloca_las_temporadas_en_orden(tmp_path):
+    ruta = tmp_path / 'tabla.csv'
+    ruta.write_text('Season,Squad\n2022-2023,A\n2022-2023,B\n2020-2021,C\n', encoding='utf-8')
+    incremental.fusionar_csv(str(ruta), ['Season', 'Squad'], ['2022-2023', '2021-2022', '2020-2021'],
+                             {'2021-2022': [['D']], '2022-2023': [['E']]})
+    assert ruta.read_text(encoding='utf-8').splitlines() == [
+        'Season,Squad', '2022-2023,E', '2021-2022,D', '2020-2021,C']
@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+
+from caracteristicas import agregar_por_equipo
+from conftest import RUTA_DATOS
+from limpieza import comprobar_paridad, limpiar_tabla, limpiar_todo
+
+
+def test_limpieza_coincide_con_los_csv_guardados():
+    assert comprobar_paridad(limpiar_todo(RUTA_DATOS), RUTA_DATOS) == []
+
+
+def test_limpieza_de_partidos_por_separado_coincide_con_el_csv_guardado():
+    # Es lo que ejecuta el pipeline: los partidos a partir de 'equipos_limpio.csv' y 'jugadores_limpio.csv'
+    assert comprobar_paridad({'partidos': limpiar_tabla('partidos', RUTA_DATOS)}, RUTA_DATOS) == []
+
+
+def test_el_csv_de_partidos_se_escribe_igual_que_en_el_notebook():
+    # Además de los valores, el formato: los equipos sin puntuación (antes de 2017-2018) tienen un 0 entero
+    with open(os.path.join(RUTA_DATOS, 'partidos_limpio.csv'), encoding='utf-8') as archivo:
+        guardado = archivo.read()
+    assert limpiar_tabla('partidos', RUTA_DATOS).to_csv(index=False, lineterminator='\n') == guardado
+
+
+def test_media_por_equipo_suma_en_el_orden_de_la_tabla():
+    puntos = [0.1, 0.7, 0.2, 1e16, 0.3, -1e16, 0.6]
+    jugadores = pd.DataFrame({
+        'Season': ['2023-2024'] * len(puntos) + ['2022-2023'],
+        'Squad': ['A', 'B'] * 3 + ['A', 'A'],
+        'Points': puntos + [5.0],
+    })
+    agregados = agregar_por_equipo(jugadores).set_index(['Season', 'Squad'])
+    a, b = puntos[0::2], puntos[1::2]
+    assert agregados.loc[('2023-2024', 'A'), 'Points'] == sum(a) / len(a)
+    assert agregados.loc[('2023-2024', 'B'), 'Points'] == sum(b) / len(b)
+    assert agregados.loc[('2022-2023', 'A'), 'Points'] == 5.0
+    assert agregados['Players'].tolist() == [4, 3, 1]
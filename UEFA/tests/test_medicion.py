@@ -0,0 +1,91 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+import benchmark
+import caracteristicas
+import medicion
+from conftest import RUTA_DATOS
+
+
+@pytest.fixture(autouse=True)
+def sin_medidor():
+    # Ninguna prueba deja un medidor activo para las siguientes
+    medicion.desactivar()
+    yield
+    medicion.desactivar()
+
+
+def test_sin_activar_los_tramos_y_contadores_no_hacen_nada():
+    # Un medidor que estuvo activo no recibe nada después de desactivarlo
+    medidor = medicion.activar(medicion.Medidor())
+    medicion.desactivar()
+    with medicion.tramo('prueba'):
+        medicion.contar('filas', 10)
+    assert medidor.resumen() == {'tramos': {}, 'contadores': {}}
+    assert medicion.desactivar() is None
+
+
+def test_con_un_medidor_activo_se_registran_tramos_y_contadores():
+    medidor = medicion.activar()
+    for _ in range(2):
+        with medicion.tramo('prueba'):
+            medicion.contar('filas', 10)
+    medicion.contar('páginas')
+    resumen = medidor.resumen()
+    assert resumen['contadores'] == {'filas': 20, 'páginas': 1}
+    assert resumen['tramos']['prueba']['llamadas'] == 2
+    assert resumen['tramos']['prueba']['segundos'] >= 0
+
+    assert medicion.desactivar() is medidor
+    medicion.contar('filas', 5)
+    assert medidor.resumen()['contadores']['filas'] == 20
+
+
+def test_los_modulos_registran_en_el_medidor_activo():
+    jugadores = pd.read_csv(os.path.join(RUTA_DATOS, 'jugadores_limpio.csv'))
+    equipos = pd.read_csv(os.path.join(RUTA_DATOS, 'equipos_limpio.csv'))
+    medidor = medicion.activar()
+    almacen = caracteristicas.construir_almacen(equipos, caracteristicas.agregar_por_equipo(
+        caracteristicas.puntuar_jugadores(jugadores)))
+    resumen = medidor.resumen()
+    assert resumen['contadores']['filas almacen'] == len(almacen)
+    assert resumen['tramos']['caracteristicas.almacen']['llamadas'] == 1
+
+
+@pytest.mark.parametrize('codigo_script, codigo', [
+    ('contar("filas", 3)', 0),
+    ('contar("filas", 3)\nraise SystemExit(3)', 3),
+    ('contar("filas", 3)\nraise SystemExit("Error de configuración")', 1),
+    ('contar("filas", 3)\nraise RuntimeError("fallo")', 1),
+])
+def test_medir_script_devuelve_el_codigo_de_salida(codigo_script, codigo, tmp_path, monkeypatch):
+    # medir_script cambia sys.path y sys.argv como si se lanzara el script desde la línea de comandos
+    monkeypatch.setattr(sys, 'path', list(sys.path))
+    monkeypatch.setattr(sys, 'argv', list(sys.argv))
+    ruta = tmp_path / 'script.py'
+    ruta.write_text(f'import sys\nfrom medicion import contar\nassert sys.argv[1:] == ["--a", "1"]\n{codigo_script}\n')
+    resumen, salida = medicion.medir_script(str(ruta), ['--a', '1'])
+    assert salida == resumen['codigo'] == codigo
+    # También se guarda la medición de los scripts que fallan
+    assert resumen['contadores'] == {'filas': 3}
+    assert resumen['script'] == 'script.py'
+
+
+def test_comparar_marca_los_casos_que_empeoran():
+    def ejecucion(segundos):
+        return {'resultados': [
+            {'caso': caso, 'escala': 1, 'estado': 'completado', 'segundos': s, 'pico memoria': 100}
+            for caso, s in segundos.items()] + [
+            {'caso': 'imagenes', 'escala': 1, 'estado': 'omitido', 'segundos': None, 'pico memoria': None}]}
+
+    base = ejecucion({'limpieza': 1.0, 'elo': 2.0})
+    actual = ejecucion({'limpieza': 1.5, 'elo': 2.2, 'simulacion': 3.0})
+    comparacion = benchmark.comparar(actual, base, umbral=0.2)
+    # Solo se comparan los casos completados en las dos ejecuciones
+    assert comparacion['caso'].tolist() == ['limpieza', 'elo']
+    assert comparacion['tiempo'].tolist() == pytest.approx([1.5, 1.1])
+    assert comparacion['empeora'].tolist() == [True, False]
+    assert comparacion['memoria'].tolist() == [1.0, 1.0]
@@ -0,0 +1,97 @@
+import csv
+import html
+import os
+
+import pytest
+
+import equipos
+import jugadores
+import overall
+import partidos
+from conftest import RUTA_DATOS
+from parseo import extraer_tabla_bs4, extraer_tabla_lxml
+
+pytest.importorskip('lxml')
+
+
+def tabla_html(tabla, id_tabla, filas):
+    '''
+    Tabla como las de fbref: cada celda con su 'data-stat', la primera de cada fila como <th> y, si la tabla la tiene,
+    una fila inicial de grupos de columnas
+    '''
+    partes = [f'<table class="stats_table" id="{id_tabla}"><thead>']
+    if tabla.saltar_filas:
+        partes.append('<tr class="over_header">' + '<th></th>' * tabla.saltar_filas + '</tr>')
+    for i, fila in enumerate(filas):
+        celdas = ''.join(f'<{"th" if j == 0 else "td"} data-stat="{estadistica}">{texto}</{"th" if j == 0 else "td"}>'
+                         for j, (estadistica, texto) in enumerate(fila))
+        partes.append(f'<tr>{celdas}</tr>' + ('</thead><tbody>' if i == 0 else ''))
+    partes.append('</tbody></table>')
+    return ''.join(partes)
+
+
+def pagina_html(tabla, filas):
+    '''
+    Página con otra tabla delante (que los analizadores tienen que saltarse), la sección de la tabla y la tabla
+    '''
+    id_tabla = f'all_comps_{tabla.id_tabla}' if tabla.id_parcial else tabla.id_tabla
+    return (f'<html><body>{tabla_html(tabla, "relleno", filas)}'
+            f'<div class="section_heading"><{tabla.etiqueta} data-label="{html.escape(tabla.data_label)}">'
+            f'{html.escape(tabla.data_label)}</{tabla.etiqueta}></div>'
+            f'<div class="table_container">{tabla_html(tabla, id_tabla, filas)}</div></body></html>')
+
+
+@pytest.mark.parametrize('modulo', [equipos, jugadores, partidos, overall], ids=lambda modulo: modulo.__name__)
+def test_lxml_y_bs4_extraen_las_mismas_filas(modulo):
+    # Filas de una temporada del CSV del scraper, con una columna más que se tiene que descartar por 'max_columnas'
+    # o por su 'data-stat'
+    with open(os.path.join(RUTA_DATOS, f'{modulo.__name__}.csv'), newline='', encoding='utf-8') as archivo:
+        lector = csv.reader(archivo)
+        encabezado = next(lector)[1:]
+        temporada = None
+        esperadas = [encabezado]
+        for fila in lector:
+            temporada = temporada or fila[0]
+            if fila[0] == temporada and len(esperadas) <= 40:
+                esperadas.append(fila[1:])
+    estadisticas = [f'c{i}' for i in range(len(encabezado))] + ['xg_extra']
+    filas = [list(zip(estadisticas, [html.escape(texto) for texto in fila] + ['1.5'])) for fila in esperadas]
+
+    pagina = pagina_html(modulo.TABLA, filas)
+    esperadas = [fila[:modulo.TABLA.max_columnas] for fila in esperadas]
+    assert extraer_tabla_lxml(pagina, modulo.TABLA) == esperadas
+    assert extraer_tabla_bs4(pagina, modulo.TABLA) == esperadas
+
+
+def test_lxml_y_bs4_leen_igual_las_celdas_con_etiquetas():
+    filas = [
+        [('squad', 'Squad'), ('pts', 'Pts'), ('xg_for', 'xG')],
+        [('squad', ' <a href="/es/">Real&nbsp;Madrid</a> <span class="f-i"> es </span>'), ('pts', '\n 24 '),
+         ('xg_for', '1.0')],
+        # Fila con las columnas en otro orden, que se colocan en su sitio
+        [('pts', '10'), ('squad', 'Bayern &amp; Co'), ('xg_for', '2.0')],
+        # Fila incompleta, que se deja tal cual
+        [('squad', '<em>Porto</em>')],
+    ]
+    pagina = pagina_html(overall.TABLA, filas)
+    lxml_filas = extraer_tabla_lxml(pagina, overall.TABLA)
+    assert lxml_filas == extraer_tabla_bs4(pagina, overall.TABLA)
+    assert lxml_filas == [['Squad', 'Pts'], ['Real\xa0Madrides', '24'], ['Bayern & Co', '10'], ['Porto']]
+
+
+def test_lxml_se_salta_las_tablas_comentadas_como_bs4():
+    filas = [[('squad', 'Squad'), ('pts', 'Pts')], [('squad', 'Real Madrid'), ('pts', '24')]]
+    comentadas = [[('squad', 'Squad'), ('pts', 'Pts')], [('squad', 'Milan'), ('pts', '3')]]
+    # fbref deja copias de algunas tablas dentro de comentarios HTML, que BeautifulSoup no ve como tablas
+    comentario = f'<div class="placeholder"><!--\n{tabla_html(overall.TABLA, overall.TABLA.id_tabla, comentadas)}\n-->'
+    pagina = pagina_html(overall.TABLA, filas).replace('<div class="table_container">',
+                                                       comentario + '</div><div class="table_container">')
+    assert extraer_tabla_lxml(pagina, overall.TABLA) == extraer_tabla_bs4(pagina, overall.TABLA) == \
+        [['Squad', 'Pts'], ['Real Madrid', '24']]
+
+    # Si la tabla solo está comentada, lxml tampoco la encuentra
+    solo_comentada = pagina_html(overall.TABLA, filas).replace('<div class="table_container">',
+                                                               '<div class="table_container"><!--') \
+        .replace('</div></body>', '--></div></body>')
+    with pytest.raises(ValueError):
+        extraer_tabla_lxml(solo_comentada, overall.TABLA)
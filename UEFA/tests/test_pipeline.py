@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+import pipeline
+from pipeline import ETAPAS, Etapa, al_dia, dependencias, ejecutar, huella, seleccionar
+
+
+def test_dependencias_de_las_etapas():
+    previas = dependencias(ETAPAS)
+    assert previas['descargar'] == []
+    assert previas['limpiar_partidos'] == ['descargar', 'limpiar_equipos', 'limpiar_jugadores']
+    assert previas['entrenamiento'] == ['caracteristicas', 'elo', 'limpiar_partidos']
+    assert previas['prediccion'] == ['caracteristicas', 'elo', 'entrenamiento', 'limpiar_partidos']
+
+
+def test_seleccionar_hasta_una_etapa_incluye_todas_sus_previas():
+    nombres = [etapa.nombre for etapa in seleccionar(ETAPAS, hasta=['elo'])]
+    assert nombres == ['descargar', 'limpiar_equipos', 'limpiar_jugadores', 'limpiar_partidos', 'elo']
+    sin_descargas = [etapa.nombre for etapa in seleccionar(ETAPAS, hasta=['elo'], sin_descargas=True)]
+    assert sin_descargas == nombres[1:]
+
+
+def test_la_huella_incluye_el_codigo_de_otras_carpetas():
+    entrenamiento = next(etapa for etapa in ETAPAS if etapa.nombre == 'entrenamiento')
+    fuentes = entrenamiento.fuentes()
+    assert os.path.join(pipeline.RUTA_UEFA, 'analisis', 'elo.py') in fuentes
+    assert pipeline.RUTA_MEDICION in fuentes
+
+
+@pytest.fixture
+def etapa(tmp_path):
+    '''
+    Etapa de prueba con su carpeta, un archivo de entrada, uno de salida y un módulo de otra carpeta
+    '''
+    (tmp_path / 'etapa').mkdir()
+    (tmp_path / 'etapa' / 'script.py').write_text('print(1)\n')
+    (tmp_path / 'entrada.csv').write_text('a\n1\n')
+    (tmp_path / 'salida.csv').write_text('b\n2\n')
+    (tmp_path / 'modulo.py').write_text('X = 1\n')
+    return Etapa('prueba', str(tmp_path / 'etapa'), ['script.py'], entradas=[str(tmp_path / 'entrada.csv')],
+                 salidas=[str(tmp_path / 'salida.csv')], codigo=[str(tmp_path / 'modulo.py')])
+
+
+def registrar(etapa):
+    return {etapa.nombre: {'huella': huella(etapa), 'salidas': {
+        os.path.relpath(ruta, pipeline.RUTA_DATOS): pipeline.hash_archivo(ruta) for ruta in etapa.salidas}}}
+
+
+def test_al_dia_solo_si_no_cambian_la_huella_ni_las_salidas(etapa, tmp_path):
+    estado = registrar(etapa)
+    assert al_dia(etapa, estado, huella(etapa))
+
+    # Cambia un módulo de otra carpeta que importa el script
+    (tmp_path / 'modulo.py').write_text('X = 2\n')
+    assert not al_dia(etapa, estado, huella(etapa))
+
+    # Alguien modifica la salida que escribió la etapa
+    estado = registrar(etapa)
+    (tmp_path / 'salida.csv').write_text('b\n3\n')
+    assert not al_dia(etapa, estado, huella(etapa))
+
+    estado = registrar(etapa)
+    etapa.siempre = True
+    assert not al_dia(etapa, estado, huella(etapa))
+
+
+def test_si_falla_una_etapa_se_cancelan_las_que_dependen_de_ella(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, 'RUTA_PIPELINE', str(tmp_path / 'pipeline'))
+    carpeta = tmp_path / 'scripts'
+    carpeta.mkdir()
+    (carpeta / 'falla.py').write_text('raise SystemExit(1)\n')
+    (carpeta / 'escribe.py').write_text('import sys\nopen(sys.argv[1], "w").write("ok")\n')
+
+    def ruta(nombre):
+        return str(tmp_path / nombre)
+
+    etapas = [
+        Etapa('a', str(carpeta), ['falla.py'], salidas=[ruta('a.csv')]),
+        Etapa('b', str(carpeta), ['escribe.py', ruta('b.csv')], entradas=[ruta('a.csv')], salidas=[ruta('b.csv')]),
+        Etapa('c', str(carpeta), ['escribe.py', ruta('c.csv')], entradas=[ruta('b.csv')], salidas=[ruta('c.csv')]),
+        Etapa('d', str(carpeta), ['escribe.py', ruta('d.csv')], salidas=[ruta('d.csv')]),
+    ]
+    resumen = ejecutar(etapas, procesos=2, ruta_estado=ruta('estado.json'))
+    assert dict(zip(resumen['etapa'], resumen['estado'])) == {
+        'a': 'fallida', 'b': 'cancelada', 'c': 'cancelada', 'd': 'completada'}
+    assert not os.path.exists(ruta('b.csv'))
+    assert os.path.exists(ruta('d.csv'))
+
+    # En la siguiente pasada la etapa que terminó bien se salta
+    resumen = ejecutar(etapas[3:], ruta_estado=ruta('estado.json'))
+    assert resumen['estado'].tolist() == ['omitida']
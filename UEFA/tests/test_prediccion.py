@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from elo import MotorElo
+from prediccion import CARACTERISTICAS, ESTADISTICAS, Predictor
+
+
+class ModeloFijo:
+    '''
+    Modelo de prueba con probabilidades fijas: 'fija' para todos los partidos o, si se indica 'favorito', otras
+    cuando el local tiene más puntos que el visitante. Cuenta las llamadas a predict_proba
+    '''
+    classes_ = np.array(['A', 'D', 'H'])
+
+    def __init__(self, fija, favorito=None):
+        self.fija, self.favorito, self.llamadas = np.array(fija), np.array(favorito if favorito else fija), 0
+
+    def predict_proba(self, X):
+        self.llamadas += 1
+        assert list(X.columns) == CARACTERISTICAS
+        mas_puntos = (X['Points (Home)'] > X['Points (Away)']).to_numpy()
+        return np.where(mas_puntos[:, None], self.favorito, self.fija)
+
+
+def crear_predictor(equipos, modelo):
+    almacen = pd.DataFrame({'Season': '2023-2024', 'Squad': equipos, 'Points': np.arange(len(equipos), 0, -1.0),
+                            **{columna: 1.0 for columna in ESTADISTICAS}})
+    return Predictor({'LR': modelo}, almacen, MotorElo())
+
+
+def test_cuadro_de_cuatro_equipos_calculado_a_mano():
+    modelo = ModeloFijo([0.3, 0.2, 0.5])
+    predictor = crear_predictor(['a', 'b', 'c', 'd'], modelo)
+    H, D, A = predictor.matrices_partido(['a', 'b', 'c', 'd'])
+    assert H[0, 1] == 0.5 and D[0, 1] == 0.2 and A[0, 1] == 0.3 and H[0, 0] == 0
+
+    # En cada semifinal el que pasa gana la ida y no pierde la vuelta (0.5 * 0.5 + 0.2 * 0.3 = 0.31) o la eliminatoria
+    # acaba igualada (0.5 * 0.5 + 0.3 * 0.3 + 0.2 * 0.2 = 0.38) y la gana la mitad de las veces: 0.5. En la final
+    # los equipos de la mitad superior son locales y ganan con 0.5 + 0.2 / 2 = 0.6
+    cuadro = predictor.evaluar_cuadro(['a', 'b', 'c', 'd'])
+    esperado = pd.DataFrame({'ronda 2': [0.5] * 4, 'título': [0.3, 0.3, 0.2, 0.2]}, index=pd.Index(['a', 'b', 'c', 'd'], name='equipo'))
+    pd.testing.assert_frame_equal(cuadro.sort_index(), esperado, check_exact=False)
+
+    # Si 'a' ya ganó la ida y empató la vuelta está en la final seguro
+    cuadro = predictor.evaluar_cuadro(['a', 'b', 'c', 'd'], resultados={('a', 'b'): 'H', ('b', 'a'): 'D'})
+    np.testing.assert_allclose(cuadro.loc[['a', 'b', 'c', 'd'], 'ronda 2'], [1.0, 0.0, 0.5, 0.5])
+    np.testing.assert_allclose(cuadro.loc[['a', 'b', 'c', 'd'], 'título'], [0.6, 0.0, 0.2, 0.2])
+    # Todos los partidos se calcularon con una sola llamada al modelo y el resto salió de la caché
+    assert modelo.llamadas == 1
+
+
+@pytest.mark.parametrize('ida_y_vuelta', [True, False])
+def test_las_probabilidades_de_cada_ronda_suman_uno(ida_y_vuelta):
+    equipos = [f'equipo {i}' for i in range(8)]
+    predictor = crear_predictor(equipos, ModeloFijo([0.4, 0.25, 0.35], favorito=[0.15, 0.2, 0.65]))
+    cuadro = predictor.evaluar_cuadro(equipos[::-1], ida_y_vuelta=ida_y_vuelta)
+    assert list(cuadro.columns) == ['ronda 2', 'ronda 3', 'título']
+    # En cada ronda hay la mitad de equipos que en la anterior: 4, 2 y 1
+    np.testing.assert_allclose(cuadro.sum() / [4, 2, 1], 1)
+    assert (cuadro.diff(axis=1).iloc[:, 1:] <= 1e-12).all().all()
+    assert cuadro.index[0] == 'equipo 0'
+
+
+def test_cuadro_que_no_es_potencia_de_dos():
+    predictor = crear_predictor(['a', 'b', 'c'], ModeloFijo([0.3, 0.2, 0.5]))
+    with pytest.raises(ValueError):
+        predictor.evaluar_cuadro(['a', 'b', 'c'])
@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import RUTA_DATOS
+from simulacion import (CUADRO_SEMIFINALES, ModeloMarkov, bloque_eliminatoria, repartir, simular_eliminatoria,
+                        simular_resultados)
+
+CUADRO = ['Real Madrid', 'Manchester City', 'Bayern Munich', 'Arsenal',
+          'Paris S-G', 'Barcelona', 'Dortmund', 'Atlético Madrid']
+
+
+@pytest.fixture(scope='module')
+def modelo():
+    return ModeloMarkov.desde_partidos(pd.read_csv(os.path.join(RUTA_DATOS, 'partidos_limpio.csv')))
+
+
+def test_misma_semilla_mismo_resultado(modelo):
+    primera = simular_eliminatoria(modelo, CUADRO, simulaciones=20_000, semilla=3)
+    pd.testing.assert_frame_equal(primera, simular_eliminatoria(modelo, CUADRO, simulaciones=20_000, semilla=3))
+    assert not primera.equals(simular_eliminatoria(modelo, CUADRO, simulaciones=20_000, semilla=4))
+
+
+def test_el_resultado_no_depende_del_numero_de_procesos(modelo):
+    argumentos = (modelo, modelo.codificar(CUADRO), True)
+    un_proceso = repartir(bloque_eliminatoria, argumentos, 25_000, 7, procesos=1, tamano_bloque=10_000)
+    dos_procesos = repartir(bloque_eliminatoria, argumentos, 25_000, 7, procesos=2, tamano_bloque=10_000)
+    np.testing.assert_array_equal(un_proceso, dos_procesos)
+
+
+def test_probabilidades_del_cuadro(modelo):
+    resultado = simular_eliminatoria(modelo, CUADRO_SEMIFINALES, simulaciones=20_000, semilla=0)
+    assert resultado['título'].sum() == pytest.approx(1)
+    assert resultado['ronda 2'].sum() == pytest.approx(2)
+    assert (resultado['título'] <= resultado['ronda 2']).all()
+
+
+def test_distribucion_de_resultados(modelo):
+    resumen, distribucion = simular_resultados(modelo, CUADRO_SEMIFINALES, partidos=5, simulaciones=10_000, semilla=1)
+    np.testing.assert_allclose(distribucion.sum(axis=1), 1)
+    # Las victorias, empates y derrotas medias suman el número de partidos
+    np.testing.assert_allclose(resumen[['win', 'draw', 'lose']].sum(axis=1), 5)
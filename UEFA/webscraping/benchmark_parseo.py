@@ -0,0 +1,76 @@
+import argparse
+import os
+import statistics
+import time
+import tracemalloc
+
+import equipos
+import jugadores
+import overall
+import partidos
+from parseo import ANALIZADORES
+
+
+def tablas_de_pagina(ruta):
+    '''
+    Función que devuelve las tablas que se extraen de una página según su ruta (que sigue la estructura de URLs de fbref)
+    '''
+    ruta = ruta.replace(os.sep, '/')
+    if '/stats/' in ruta:
+        return {'equipos': equipos.TABLA, 'jugadores': jugadores.TABLA}
+    if '/schedule/' in ruta:
+        return {'partidos': partidos.TABLA}
+    return {'overall': overall.TABLA}
+
+
+def medir(analizador, html, tabla, repeticiones):
+    '''
+    Función que devuelve las filas extraídas, la mediana del tiempo (en segundos) y el pico de memoria (en bytes)
+    de extraer una tabla con un analizador.
+
+    El pico de memoria se mide con tracemalloc, que solo ve la memoria reservada desde Python (no la que reserva
+    internamente libxml2), así que para lxml es una cota inferior.
+    '''
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        filas = analizador(html, tabla)
+        tiempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    analizador(html, tabla)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return filas, statistics.median(tiempos), pico
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara el tiempo y la memoria de los analizadores de HTML por página')
+    parser.add_argument('carpeta', help='Carpeta con páginas guardadas de fbref (misma estructura que servidor_local.py)')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    nombres = list(ANALIZADORES)
+    print(f"{'Página':<60} {'Tabla':<10} " + ' '.join(f'{n + " ms":>10} {n + " MB":>9}' for n in nombres) + '  Iguales')
+
+    totales = {nombre: 0 for nombre in nombres}
+    for raiz, _, archivos in os.walk(args.carpeta):
+        for archivo in sorted(archivos):
+            ruta = os.path.join(raiz, archivo)
+            with open(ruta, encoding='utf-8') as f:
+                html = f.read()
+
+            for nombre_tabla, tabla in tablas_de_pagina(ruta).items():
+                resultados = {nombre: medir(ANALIZADORES[nombre], html, tabla, args.repeticiones) for nombre in nombres}
+                # Comprobamos que todos los analizadores devuelven exactamente las mismas filas
+                iguales = all(r[0] == resultados['bs4'][0] for r in resultados.values())
+                for nombre in nombres:
+                    totales[nombre] += resultados[nombre][1]
+
+                pagina = os.path.relpath(ruta, args.carpeta)[-60:]
+                print(f'{pagina:<60} {nombre_tabla:<10} '
+                      + ' '.join(f'{r[1] * 1000:>10.2f} {r[2] / 1e6:>9.2f}' for r in resultados.values())
+                      + f"  {'sí' if iguales else 'NO'}")
+
+    print('\nTiempo total: ' + ', '.join(f'{nombre} {total:.3f} s' for nombre, total in totales.items()))
@@ -0,0 +1,164 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import requests
+
+import config
+
+
+class PaginaNoEnCache(Exception):
+    '''
+    Error que se lanza en modo sin conexión cuando una página no está guardada en la caché
+    '''
+
+
+class CachePaginas:
+    '''
+    Clase que guarda en disco las páginas descargadas, comprimidas y direccionadas por su contenido.
+
+    Para cada URL se guarda un índice con el hash del contenido, las cabeceras ETag/Last-Modified y la fecha de la
+    última comprobación. Las temporadas pasadas no caducan (salvo que se configure lo contrario) y la temporada actual se
+    revalida con peticiones condicionales, de modo que si no ha cambiado el servidor responde 304 sin reenviar la página.
+    '''
+
+    def __init__(self, carpeta=config.RUTA_CACHE, offline=config.MODO_OFFLINE, temporada_actual=config.TEMPORADA_ACTUAL,
+                 ttl_temporada_actual=config.TTL_TEMPORADA_ACTUAL, ttl_temporadas_pasadas=config.TTL_TEMPORADAS_PASADAS):
+        self.carpeta_paginas = os.path.join(carpeta, 'paginas')
+        self.carpeta_indice = os.path.join(carpeta, 'indice')
+        os.makedirs(self.carpeta_paginas, exist_ok=True)
+        os.makedirs(self.carpeta_indice, exist_ok=True)
+
+        self.offline = offline
+        self.temporada_actual = temporada_actual
+        self.ttl_temporada_actual = ttl_temporada_actual
+        self.ttl_temporadas_pasadas = ttl_temporadas_pasadas
+
+        # Contadores para saber cuánto trabajo nos ahorra la caché. 'sin_revalidar' son las páginas caducadas que se
+        # han devuelto desde la caché porque el servidor no respondía
+        self.estadisticas = {'aciertos': 0, 'revalidadas': 0, 'sin_revalidar': 0, 'fallos': 0, 'bytes_ahorrados': 0}
+        self.cerrojo = threading.Lock()
+
+    def ruta_indice(self, url):
+        return os.path.join(self.carpeta_indice, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def ruta_pagina(self, hash_contenido):
+        return os.path.join(self.carpeta_paginas, hash_contenido + '.html.gz')
+
+    def ttl(self, url):
+        '''
+        Función que devuelve los segundos que es válida una página según la temporada que aparece en su URL
+        '''
+        temporada = re.search(r'/(\d{4}-\d{4})/', url)
+        if temporada and temporada.group(1) != self.temporada_actual:
+            return self.ttl_temporadas_pasadas
+        return self.ttl_temporada_actual
+
+    def leer_indice(self, url):
+        try:
+            with open(self.ruta_indice(url), encoding='utf-8') as archivo:
+                return json.load(archivo)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def escribir_atomico(self, ruta, datos):
+        # Escribimos en un archivo temporal y lo renombramos para que otro hilo nunca lea un archivo a medias
+        temporal = f'{ruta}.{threading.get_ident()}.tmp'
+        with open(temporal, 'wb') as archivo:
+            archivo.write(datos)
+        os.replace(temporal, ruta)
+
+    def leer_pagina(self, entrada):
+        with gzip.open(self.ruta_pagina(entrada['hash']), 'rb') as archivo:
+            return archivo.read().decode(entrada['codificacion'], errors='replace')
+
+    def guardar(self, url, respuesta):
+        '''
+        Función que guarda en la caché la respuesta de una petición y devuelve su entrada del índice
+        '''
+        contenido = respuesta.content
+        hash_contenido = hashlib.sha256(contenido).hexdigest()
+        # Si ya teníamos una página con el mismo contenido (aunque sea de otra URL), no la volvemos a escribir
+        if not os.path.exists(self.ruta_pagina(hash_contenido)):
+            self.escribir_atomico(self.ruta_pagina(hash_contenido), gzip.compress(contenido))
+
+        entrada = {
+            'url': url,
+            'hash': hash_contenido,
+            'bytes': len(contenido),
+            'codificacion': respuesta.encoding or respuesta.apparent_encoding or 'utf-8',
+            'etag': respuesta.headers.get('ETag'),
+            'last_modified': respuesta.headers.get('Last-Modified'),
+            'fecha': time.time()
+        }
+        self.escribir_atomico(self.ruta_indice(url), json.dumps(entrada).encode('utf-8'))
+        return entrada
+
+    def contar(self, estadistica, bytes_ahorrados=0):
+        with self.cerrojo:
+            self.estadisticas[estadistica] += 1
+            self.estadisticas['bytes_ahorrados'] += bytes_ahorrados
+
+    def obtener(self, url, peticion):
+        '''
+        Función que devuelve el HTML de una URL, desde la caché si es posible y si no mediante la función 'peticion'
+        (que recibe la URL y las cabeceras a enviar, y devuelve la respuesta de requests)
+        '''
+        entrada = self.leer_indice(url)
+        if entrada is not None and not os.path.exists(self.ruta_pagina(entrada['hash'])):
+            entrada = None
+
+        # En modo sin conexión solo podemos devolver lo que ya tengamos guardado
+        if self.offline:
+            if entrada is None:
+                raise PaginaNoEnCache(f'La página {url} no está en la caché y el modo sin conexión está activado')
+            self.contar('aciertos', entrada['bytes'])
+            return self.leer_pagina(entrada)
+
+        if entrada is not None:
+            # Si la página todavía no ha caducado, la devolvemos sin preguntar al servidor
+            ttl = self.ttl(url)
+            if ttl < 0 or time.time() - entrada['fecha'] <= ttl:
+                self.contar('aciertos', entrada['bytes'])
+                return self.leer_pagina(entrada)
+
+            # Si ha caducado, preguntamos al servidor si ha cambiado desde la última vez
+            cabeceras = {}
+            if entrada.get('etag'):
+                cabeceras['If-None-Match'] = entrada['etag']
+            if entrada.get('last_modified'):
+                cabeceras['If-Modified-Since'] = entrada['last_modified']
+            try:
+                respuesta = peticion(url, cabeceras)
+            except requests.RequestException:
+                # Si el servidor no responde (después de los reintentos), nos quedamos con la copia guardada; el
+                # resumen de la caché indica cuántas páginas no se han podido revalidar
+                self.contar('sin_revalidar', entrada['bytes'])
+                return self.leer_pagina(entrada)
+            if respuesta.status_code == 304:
+                # No ha cambiado: actualizamos la fecha de comprobación y devolvemos la copia guardada
+                entrada['fecha'] = time.time()
+                self.escribir_atomico(self.ruta_indice(url), json.dumps(entrada).encode('utf-8'))
+                self.contar('revalidadas', entrada['bytes'])
+                return self.leer_pagina(entrada)
+        else:
+            respuesta = peticion(url, None)
+
+        self.contar('fallos')
+        self.guardar(url, respuesta)
+        return respuesta.text
+
+    def resumen(self):
+        '''
+        Función que devuelve un texto con las estadísticas de uso de la caché
+        '''
+        e = self.estadisticas
+        resumen = (f"Caché: {e['aciertos']} aciertos, {e['revalidadas']} revalidadas (304), {e['fallos']} descargas, "
+                   f"{e['bytes_ahorrados'] / 1e6:.1f} MB sin descargar")
+        if e['sin_revalidar']:
+            resumen += f" ({e['sin_revalidar']} páginas caducadas sin revalidar por errores de red)"
+        return resumen
@@ -0,0 +1,48 @@
+import os
+
+# Ruta a la carpeta 'data', calculada a partir de este archivo para no depender del directorio desde el que se ejecute
+RUTA_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+# Dirección base de la web de la que obtenemos los datos
+# Se puede cambiar con la variable de entorno FBREF_URL_BASE para apuntar a un servidor local con páginas guardadas
+URL_BASE = os.environ.get('FBREF_URL_BASE', 'https://fbref.com').rstrip('/')
+
+# Número máximo de descargas simultáneas (compartido por todos los scrapers)
+MAX_DESCARGAS = int(os.environ.get('FBREF_MAX_DESCARGAS', 8))
+
+# Peticiones por minuto permitidas a un mismo servidor (0 = sin límite)
+# fbref bloquea temporalmente a quien supera las 20 peticiones por minuto
+PETICIONES_POR_MINUTO = float(os.environ.get('FBREF_PETICIONES_POR_MINUTO', 20))
+
+# Número de reintentos ante errores temporales y factor de espera entre reintentos (en segundos)
+REINTENTOS = int(os.environ.get('FBREF_REINTENTOS', 4))
+ESPERA_REINTENTO = float(os.environ.get('FBREF_ESPERA_REINTENTO', 2))
+
+# Tiempo máximo de espera de cada petición (en segundos)
+TIEMPO_ESPERA = float(os.environ.get('FBREF_TIEMPO_ESPERA', 30))
+
+# Carpeta donde se guarda la caché de páginas descargadas
+RUTA_CACHE = os.environ.get('FBREF_RUTA_CACHE', os.path.join(RUTA_DATOS, 'cache'))
+
+# Si es False, las páginas se descargan siempre sin pasar por la caché
+USAR_CACHE = os.environ.get('FBREF_USAR_CACHE', '1') != '0'
+
+# En modo sin conexión solo se usan las páginas de la caché y nunca se accede a la red
+MODO_OFFLINE = os.environ.get('FBREF_OFFLINE', '0') == '1'
+
+# Temporada que todavía está en juego; el resto de temporadas ya no cambian
+TEMPORADA_ACTUAL = os.environ.get('FBREF_TEMPORADA_ACTUAL', '2023-2024')
+
+# Segundos que una página guardada se da por buena antes de volver a preguntar al servidor si ha cambiado
+# En las temporadas pasadas un valor negativo significa que nunca caducan
+TTL_TEMPORADA_ACTUAL = float(os.environ.get('FBREF_TTL_TEMPORADA_ACTUAL', 0))
+TTL_TEMPORADAS_PASADAS = float(os.environ.get('FBREF_TTL_TEMPORADAS_PASADAS', -1))
+
+# En modo incremental solo se vuelven a procesar las temporadas cuya página ha cambiado desde la última ejecución
+MODO_INCREMENTAL = os.environ.get('FBREF_INCREMENTAL', '1') != '0'
+
+# Carpeta donde se guarda, para cada CSV, el manifiesto con el estado de cada temporada
+RUTA_MANIFIESTOS = os.path.join(RUTA_DATOS, 'manifiestos')
+
+# Analizador de HTML para extraer las tablas: 'lxml' (rápido, solo procesa la tabla buscada) o 'bs4' (BeautifulSoup)
+ANALIZADOR = os.environ.get('FBREF_ANALIZADOR', 'lxml')
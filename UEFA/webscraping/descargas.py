@@ -0,0 +1,178 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+from cache import CachePaginas
+
+# medicion.py está en la carpeta UEFA
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from medicion import contar, tramo
+
+# Códigos de estado que indican un error temporal y que merece la pena reintentar
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+class LimitadorPeticiones:
+    '''
+    Clase que reparte las peticiones a un mismo servidor para no superar un número de peticiones por minuto
+    '''
+
+    def __init__(self, peticiones_por_minuto):
+        # Segundos que deben pasar entre dos peticiones al mismo servidor
+        self.intervalo = 60 / peticiones_por_minuto if peticiones_por_minuto > 0 else 0
+        # Momento a partir del cual cada servidor acepta la siguiente petición
+        self.siguiente_turno = {}
+        self.cerrojo = threading.Lock()
+
+    def esperar(self, url):
+        '''
+        Función que bloquea el hilo actual hasta que le toque hacer una petición al servidor de la URL
+        '''
+        if not self.intervalo:
+            return
+
+        servidor = urlsplit(url).netloc
+        # Reservamos el turno dentro del cerrojo, pero esperamos fuera de él para no bloquear al resto de servidores
+        with self.cerrojo:
+            ahora = time.monotonic()
+            turno = max(ahora, self.siguiente_turno.get(servidor, ahora))
+            self.siguiente_turno[servidor] = turno + self.intervalo
+        time.sleep(max(0, turno - ahora))
+
+
+class Descargador:
+    '''
+    Clase que descarga páginas web reutilizando conexiones y repartiendo el trabajo entre varios hilos
+    '''
+
+    def __init__(self, max_descargas=config.MAX_DESCARGAS, peticiones_por_minuto=config.PETICIONES_POR_MINUTO,
+                 reintentos=config.REINTENTOS, espera_reintento=config.ESPERA_REINTENTO, cache=None):
+        self.cache = cache
+        self.reintentos = reintentos
+        self.espera_reintento = espera_reintento
+        self.limitador = LimitadorPeticiones(peticiones_por_minuto)
+
+        # Una única sesión mantiene abiertas las conexiones TCP/TLS entre peticiones al mismo servidor
+        self.sesion = requests.Session()
+        self.sesion.headers['User-Agent'] = 'Mozilla/5.0 (uefa_analisis)'
+        adaptador = HTTPAdapter(pool_connections=max_descargas, pool_maxsize=max_descargas)
+        self.sesion.mount('http://', adaptador)
+        self.sesion.mount('https://', adaptador)
+
+        # Grupo de hilos limitado que comparten todos los scrapers
+        self.max_descargas = max_descargas
+        self.hilos = ThreadPoolExecutor(max_workers=max_descargas, thread_name_prefix='descarga')
+
+        # Descargas en curso por URL: si dos scrapers piden la misma página a la vez (equipos y jugadores comparten las
+        # páginas '/stats/' de cada temporada), el segundo espera a la descarga del primero en lugar de repetirla
+        self.en_curso = {}
+        self.cerrojo_en_curso = threading.Lock()
+
+    def peticion(self, url, cabeceras=None):
+        '''
+        Función que realiza una petición GET respetando el límite de peticiones y reintentando los errores temporales
+        '''
+        for intento in range(self.reintentos + 1):
+            self.limitador.esperar(url)
+            try:
+                with tramo('descarga'):
+                    r = self.sesion.get(url, headers=cabeceras, timeout=config.TIEMPO_ESPERA)
+            except (requests.ConnectionError, requests.Timeout):
+                # Si no quedan reintentos, dejamos que el error llegue al scraper
+                if intento == self.reintentos:
+                    raise
+                espera = self.espera_reintento * 2 ** intento
+            else:
+                if r.status_code not in ESTADOS_REINTENTABLES or intento == self.reintentos:
+                    r.raise_for_status()
+                    # Las respuestas 304 de la caché no traen la página, así que no cuentan como descargas
+                    if r.status_code == 200:
+                        contar('páginas descargadas')
+                        contar('bytes descargados', len(r.content))
+                    return r
+                # Si el servidor nos indica cuánto esperar, le hacemos caso
+                retry_after = r.headers.get('Retry-After', '')
+                espera = float(retry_after) if retry_after.isdigit() else self.espera_reintento * 2 ** intento
+            time.sleep(espera)
+
+    def descargar(self, url):
+        '''
+        Función que devuelve el HTML de una URL, pasando por la caché de páginas si la hay. Las peticiones simultáneas
+        a la misma URL comparten una única descarga
+        '''
+        with self.cerrojo_en_curso:
+            futuro = self.en_curso.get(url)
+            propia = futuro is None
+            if propia:
+                futuro = self.en_curso[url] = Future()
+        if not propia:
+            return futuro.result()
+
+        try:
+            if self.cache is not None:
+                html = self.cache.obtener(url, self.peticion)
+            else:
+                html = self.peticion(url).text
+        except BaseException as error:
+            futuro.set_exception(error)
+            raise
+        else:
+            futuro.set_result(html)
+            return html
+        finally:
+            # Cuando termina, las siguientes peticiones vuelven a pasar por la caché
+            with self.cerrojo_en_curso:
+                del self.en_curso[url]
+
+    def descargar_varias(self, urls):
+        '''
+        Función que descarga varias URLs en paralelo y devuelve sus HTML en el mismo orden que las URLs, a medida que
+        el llamador los recorre
+        '''
+        # Como mucho hay 'max_descargas' páginas descargándose o esperando a que el llamador las recorra: cada vez que
+        # devolvemos una lanzamos la siguiente, así que si el llamador es más lento que las descargas no se acumulan
+        # en memoria los HTML de todas las páginas
+        urls = iter(urls)
+        pendientes = deque(self.hilos.submit(self.descargar, url) for _, url in zip(range(self.max_descargas), urls))
+        try:
+            while pendientes:
+                html = pendientes.popleft().result()
+                siguiente = next(urls, None)
+                if siguiente is not None:
+                    pendientes.append(self.hilos.submit(self.descargar, siguiente))
+                yield html
+        finally:
+            # Si el llamador deja de recorrerlas, las descargas que no han empezado ya no hacen falta
+            for futuro in pendientes:
+                futuro.cancel()
+
+
+# Descargador compartido por todos los scrapers, que se crea la primera vez que se necesita
+_descargador = None
+_cerrojo_descargador = threading.Lock()
+
+
+def obtener_descargador():
+    '''
+    Función que devuelve el descargador compartido, creándolo si todavía no existe
+    '''
+    global _descargador
+    with _cerrojo_descargador:
+        if _descargador is None:
+            _descargador = Descargador(cache=CachePaginas() if config.USAR_CACHE else None)
+    return _descargador
+
+
+def descargar_paginas(urls):
+    '''
+    Función que descarga en paralelo las páginas de una lista de URLs con el descargador compartido
+    '''
+    return obtener_descargador().descargar_varias(urls)
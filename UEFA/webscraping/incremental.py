@@ -0,0 +1,153 @@
+import csv
+import hashlib
+import json
+import os
+
+import config
+from descargas import descargar_paginas
+
+
+def ruta_manifiesto(nombre_csv):
+    return os.path.join(config.RUTA_MANIFIESTOS, nombre_csv.replace('.csv', '.json'))
+
+
+def leer_manifiesto(nombre_csv):
+    '''
+    Función que devuelve el manifiesto de una tabla: su encabezado y, por temporada, el hash de la página, el hash de
+    las filas extraídas y el número de filas
+    '''
+    try:
+        with open(ruta_manifiesto(nombre_csv), encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def guardar_manifiesto(nombre_csv, manifiesto):
+    os.makedirs(config.RUTA_MANIFIESTOS, exist_ok=True)
+    ruta = ruta_manifiesto(nombre_csv)
+    with open(ruta + '.tmp', 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, indent=2, ensure_ascii=False)
+    os.replace(ruta + '.tmp', ruta)
+
+
+def calcular_hash(datos):
+    if isinstance(datos, str):
+        return hashlib.sha256(datos.encode('utf-8')).hexdigest()
+    return hashlib.sha256(json.dumps(datos, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def escribir_filas(escritor_csv, temporada, filas):
+    for fila in filas:
+        escritor_csv.writerow([temporada] + fila)
+
+
+def actualizar_tabla(nombre_csv, urls, extraer_filas, indice_temporada, incremental=config.MODO_INCREMENTAL):
+    '''
+    Función que descarga las páginas de todas las temporadas de una tabla y escribe su CSV.
+
+    'extraer_filas' recibe el HTML de una página y devuelve sus filas (la primera fila de la primera URL es el
+    encabezado) y 'indice_temporada' es la posición de la temporada dentro del URL separado por '/'.
+
+    En modo incremental solo se vuelven a procesar las temporadas cuya página ha cambiado desde la última ejecución, y
+    el CSV se reescribe copiando línea a línea las temporadas que no han cambiado. Si no ha cambiado ninguna, el CSV no
+    se toca.
+    '''
+    ruta_csv = os.path.join(config.RUTA_DATOS, nombre_csv)
+    manifiesto = leer_manifiesto(nombre_csv) if incremental else {}
+    # Sin manifiesto o sin CSV previo no hay nada que reutilizar y hacemos una escritura completa
+    completo = not os.path.exists(ruta_csv) or 'encabezado' not in manifiesto
+    encabezado = None if completo else manifiesto['encabezado']
+    temporadas = {} if completo else manifiesto['temporadas']
+
+    # Orden de las temporadas en el CSV, que es el mismo que el de los URLs
+    orden = [url.split('/')[indice_temporada] for url in urls]
+
+    # Filas nuevas de las temporadas que han cambiado (solo se guardan en memoria en modo incremental)
+    cambios = {}
+
+    ruta_temporal = ruta_csv + '.tmp'
+    archivo_temporal = open(ruta_temporal, 'w', newline='', encoding='utf-8') if completo else None
+    escritor_csv = csv.writer(archivo_temporal) if completo else None
+
+    # Descargamos las páginas en paralelo (unas pocas por delante de la que estamos procesando) y las procesamos en orden
+    for temporada, html in zip(orden, descargar_paginas(urls)):
+        hash_pagina = calcular_hash(html)
+        anterior = temporadas.get(temporada)
+        # Si la página es idéntica a la de la última ejecución, ni siquiera la procesamos
+        if not completo and anterior is not None and anterior['hash_pagina'] == hash_pagina:
+            continue
+
+        filas = extraer_filas(html)
+        # El encabezado es la primera fila de la primera temporada
+        if encabezado is None and filas:
+            encabezado = ['Season'] + filas[0]
+            escritor_csv.writerow(encabezado)
+        # Quitamos las filas que repiten el encabezado (la propia cabecera y las que fbref intercala en la tabla)
+        filas = [fila for fila in filas if encabezado is None or fila != encabezado[1:]]
+
+        hash_tabla = calcular_hash(filas)
+        temporadas[temporada] = {'hash_pagina': hash_pagina, 'hash_tabla': hash_tabla, 'filas': len(filas)}
+        if completo:
+            escribir_filas(escritor_csv, temporada, filas)
+        elif anterior is None or anterior['hash_tabla'] != hash_tabla:
+            # La página ha cambiado y también sus datos (y no solo, por ejemplo, la publicidad)
+            cambios[temporada] = filas
+
+    if completo:
+        archivo_temporal.close()
+        os.replace(ruta_temporal, ruta_csv)
+        mensaje = 'ha sido creado exitosamente'
+    elif cambios:
+        fusionar_csv(ruta_csv, encabezado, orden, cambios)
+        mensaje = f"ha sido actualizado exitosamente ({', '.join(cambios)})"
+    else:
+        mensaje = 'ya estaba actualizado'
+
+    # Nos olvidamos de las temporadas que ya no están en la lista de URLs
+    temporadas = {temporada: temporadas[temporada] for temporada in orden if temporada in temporadas}
+    guardar_manifiesto(nombre_csv, {'encabezado': encabezado, 'temporadas': temporadas})
+
+    # Imprimimos un mensaje de éxito
+    print(f"El archivo CSV '{nombre_csv}' {mensaje}.")
+
+
+def fusionar_csv(ruta_csv, encabezado, orden, cambios):
+    '''
+    Función que reescribe un CSV sustituyendo las filas de las temporadas que han cambiado.
+
+    El CSV antiguo se recorre línea a línea, así que en memoria solo están las filas nuevas. Las temporadas nuevas se
+    colocan en su sitio según el orden de los URLs, de modo que el resultado es el mismo que una escritura completa.
+    '''
+    posicion = {temporada: i for i, temporada in enumerate(orden)}
+    pendientes = [temporada for temporada in orden if temporada in cambios]
+    ruta_temporal = ruta_csv + '.tmp'
+
+    with open(ruta_csv, newline='', encoding='utf-8') as archivo_csv, \
+            open(ruta_temporal, 'w', newline='', encoding='utf-8') as archivo_temporal:
+        lector_csv = csv.reader(archivo_csv)
+        escritor_csv = csv.writer(archivo_temporal)
+        next(lector_csv, None)
+        escritor_csv.writerow(encabezado)
+
+        temporada_actual = None
+        for fila in lector_csv:
+            temporada = fila[0]
+            # Las temporadas que ya no están en la lista de URLs se eliminan, igual que en una escritura completa
+            if temporada not in posicion:
+                continue
+            if temporada != temporada_actual:
+                temporada_actual = temporada
+                # Antes de empezar una temporada escribimos las temporadas cambiadas o nuevas que van delante de ella
+                while pendientes and posicion[pendientes[0]] <= posicion[temporada]:
+                    siguiente = pendientes.pop(0)
+                    escribir_filas(escritor_csv, siguiente, cambios[siguiente])
+            # Las filas antiguas de las temporadas cambiadas se descartan
+            if temporada not in cambios:
+                escritor_csv.writerow(fila)
+
+        # Las temporadas que faltan van al final
+        for temporada in pendientes:
+            escribir_filas(escritor_csv, temporada, cambios[temporada])
+
+    os.replace(ruta_temporal, ruta_csv)
@@ -1,10 +1,45 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
 from equipos import webscraping_equipos
 from jugadores import webscraping_jugadores
 from partidos import webscraping_partidos
 from overall import webscraping_overall
+from descargas import obtener_descargador
 from helpers import limpiar_pantalla
 
+# Scraper de cada tabla, para ejecutarlos sin el menú
+SCRAPERS = {
+    'equipos': webscraping_equipos,
+    'jugadores': webscraping_jugadores,
+    'partidos': webscraping_partidos,
+    'overall': webscraping_overall,
+}
+
+
+def ejecutar_scrapers(tablas):
+    '''
+    Función que lanza a la vez los scrapers de las tablas indicadas; todos comparten las conexiones y el límite de
+    peticiones. Espera a que terminen todos y lanza el primer error que haya ocurrido
+    '''
+    with ThreadPoolExecutor(max_workers=len(tablas)) as scrapers:
+        tareas = [scrapers.submit(SCRAPERS[tabla]) for tabla in tablas]
+        for tarea in tareas:
+            tarea.result()
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Web scraping de la UEFA Champions League')
+    parser.add_argument('--tablas', nargs='+', choices=list(SCRAPERS),
+                        help='Hace web scraping de estas tablas sin mostrar el menú (por ejemplo, para programarlo)')
+    args = parser.parse_args()
+
+    if args.tablas:
+        ejecutar_scrapers(args.tablas)
+        if obtener_descargador().cache is not None:
+            print(obtener_descargador().cache.resumen())
+        raise SystemExit(0)
+
     while True:
         limpiar_pantalla()
         print('¡Bienvenido a la aplicación de web scraping de la UEFA Champions League!\n')
@@ -33,14 +68,15 @@ if __name__ == '__main__':
             webscraping_overall()
         elif opcion == '5':
             print('Iniciando web scraping de todos los datos...\n')
-            webscraping_equipos()
-            webscraping_jugadores()
-            webscraping_partidos()
-            webscraping_overall()
+            ejecutar_scrapers(list(SCRAPERS))
         elif opcion == '6':
             print('Saliendo...')
             break
         else:
             print('Opción no válida. Intente de nuevo.')
 
+        # Mostramos cuántas páginas se han servido desde la caché
+        if opcion in ('1', '2', '3', '4', '5') and obtener_descargador().cache is not None:
+            print(obtener_descargador().cache.resumen())
+
         input('\nPresione Enter para continuar...')
\ No newline at end of file
@@ -0,0 +1,153 @@
+import html as html_lib
+import os
+import re
+import sys
+
+from bs4 import BeautifulSoup
+
+import config
+
+# medicion.py está en la carpeta UEFA
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from medicion import contar, tramo
+
+# lxml es opcional: si no está instalado usamos siempre BeautifulSoup
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+# Expresión regular que localiza la etiqueta de apertura de una tabla con id en el HTML sin procesar
+RE_TABLA = re.compile(r'<table\b[^>]*?\bid=["\']([^"\']*)["\']', re.IGNORECASE)
+
+
+class TablaFbref:
+    '''
+    Clase que describe dónde está una tabla dentro de una página de fbref y qué celdas queremos de ella
+    '''
+
+    def __init__(self, etiqueta, data_label, id_tabla, id_parcial=False, saltar_filas=0, max_columnas=None,
+                 excluir_contiene=(), excluir_exacto=()):
+        # Elemento (por ejemplo 'span') y valor de su atributo 'data-label' que marcan la sección donde está la tabla
+        self.etiqueta = etiqueta
+        self.data_label = data_label
+        # Id de la tabla; si 'id_parcial' es True basta con que el id de la tabla lo contenga
+        self.id_tabla = id_tabla
+        self.id_parcial = id_parcial
+        # Número de filas iniciales que no nos interesan (por ejemplo, la fila de grupos de columnas)
+        self.saltar_filas = saltar_filas
+        # Número de columnas con las que nos quedamos (None = todas)
+        self.max_columnas = max_columnas
+        # Celdas que descartamos según su atributo 'data-stat' porque no están en todas las temporadas
+        self.excluir_contiene = excluir_contiene
+        self.excluir_exacto = excluir_exacto
+
+    def coincide_id(self, id_tabla):
+        if not id_tabla:
+            return False
+        return self.id_tabla in id_tabla if self.id_parcial else self.id_tabla == id_tabla
+
+    def incluir_celda(self, data_stat):
+        data_stat = data_stat or ''
+        return not any(texto in data_stat for texto in self.excluir_contiene) and data_stat not in self.excluir_exacto
+
+
+def ordenar_filas(tabla, filas):
+    '''
+    Función que recibe las filas de una tabla como listas de pares (data-stat, texto) y devuelve las filas de texto.
+
+    Las celdas se leen por su 'data-stat' siguiendo el orden de la primera fila (el encabezado), de modo que si en una
+    fila las columnas vienen en otro orden se colocan en su sitio. Si una fila no tiene todas las columnas del
+    encabezado se deja tal cual, como se leía antes por posición.
+    '''
+    datos = []
+    columnas = None
+    for pares in filas:
+        # Las filas sin celdas (separadores) no nos interesan
+        if not pares:
+            continue
+        if columnas is None:
+            columnas = [data_stat for data_stat, _ in pares]
+        datos_fila = [texto for _, texto in pares]
+        por_columna = dict(pares)
+        if len(por_columna) == len(pares) and all(columna in por_columna for columna in columnas):
+            datos_fila = [por_columna[columna] for columna in columnas]
+        datos.append(datos_fila[:tabla.max_columnas])
+    return datos
+
+
+def extraer_tabla_bs4(html, tabla):
+    '''
+    Función que extrae las filas de una tabla procesando la página completa con BeautifulSoup
+    '''
+    # Creamos un objeto BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Buscamos la sección de texto que contiene la tabla y, a continuación, la propia tabla
+    nodo = soup.find(tabla.etiqueta, attrs={'data-label': tabla.data_label}).find_next('table', id=tabla.coincide_id)
+
+    # Obtenemos las filas de la tabla y eliminamos las primeras que no nos interesan
+    filas = nodo.find_all('tr')[tabla.saltar_filas:]
+
+    # Obtenemos las celdas de cada fila y nos quedamos con su 'data-stat' y su texto
+    return ordenar_filas(tabla, [
+        [(celda.get('data-stat'), celda.get_text(strip=True))
+         for celda in fila.find_all(['th', 'td']) if tabla.incluir_celda(celda.get('data-stat'))]
+        for fila in filas
+    ])
+
+
+def localizar_tabla(html, tabla):
+    '''
+    Función que devuelve el trozo de HTML de la tabla buscada sin procesar el resto de la página.
+
+    Como buscamos directamente en el texto, nos saltamos las tablas que fbref envuelve en comentarios HTML: BeautifulSoup
+    no las ve como tablas, y así los dos analizadores encuentran siempre la misma.
+    '''
+    # Empezamos a buscar desde la sección de la tabla (si no la encontramos, desde el principio de la página)
+    marca = re.search(rf'<{tabla.etiqueta}\b[^>]*\bdata-label=["\']'
+                      rf'({re.escape(tabla.data_label)}|{re.escape(html_lib.escape(tabla.data_label))})["\']', html)
+    inicio = marca.start() if marca else 0
+
+    for coincidencia in RE_TABLA.finditer(html, inicio):
+        # Está dentro de un comentario si el último '<!--' anterior no se ha cerrado
+        comentada = html.rfind('<!--', 0, coincidencia.start()) > html.rfind('-->', 0, coincidencia.start())
+        if not comentada and tabla.coincide_id(html_lib.unescape(coincidencia.group(1))):
+            fin = html.find('</table>', coincidencia.end())
+            return html[coincidencia.start():fin + len('</table>') if fin >= 0 else len(html)]
+    raise ValueError(f"No se ha encontrado la tabla '{tabla.id_tabla}' en la página")
+
+
+def extraer_tabla_lxml(html, tabla):
+    '''
+    Función que extrae las filas de una tabla procesando con lxml solo el trozo de HTML de la tabla
+    '''
+    nodo = lxml.html.fragment_fromstring(localizar_tabla(html, tabla))
+
+    # Obtenemos las filas de la tabla y eliminamos las primeras que no nos interesan
+    filas = list(nodo.iter('tr'))[tabla.saltar_filas:]
+
+    # El texto de cada celda se obtiene igual que con get_text(strip=True): cada trozo sin espacios y todo junto
+    return ordenar_filas(tabla, [
+        [(celda.get('data-stat'), ''.join(texto.strip() for texto in celda.itertext()))
+         for celda in fila.iter('th', 'td') if tabla.incluir_celda(celda.get('data-stat'))]
+        for fila in filas
+    ])
+
+
+# Analizadores disponibles
+ANALIZADORES = {'bs4': extraer_tabla_bs4}
+if lxml is not None:
+    ANALIZADORES['lxml'] = extraer_tabla_lxml
+
+
+def extraer_tabla(html, tabla, analizador=None):
+    '''
+    Función que extrae las filas de una tabla de fbref con el analizador indicado (por defecto, el de la configuración;
+    si es 'lxml' y no está instalado, se usa BeautifulSoup)
+    '''
+    analizador = analizador or config.ANALIZADOR
+    with tramo('parseo'):
+        filas = ANALIZADORES.get(analizador, extraer_tabla_bs4)(html, tabla)
+    contar('filas extraídas', len(filas))
+    return filas
@@ -0,0 +1,38 @@
+import argparse
+import os
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ManejadorPaginas(SimpleHTTPRequestHandler):
+    '''
+    Clase que sirve las páginas guardadas de fbref como si fueran HTML, aunque sus archivos no tengan extensión
+    '''
+
+    def guess_type(self, path):
+        return 'text/html; charset=utf-8'
+
+    def log_message(self, format, *args):
+        # No mostramos cada petición para no ensuciar la salida de los scrapers
+        pass
+
+
+def crear_servidor(carpeta, puerto=8000):
+    '''
+    Función que crea un servidor HTTP local que sirve las páginas de una carpeta con la misma estructura de rutas que fbref
+    (por ejemplo, 'carpeta/en/comps/8/2023-2024/stats/2023-2024-Champions-League-Stats')
+    '''
+    manejador = partial(ManejadorPaginas, directory=carpeta)
+    return ThreadingHTTPServer(('127.0.0.1', puerto), manejador)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor local que imita a fbref sirviendo páginas guardadas')
+    parser.add_argument('carpeta', help='Carpeta con las páginas guardadas')
+    parser.add_argument('--puerto', type=int, default=8000)
+    args = parser.parse_args()
+
+    servidor = crear_servidor(os.path.abspath(args.carpeta), args.puerto)
+    print(f'Sirviendo {args.carpeta} en http://127.0.0.1:{args.puerto}')
+    print(f'Ejecuta los scrapers con FBREF_URL_BASE=http://127.0.0.1:{args.puerto} FBREF_PETICIONES_POR_MINUTO=0')
+    servidor.serve_forever()